@@ -0,0 +1,221 @@
+from typing import Dict, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import hashlib
+import logging
+import time
+import os
+
+# Diretório dos dados (pode ser trocado por variável de ambiente, ex: para testes de carga)
+DATA_DIR = os.environ.get("IMOVEIS_DATA_DIR", "data")
+DATASET_PREFIX = "all_properties"
+CURRENT_POINTER_FILE = "current_dataset.txt"
+LEGACY_PARQUET_FILE = "all_properties.parquet"
+
+NUMERIC_COLUMNS = ['bedrooms', 'bathrooms', 'parking_spaces', 'private_area_m2', 'price', 'latitude', 'longitude']
+REQUIRED_COLUMNS = ['id', 'price', 'city', 'neighborhood']
+KEY_COLUMNS = ['domain', 'id']
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+# Colunas calculadas na publicação (não fazem parte do conteúdo do anúncio)
+TRACKING_COLUMNS = ['content_hash', 'first_seen', 'updated_at']
+
+
+def data_path(*parts: str) -> str:
+    """Caminho de um arquivo dentro do diretório de dados."""
+    return os.path.join(DATA_DIR, *parts)
+
+
+def dataset_path(version: Optional[str] = None) -> Optional[str]:
+    """
+    Caminho do dataset publicado (Arrow IPC) de uma versão; por padrão, a atual.
+    """
+    version = version or dataset_version()
+    return data_path(f"{DATASET_PREFIX}.{version}.arrow") if version else None
+
+
+def parquet_path(version: Optional[str] = None) -> Optional[str]:
+    """
+    Caminho da cópia em Parquet do dataset publicado, usada pelo backend SQL (SQL_Backend.py).
+    """
+    version = version or dataset_version()
+    return data_path(f"{DATASET_PREFIX}.{version}.parquet") if version else None
+
+
+def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garante colunas numéricas como float e remove linhas sem os campos essenciais.
+    """
+    df = df.copy()
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.dropna(subset=REQUIRED_COLUMNS, inplace=True)
+    return df.reset_index(drop=True)
+
+
+def publish_dataset(df: pd.DataFrame) -> str:
+    """
+    Limpa o DataFrame e o publica como um arquivo Arrow IPC sem compressão, que pode
+    ser mapeado em memória pela aplicação.
+
+    Cada versão é gravada em um arquivo próprio e só então o ponteiro da versão atual
+    é trocado de forma atômica. Assim leitores nunca veem um arquivo pela metade e
+    arquivos ainda mapeados por processos antigos não precisam ser sobrescritos.
+
+    Returns:
+        str: A versão do dataset publicada.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    published_at = time.time()
+    previous_version = dataset_version()
+
+    cleaned = clean_dataset(df.drop(columns=TRACKING_COLUMNS, errors='ignore'))
+    cleaned = _track_changes(cleaned, previous_version, published_at)
+    digest = hashlib.sha1(cleaned['content_hash'].to_numpy().tobytes()).hexdigest()[:12]
+    table = pa.Table.from_pandas(cleaned, preserve_index=False)
+    version = f"{time.strftime('%Y%m%d%H%M%S', time.localtime(published_at))}-{digest}"
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"dataset_version": version.encode(),
+        b"previous_version": (previous_version or "").encode(),
+        b"published_at": repr(published_at).encode(),
+    })
+
+    path = dataset_path(version)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    # Cópia em Parquet ordenada por cidade e preço: as estatísticas de cada row group
+    # permitem que consultas SQL pulem os grupos fora da cidade/faixa de preço pedida
+    sort_keys = [("city", "ascending"), ("price", "ascending")]
+    pq.write_table(table.sort_by(sort_keys), parquet_path(version), row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+    pointer = data_path(CURRENT_POINTER_FILE)
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    _remove_old_versions(keep=version, previous=previous_version)
+    logging.info(f"Dataset publicado em {path} (versão {version}, {table.num_rows} imóveis).")
+    return version
+
+
+def _track_changes(df: pd.DataFrame, previous_version: Optional[str], published_at: float) -> pd.DataFrame:
+    """
+    Calcula o hash do conteúdo de cada anúncio e, comparando com a versão anterior
+    pela chave (domain, id), preenche first_seen (primeira coleta) e updated_at
+    (última mudança de conteúdo). Anúncios novos ou alterados recebem published_at.
+    """
+    df = df.copy()
+    df['content_hash'] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    previous = None
+    if previous_version is not None:
+        try:
+            previous = read_dataset(previous_version).select(KEY_COLUMNS + TRACKING_COLUMNS).to_pandas()
+        except (OSError, KeyError, pa.ArrowInvalid) as e:
+            logging.warning(f"Não foi possível ler a versão anterior {previous_version}: {e}")
+
+    if previous is None or previous.empty:
+        df['first_seen'] = published_at
+        df['updated_at'] = published_at
+        return df
+
+    previous = previous.drop_duplicates(subset=KEY_COLUMNS).rename(columns=lambda c: f"previous_{c}" if c in TRACKING_COLUMNS else c)
+    keys = df[KEY_COLUMNS].astype(str)
+    previous[KEY_COLUMNS] = previous[KEY_COLUMNS].astype(str)
+    # UInt64 anulável evita que o merge converta os hashes para float (perdendo precisão)
+    previous['previous_content_hash'] = previous['previous_content_hash'].astype('UInt64')
+    matched = keys.merge(previous, on=KEY_COLUMNS, how='left')
+
+    unchanged = (matched['previous_content_hash'] == df['content_hash'].to_numpy()).fillna(False).to_numpy(dtype=bool)
+    df['first_seen'] = matched['previous_first_seen'].fillna(published_at).to_numpy()
+    df['updated_at'] = matched['previous_updated_at'].where(unchanged, published_at).to_numpy()
+    return df
+
+
+def dataset_metadata(version: Optional[str] = None) -> Dict[str, str]:
+    """
+    Metadados gravados na publicação (versão, versão anterior e momento da publicação).
+    """
+    with pa.memory_map(dataset_path(version), "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return {key.decode(): value.decode() for key, value in metadata.items() if key != b"pandas"}
+
+
+def load_delta(version: Optional[str] = None) -> pd.DataFrame:
+    """
+    Anúncios novos ou alterados na publicação da versão (vazio na primeira publicação,
+    quando não há com o que comparar).
+    """
+    metadata = dataset_metadata(version)
+    if not metadata.get("previous_version"):
+        return pd.DataFrame()
+    df = load_frame(version)
+    published_at = float(metadata["published_at"])
+    return df[df['updated_at'] >= published_at]
+
+
+def _remove_old_versions(keep: str, previous: Optional[str] = None):
+    """
+    Remove versões antigas, mantendo a atual e a anterior (usada para calcular mudanças).
+    As que ainda estiverem abertas (Windows) ficam para a próxima publicação.
+    """
+    kept = {f"{DATASET_PREFIX}.{version}.{extension}" for version in (keep, previous) if version for extension in ("arrow", "parquet")}
+    for name in os.listdir(DATA_DIR):
+        if name == LEGACY_PARQUET_FILE:
+            continue
+        if name.startswith(f"{DATASET_PREFIX}.") and name.endswith((".arrow", ".parquet")) and name not in kept:
+            try:
+                os.remove(data_path(name))
+            except OSError:
+                pass
+
+
+def dataset_version() -> Optional[str]:
+    """
+    Versão publicada atualmente (None se nenhum dataset foi publicado).
+    """
+    try:
+        with open(data_path(CURRENT_POINTER_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def dataset_mtime() -> Optional[float]:
+    """
+    Momento da última publicação (None se nenhum dataset foi publicado).
+    """
+    pointer = data_path(CURRENT_POINTER_FILE)
+    return os.path.getmtime(pointer) if os.path.exists(pointer) else None
+
+
+def read_dataset(version: Optional[str] = None) -> pa.Table:
+    """
+    Mapeia o arquivo em memória. Os buffers da tabela apontam para o mapeamento,
+    então a leitura não copia dados e é compartilhada pelo cache de páginas do SO.
+    """
+    source = pa.memory_map(dataset_path(version), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_frame(version: Optional[str] = None) -> pd.DataFrame:
+    """
+    Carrega o dataset como DataFrame com colunas apoiadas em Arrow (sem cópia).
+
+    O DataFrame retornado deve ser tratado como somente leitura: ele é compartilhado
+    entre todas as sessões da aplicação.
+    """
+    return read_dataset(version).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def migrate_legacy_parquet() -> Optional[str]:
+    """
+    Publica o dataset a partir do Parquet antigo, caso o arquivo Arrow ainda não exista.
+    """
+    legacy_path = data_path(LEGACY_PARQUET_FILE)
+    if dataset_version() is not None or not os.path.exists(legacy_path):
+        return None
+    return publish_dataset(pd.read_parquet(legacy_path))
@@ -0,0 +1,46 @@
+from typing import List
+import logging
+import os
+
+import Data_Store
+
+# Imobiliárias que compartilham a mesma API e o mesmo frontend
+DOMAINS = [
+    'imoveisinvest.com',
+    'imobiliariadcasa.com.br',
+    'barbianimoveis.com.br',
+    'oktoberimoveis.com.br',
+    'borbaimoveis.com.br',
+    'predilarimoveis.com.br',
+    'karnoppimoveis.com.br',
+    'imoveismdm.com.br',
+    'verenaimoveis.com.br',
+    'imoveisdasantinha.com.br',
+    'muranoimobiliaria.com.br',
+    'imobjardim.com.br',
+    'imobiliariaimigrante.com.br',
+    'garbonegociosimobiliarios.com.br',
+]
+
+# Domínios adicionais (um por linha, "#" inicia um comentário), para cobrir outras regiões
+DOMAINS_FILE = "domains.txt"
+
+
+def load_domains() -> List[str]:
+    """
+    Domínios a serem extraídos: os padrão e os listados em data/domains.txt, sem repetições.
+    """
+    domains = list(DOMAINS)
+    path = Data_Store.data_path(DOMAINS_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    domain = line.split('#', 1)[0].strip().lower()
+                    if domain.startswith('www.'):
+                        domain = domain[4:]
+                    if domain and domain not in domains:
+                        domains.append(domain)
+        except OSError as e:
+            logging.error(f"Não foi possível ler {path}: {e}")
+    return domains
@@ -0,0 +1,255 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pandas as pd
+import numpy as np
+import requests
+import logging
+import json
+import html
+import time
+import os
+import re
+
+import Data_Store
+from Normalizer import SCHEMA, DETAIL_SCHEMA, normalize_details
+from Next_Data import NEXT_DATA_PATTERN
+
+DETAILS_CACHE_FILE = "details_cache.parquet"
+
+META_DESCRIPTION_PATTERN = re.compile(r'<meta[^>]*name="description"[^>]*content="([^"]*)"', re.IGNORECASE)
+
+# Chaves do JSON da página de detalhe que podem trazer cada campo (a primeira encontrada vence)
+DESCRIPTION_KEYS = ("description", "fullDescription", "longDescription")
+AMENITY_KEYS = ("amenities", "comodidades", "features", "characteristics", "infrastructures", "condominiumFeatures")
+TOTAL_AREA_KEYS = ("totalArea", "total_area", "landArea")
+USABLE_AREA_KEYS = ("usableArea", "usefulArea")
+
+
+def listing_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash do conteúdo de cada anúncio, calculado apenas sobre as colunas do SCHEMA
+    (antes do enriquecimento). Um anúncio com o mesmo hash não precisa ser buscado de novo.
+    """
+    columns = [column for column in SCHEMA if column in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def _listing_keys(df: pd.DataFrame) -> pd.Series:
+    return df["domain"].astype(str) + "/" + df["id"].astype(str)
+
+
+def _first_value(data: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def _area_value(value: Any) -> Any:
+    """Áreas vêm como número, texto ("120 m²") ou objeto {"value": 120}."""
+    if isinstance(value, dict):
+        return value.get("value")
+    return value
+
+
+def _amenity_names(value: Any) -> List[str]:
+    """Nomes das amenidades, aceitando listas de textos ou de objetos ({"name": ...})."""
+    if isinstance(value, dict):
+        value = [name for name, enabled in value.items() if enabled]
+    if not isinstance(value, list):
+        return []
+    names = []
+    for item in value:
+        if isinstance(item, dict):
+            item = _first_value(item, ("name", "title", "label", "description"))
+        if isinstance(item, str) and item.strip():
+            names.append(item.strip())
+    return names
+
+
+class DetailEnricher:
+    """
+    Busca as páginas de detalhe dos anúncios, em paralelo com concorrência limitada,
+    e extrai a descrição completa, as comodidades e as áreas total e útil.
+
+    Os dados vêm do JSON embutido (__NEXT_DATA__) da página; na falta dele, apenas a
+    descrição é lida da meta tag.
+    """
+
+    def __init__(self, max_workers: int = 8, timeout: float = 15):
+        """
+        Args:
+            max_workers (int): Número máximo de páginas buscadas ao mesmo tempo.
+            timeout (float): Tempo limite de cada requisição, em segundos.
+        """
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        })
+
+    def _fetch_html(self, url: str) -> Optional[str]:
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+        except requests.exceptions.RequestException as e:
+            logging.error(f"A requisição para {url} falhou: {e}")
+            return None
+
+    @staticmethod
+    def _find_property(data: Any, listing_id: str, code: Optional[str] = None,
+                       url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Objeto do imóvel dentro do JSON embutido: o de mesmo id, código ou URL (os anúncios
+        do frontend usam o código como id). None se nenhum corresponder, para não atribuir
+        ao anúncio a descrição de outro (ex: a lista de semelhantes da página).
+        """
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                if any(key in item for key in DESCRIPTION_KEYS + AMENITY_KEYS):
+                    item_url = item.get('url')
+                    if (str(item.get('id')) == listing_id
+                            or (code and str(item.get('code')) == code)
+                            or (url and isinstance(item_url, str) and item_url and url.endswith(item_url))):
+                        return item
+                stack.extend(item.values())
+            elif isinstance(item, list):
+                stack.extend(reversed(item))
+        return None
+
+    @classmethod
+    def parse_detail(cls, page: str, listing_id: str, code: Optional[str] = None,
+                     url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Extrai os campos de detalhe de uma página. Retorna None se nada for encontrado.
+        """
+        prop = None
+        match = NEXT_DATA_PATTERN.search(page)
+        if match:
+            try:
+                prop = cls._find_property(json.loads(match.group(1)), listing_id, code, url)
+            except ValueError:
+                logging.warning(f"Falha ao decodificar o __NEXT_DATA__ do anúncio {listing_id}.")
+
+        if prop is None:
+            meta = META_DESCRIPTION_PATTERN.search(page)
+            return {"full_description": html.unescape(meta.group(1))} if meta else None
+
+        return {
+            "full_description": _first_value(prop, DESCRIPTION_KEYS),
+            "amenities": _amenity_names(_first_value(prop, AMENITY_KEYS)),
+            "total_area_m2": _area_value(_first_value(prop, TOTAL_AREA_KEYS)),
+            "usable_area_m2": _area_value(_first_value(prop, USABLE_AREA_KEYS)),
+        }
+
+    def _fetch_detail(self, domain: str, listing_id: str, code: Optional[str], url: str) -> Optional[Dict[str, Any]]:
+        page = self._fetch_html(url)
+        if page is None:
+            return None
+        # Página lida sem detalhes: a linha vazia vai para o cache e a página não é buscada de novo
+        return {"domain": domain, "id": listing_id, **(self.parse_detail(page, listing_id, code, url) or {})}
+
+    def fetch_details(self, listings: pd.DataFrame) -> pd.DataFrame:
+        """
+        Busca os detalhes dos anúncios informados (colunas domain, id, code e property_url).
+        Anúncios cuja página falhar ficam de fora do resultado e são tentados na próxima execução;
+        páginas sem detalhes voltam com os campos nulos.
+        """
+        listings = listings.assign(code=listings["code"] if "code" in listings.columns else None)
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._fetch_detail, str(domain), str(listing_id), None if pd.isna(code) else str(code), str(url))
+                for domain, listing_id, code, url in listings[["domain", "id", "code", "property_url"]].itertuples(index=False)
+            ]
+            for future in as_completed(futures):
+                try:
+                    detail = future.result()
+                except Exception as e:
+                    logging.error(f"Ocorreu um erro inesperado ao buscar um anúncio: {e}")
+                    continue
+                if detail:
+                    rows.append(detail)
+        return normalize_details(rows)
+
+
+def load_details_cache() -> pd.DataFrame:
+    """Detalhes já buscados, por (domain, id, content_hash)."""
+    path = Data_Store.data_path(DETAILS_CACHE_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(path)
+    except (OSError, ValueError) as e:
+        logging.error(f"Não foi possível ler {path}: {e}")
+        return pd.DataFrame()
+
+
+def _save_details_cache(cache: pd.DataFrame):
+    path = Data_Store.data_path(DETAILS_CACHE_FILE)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    cache.to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def enrich(df: pd.DataFrame, max_workers: int = 8, timeout: float = 15) -> pd.DataFrame:
+    """
+    Acrescenta as colunas do DETAIL_SCHEMA aos anúncios.
+
+    Apenas anúncios novos ou alterados (sem entrada no cache para o mesmo domain, id e
+    hash do conteúdo) têm a página de detalhe buscada; os demais reaproveitam o cache,
+    inclusive os cuja página não trouxe detalhes (entrada com os campos nulos).
+    O cache é regravado apenas com os anúncios atuais.
+    """
+    df = df.drop(columns=list(DETAIL_SCHEMA), errors='ignore').reset_index(drop=True)
+    columns = ["domain", "id", "content_hash", "fetched_at", *DETAIL_SCHEMA]
+    current = df[["domain", "id"]].assign(key=_listing_keys(df), content_hash=listing_hashes(df))
+    # UInt64 anulável evita que o merge converta os hashes para float (perdendo precisão)
+    current["content_hash"] = current["content_hash"].astype("UInt64")
+
+    cache = load_details_cache()
+    if cache.empty:
+        cache = pd.DataFrame(columns=columns)
+    cache = cache.assign(key=_listing_keys(cache), content_hash=cache["content_hash"].astype("UInt64"))
+    cache = cache.drop(columns=["domain", "id"]).drop_duplicates(subset=["key", "content_hash"], keep="last")
+    cached = current.merge(cache, on=["key", "content_hash"], how="left")
+    hit = cached["fetched_at"].notna().to_numpy(dtype=bool)
+
+    missing = df[~hit & df["property_url"].notna().to_numpy(dtype=bool)]
+    logging.info(f"Enriquecimento: {int(hit.sum())} anúncios em cache, {len(missing)} páginas de detalhe a buscar.")
+
+    started = time.perf_counter()
+    fetched = normalize_details([])
+    if not missing.empty:
+        fetched = DetailEnricher(max_workers=max_workers, timeout=timeout).fetch_details(missing)
+    logging.info(f"{len(fetched)} páginas de detalhe extraídas em {time.perf_counter() - started:.1f} s.")
+
+    # Cache atualizado: entradas reaproveitadas + detalhes recém-buscados, apenas dos anúncios atuais
+    fetched = fetched.assign(key=_listing_keys(fetched)).drop(columns=["domain", "id"])
+    fetched = current.merge(fetched, on="key", how="inner").assign(fetched_at=time.time())
+    new_cache = pd.concat([cached[hit][columns], fetched[columns]], ignore_index=True)
+    new_cache = new_cache.drop_duplicates(subset=["domain", "id", "content_hash"], keep="last")
+    try:
+        _save_details_cache(new_cache)
+    except (OSError, ValueError) as e:
+        logging.error(f"Falha ao gravar o cache de detalhes: {e}")
+
+    # Mescla os detalhes como colunas tipadas (anúncios sem detalhes ficam nulos)
+    details = normalize_details(new_cache)
+    details = details.assign(key=_listing_keys(details)).drop_duplicates(subset="key", keep="last")
+    merged = current[["key"]].merge(details.drop(columns=["domain", "id"]), on="key", how="left")
+    for column in DETAIL_SCHEMA:
+        df[column] = merged[column]
+    return df
@@ -0,0 +1,256 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+import tempfile
+import argparse
+import logging
+import json
+import time
+import os
+
+import Data_Store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+BASELINE_FILE = "load_test_baseline.json"
+
+# Uma piora maior que isso (p95 ou vazão) em relação à referência é considerada regressão
+DEFAULT_TOLERANCE = 1.25
+
+
+def _button(at, label: Optional[str] = None, key_prefix: Optional[str] = None, key_suffix: Optional[str] = None):
+    """Primeiro botão com o rótulo e/ou a chave informados (None se não estiver na tela)."""
+    for button in at.button:
+        key = button.key or ""
+        if label is not None and button.label != label:
+            continue
+        if key_prefix is not None and not key.startswith(key_prefix):
+            continue
+        if key_suffix is not None and not key.endswith(key_suffix):
+            continue
+        return button
+    return None
+
+
+def _click(label: Optional[str] = None, key_prefix: Optional[str] = None, key_suffix: Optional[str] = None) -> Callable:
+    def action(at):
+        button = _button(at, label, key_prefix, key_suffix)
+        return button.click().run() if button is not None and not button.disabled else None
+    return action
+
+
+# Roteiro de uma sessão: o que uma pessoa faz ao procurar um imóvel. A aba do mapa é
+# renderizada em todo rerun (o Streamlit executa todas as abas), então cada passo também
+# mede o mapa; "cidade" troca o conjunto de pontos exibidos.
+# O AppTest não faz reruns de fragmento: cada interação executa o script inteiro. Por isso
+# "proxima_pagina", "imagem" e "tag", que na aplicação renderizam só o fragmento da
+# paginação ou do card, aqui medem um rerun completo (um limite superior). O tempo real
+# desses fragmentos vem do Rerun_Profiler (?profile=1 ou IMOVEIS_PROFILE=1).
+SCENARIO: List[Tuple[str, Callable]] = [
+    ("abrir", lambda at: at.run()),
+    ("tipo", lambda at: at.multiselect(key="types_filter").set_value(["Apartamento"]).run()),
+    ("preco", lambda at: at.number_input(key="max_price").set_value(600_000.0).run()),
+    ("ordenar", lambda at: at.selectbox(key="sort_order").set_value("Menor Preço por m²").run()),
+    ("proxima_pagina", _click(label="Próxima ➡️")),
+    ("proxima_pagina", _click(label="Próxima ➡️")),
+    ("imagem", _click(label="▶", key_prefix="property_")),
+    ("imagem", _click(label="▶", key_prefix="property_")),
+    ("tag", _click(key_prefix="tag_property_", key_suffix="_favorite")),
+    ("semelhantes", _click(label="🔎 Semelhantes", key_prefix="property_")),
+    ("ultima_pagina", _click(label="Última ⏭️")),
+    ("cidade", lambda at: at.selectbox(key="city_filter").set_value(at.selectbox(key="city_filter").options[-1]).run()),
+    ("descartados", lambda at: at.checkbox(key="show_discarded").check().run()),
+]
+
+
+def _memory_mb() -> Tuple[float, float]:
+    """Memória residente atual e o pico do processo (MB)."""
+    current = 0.0
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        peak = current
+    return current, peak
+
+
+def prepare_dataset(rows: int, directory: str, seed: int = 42) -> str:
+    """Publica um dataset sintético em um diretório de dados próprio, usado pela aplicação durante o teste."""
+    from Synthetic_Data import synthetic_listings
+
+    os.environ["IMOVEIS_DATA_DIR"] = directory
+    Data_Store.DATA_DIR = directory
+    return Data_Store.publish_dataset(synthetic_listings(rows, seed))
+
+
+def run_session(timeout: float = 120) -> List[dict]:
+    """
+    Uma sessão simulada (AppTest) percorrendo o roteiro. Cada passo é um rerun completo,
+    inclusive os que na aplicação seriam reruns de fragmento (ver SCENARIO).
+
+    Returns:
+        List[dict]: Tempo de cada passo (passos sem o botão na tela são ignorados).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    steps = []
+    for name, action in SCENARIO:
+        started = time.perf_counter()
+        try:
+            result = action(at)
+        except Exception as e:
+            steps.append({"step": name, "ms": (time.perf_counter() - started) * 1000, "error": repr(e)})
+            continue
+        if result is None:
+            continue
+        error = repr(at.exception[0].value) if len(at.exception) else None
+        steps.append({"step": name, "ms": (time.perf_counter() - started) * 1000, "error": error})
+    return steps
+
+
+def run_level(sessions: int, timeout: float = 120) -> dict:
+    """
+    Executa várias sessões ao mesmo tempo no mesmo processo, como num servidor Streamlit:
+    os caches (st.cache_resource) são compartilhados e cada sessão tem o próprio estado.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(lambda _: run_session(timeout), range(sessions)))
+    wall = time.perf_counter() - started
+
+    steps = [step for session in results for step in session]
+    latencies = np.array([step["ms"] for step in steps]) if steps else np.zeros(1)
+    current, peak = _memory_mb()
+    per_step = {}
+    for name in dict.fromkeys(name for name, _ in SCENARIO):
+        timings = [step["ms"] for step in steps if step["step"] == name]
+        if timings:
+            per_step[name] = float(np.median(timings))
+    return {
+        "sessions": sessions,
+        "reruns": len(steps),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_rps": len(steps) / wall if wall > 0 else 0.0,
+        "rss_mb": current,
+        "peak_rss_mb": peak,
+        "errors": sorted({step["error"] for step in steps if step["error"]}),
+        "steps_p50_ms": per_step,
+    }
+
+
+def run_load_test(rows_levels: List[int], session_levels: List[int], seed: int = 42, timeout: float = 120) -> List[dict]:
+    """Mede cada combinação de tamanho do dataset e número de sessões simultâneas."""
+    results = []
+    previous_data_dir = Data_Store.DATA_DIR
+    try:
+        for rows in rows_levels:
+            with tempfile.TemporaryDirectory() as directory:
+                version = prepare_dataset(rows, directory, seed)
+                logging.info(f"Dataset sintético de {rows} imóveis publicado (versão {version}).")
+                # Um rerun de aquecimento carrega os caches compartilhados antes das medições
+                run_session(timeout)
+                for sessions in session_levels:
+                    result = {"rows": rows, **run_level(sessions, timeout)}
+                    logging.info(f"{rows} imóveis, {sessions} sessões: p50 {result['p50_ms']:.0f} ms, "
+                                 f"p95 {result['p95_ms']:.0f} ms, {result['throughput_rps']:.1f} reruns/s, {result['rss_mb']:.0f} MB")
+                    results.append(result)
+    finally:
+        Data_Store.DATA_DIR = previous_data_dir
+    return results
+
+
+def _level_key(result: dict) -> str:
+    return f"{result['rows']}x{result['sessions']}"
+
+
+def compare_with_baseline(results: List[dict], baseline: List[dict], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compara com a referência salva (mesmo tamanho de dataset e número de sessões).
+
+    Returns:
+        List[str]: As regressões encontradas (p95 maior ou vazão menor que a tolerância permite).
+    """
+    reference = {_level_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = reference.get(_level_key(result))
+        if previous is None:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * tolerance:
+            regressions.append(f"{_level_key(result)}: p95 {result['p95_ms']:.0f} ms (referência {previous['p95_ms']:.0f} ms)")
+        if result["throughput_rps"] * tolerance < previous["throughput_rps"]:
+            regressions.append(f"{_level_key(result)}: vazão {result['throughput_rps']:.1f}/s (referência {previous['throughput_rps']:.1f}/s)")
+    return regressions
+
+
+def check_results(results: List[dict]) -> List[str]:
+    """
+    Problemas que invalidam a medição: erros nos reruns ou passos que não chegaram a rodar
+    (botão ausente na tela), que deixariam os tempos menores do que realmente são.
+
+    Returns:
+        List[str]: Os problemas encontrados (vazia quando todas as sessões completaram o roteiro).
+    """
+    problems = []
+    for result in results:
+        for error in result["errors"]:
+            problems.append(f"{_level_key(result)}: erro {error}")
+        expected = result["sessions"] * len(SCENARIO)
+        if result["reruns"] < expected:
+            problems.append(f"{_level_key(result)}: {result['reruns']} de {expected} passos executados")
+    return problems
+
+
+def print_report(results: List[dict], baseline: Optional[List[dict]] = None):
+    reference = {_level_key(result): result for result in baseline or []}
+    print(f"{'imóveis':>9} {'sessões':>8} {'p50 ms':>8} {'p95 ms':>8} {'reruns/s':>9} {'RSS MB':>8} {'p95 ref.':>9}")
+    for result in results:
+        previous = reference.get(_level_key(result))
+        print(f"{result['rows']:>9} {result['sessions']:>8} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+              f"{result['throughput_rps']:>9.1f} {result['rss_mb']:>8.0f} {previous['p95_ms'] if previous else float('nan'):>9.0f}")
+        for error in result["errors"]:
+            print(f"{'':>18} erro: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da aplicação Streamlit com sessões simultâneas simuladas.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Tamanhos do dataset sintético")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Números de sessões simultâneas")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Arquivo JSON com os resultados de referência")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como a nova referência")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--timeout", type=float, default=120, help="Tempo máximo de cada rerun (s)")
+    args = parser.parse_args()
+
+    results = run_load_test(args.rows, args.sessions, timeout=args.timeout)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    problems = check_results(results)
+    for problem in problems:
+        logging.error(f"Teste inválido: {problem}")
+    if problems:
+        raise SystemExit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logging.info(f"Referência gravada em {args.baseline}.")
+    elif baseline is not None:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            logging.error(f"Regressão: {regression}")
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,223 @@
+from typing import Dict, Optional, Tuple
+import pandas as pd
+import numpy as np
+import logging
+import json
+import os
+
+import Data_Store
+
+MARKET_STATS_FILE = "market_stats.json"
+
+# Níveis de agregação do preço por m², do mais amplo ao mais específico
+GROUP_LEVELS = {
+    "city": ["city"],
+    "neighborhood": ["city", "neighborhood"],
+    "neighborhood_type": ["city", "neighborhood", "type"],
+    "neighborhood_type_bedrooms": ["city", "neighborhood", "type", "bedrooms"],
+}
+GROUP_COLUMNS = ["city", "neighborhood", "type", "bedrooms"]
+
+# Descrição de cada nível usada nas comparações exibidas nos cards
+LEVEL_LABELS = {
+    "city": "da cidade",
+    "neighborhood": "do bairro",
+    "neighborhood_type": "do bairro (mesmo tipo)",
+    "neighborhood_type_bedrooms": "do bairro (mesmo tipo e quartos)",
+}
+
+# Grupos com menos anúncios que isso não são usados nas comparações
+MIN_GROUP_COUNT = 5
+
+
+def _key_value(value):
+    """Padroniza os valores das chaves (ex: 2.0 quartos -> 2) para buscas O(1)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return str(value)
+
+
+def _price_per_m2(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas de agrupamento + preço por m² (apenas anúncios com área válida)."""
+    area = df["private_area_m2"].to_numpy(dtype="float64", na_value=np.nan)
+    price = df["price"].to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_per_m2 = np.where(area > 0, price / area, np.nan)
+    data = pd.DataFrame({column: df[column].astype(object).to_numpy() for column in GROUP_COLUMNS})
+    data["bedrooms"] = pd.to_numeric(data["bedrooms"], errors="coerce")
+    data["price_per_m2"] = price_per_m2
+    return data.dropna(subset=["price_per_m2"])
+
+
+def _aggregate(data: pd.DataFrame, columns) -> Dict[Tuple, dict]:
+    """Contagem, mediana e percentis 25/75 do preço por m² para cada grupo."""
+    if data.empty:
+        return {}
+    grouped = data.groupby(columns, dropna=True, sort=False)["price_per_m2"]
+    quantiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    counts = grouped.size().reindex(quantiles.index)
+    keys = quantiles.index if len(columns) > 1 else [(key,) for key in quantiles.index]
+    return {
+        tuple(_key_value(v) for v in key): {"count": int(count), "p25": float(p25), "median": float(median), "p75": float(p75)}
+        for key, count, p25, median, p75 in zip(keys, counts, quantiles[0.25], quantiles[0.5], quantiles[0.75])
+    }
+
+
+class MarketStats:
+    """
+    Agregados de mercado materializados para uma versão do dataset, com consultas O(1).
+    """
+
+    def __init__(self, version: Optional[str], levels: Dict[str, Dict[Tuple, dict]], agencies: Dict[str, int]):
+        self.version = version
+        self.levels = levels
+        self.agencies = agencies
+
+    def lookup(self, level: str, *key) -> Optional[dict]:
+        """Estatísticas de um grupo (ex: lookup("neighborhood", "Santa Cruz do Sul", "Centro"))."""
+        return self.levels.get(level, {}).get(tuple(_key_value(v) for v in key))
+
+    def compare(self, row) -> Optional[dict]:
+        """
+        Compara o preço por m² de um anúncio com a mediana do grupo mais específico
+        que tenha anúncios suficientes.
+
+        Returns:
+            Optional[dict]: {"diff": -0.12, "median": ..., "count": ..., "label": "do bairro"} ou None.
+        """
+        area, price = row["private_area_m2"], row["price"]
+        if pd.isna(area) or pd.isna(price) or area <= 0:
+            return None
+        price_per_m2 = float(price) / float(area)
+        for level in reversed(list(GROUP_LEVELS)):
+            stats = self.lookup(level, *(row[column] for column in GROUP_LEVELS[level]))
+            if stats and stats["count"] >= MIN_GROUP_COUNT and stats["median"] > 0:
+                return {
+                    "diff": price_per_m2 / stats["median"] - 1,
+                    "median": stats["median"],
+                    "count": stats["count"],
+                    "price_per_m2": price_per_m2,
+                    "label": LEVEL_LABELS[level],
+                }
+        return None
+
+    def to_json(self) -> dict:
+        return {
+            "version": self.version,
+            "levels": {level: [[*key, stats] for key, stats in table.items()] for level, table in self.levels.items()},
+            "agencies": self.agencies,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "MarketStats":
+        levels = {level: {tuple(entry[:-1]): entry[-1] for entry in entries} for level, entries in data["levels"].items()}
+        return cls(data.get("version"), levels, data.get("agencies", {}))
+
+
+def _agency_counts(df: pd.DataFrame) -> Dict[str, int]:
+    return {str(domain): int(count) for domain, count in df["domain"].value_counts().items()}
+
+
+def build_market_stats(df: pd.DataFrame, version: Optional[str] = None) -> MarketStats:
+    """Calcula todos os agregados do zero."""
+    data = _price_per_m2(df)
+    levels = {level: _aggregate(data, columns) for level, columns in GROUP_LEVELS.items()}
+    return MarketStats(version, levels, _agency_counts(df))
+
+
+def update_market_stats(previous: MarketStats, df: pd.DataFrame, changed: pd.DataFrame,
+                        version: Optional[str] = None) -> MarketStats:
+    """
+    Atualiza os agregados recalculando apenas os grupos que contêm anúncios alterados
+    (novos, modificados ou removidos, informados em changed com as colunas de agrupamento).
+    """
+    data = _price_per_m2(df)
+    changed = changed[GROUP_COLUMNS].astype(object).copy()
+    changed["bedrooms"] = pd.to_numeric(changed["bedrooms"], errors="coerce")
+
+    levels = {}
+    for level, columns in GROUP_LEVELS.items():
+        table = dict(previous.levels.get(level, {}))
+        # Grupos com chave ausente não existem nos agregados (groupby com dropna=True)
+        affected = changed[columns].dropna().drop_duplicates()
+        if not affected.empty:
+            for key in affected.itertuples(index=False, name=None):
+                table.pop(tuple(_key_value(v) for v in key), None)
+            in_affected = pd.MultiIndex.from_frame(data[columns]).isin(pd.MultiIndex.from_frame(affected))
+            table.update(_aggregate(data[in_affected], columns))
+        levels[level] = table
+    return MarketStats(version, levels, _agency_counts(df))
+
+
+def _changed_rows(version: str, df: pd.DataFrame, previous_version: str) -> Optional[pd.DataFrame]:
+    """Anúncios novos/alterados da versão e anúncios removidos desde a versão anterior."""
+    try:
+        previous = Data_Store.read_dataset(previous_version).select(Data_Store.KEY_COLUMNS + GROUP_COLUMNS).to_pandas()
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Versão anterior {previous_version} indisponível, recalculando os agregados: {e}")
+        return None
+    delta = Data_Store.load_delta(version)
+
+    def listing_keys(frame: pd.DataFrame) -> pd.Series:
+        return frame["domain"].astype(str) + "/" + frame["id"].astype(str)
+
+    previous_keys = listing_keys(previous)
+    removed = previous[~previous_keys.isin(listing_keys(df)).to_numpy()]
+    # Um anúncio alterado pode ter mudado de grupo: o grupo antigo também precisa ser recalculado
+    moved = previous[previous_keys.isin(listing_keys(delta)).to_numpy()] if not delta.empty else previous.iloc[0:0]
+    frames = [frame[GROUP_COLUMNS] for frame in (delta, removed, moved) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=GROUP_COLUMNS)
+
+
+def publish_market_stats(version: Optional[str] = None) -> MarketStats:
+    """
+    Materializa os agregados da versão publicada. Se os agregados salvos forem da versão
+    anterior, recalcula apenas os grupos afetados pelas mudanças.
+    """
+    version = version or Data_Store.dataset_version()
+    df = Data_Store.load_frame(version)
+    metadata = Data_Store.dataset_metadata(version)
+    previous = load_market_stats_file()
+
+    stats = None
+    if previous is not None and previous.version and previous.version == metadata.get("previous_version"):
+        changed = _changed_rows(version, df, previous.version)
+        if changed is not None:
+            stats = update_market_stats(previous, df, changed, version)
+            logging.info(f"Agregados de mercado atualizados de forma incremental ({len(changed)} anúncios alterados).")
+    if stats is None:
+        stats = build_market_stats(df, version)
+        logging.info("Agregados de mercado recalculados do zero.")
+
+    path = Data_Store.data_path(MARKET_STATS_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(stats.to_json(), f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+    return stats
+
+
+def load_market_stats_file() -> Optional[MarketStats]:
+    path = Data_Store.data_path(MARKET_STATS_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return MarketStats.from_json(json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"Não foi possível ler {path}: {e}")
+        return None
+
+
+def load_market_stats(version: Optional[str] = None) -> MarketStats:
+    """
+    Agregados da versão informada (ou da atual), materializando-os se ainda não existirem.
+    """
+    version = version or Data_Store.dataset_version()
+    stats = load_market_stats_file()
+    if stats is None or stats.version != version:
+        stats = publish_market_stats(version)
+    return stats
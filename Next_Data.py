@@ -0,0 +1,4 @@
+import re
+
+# JSON embutido pelo Next.js nas páginas dos sites (listagens e detalhes dos anúncios)
+NEXT_DATA_PATTERN = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
@@ -0,0 +1,225 @@
+from typing import List, Dict, Any, Optional, Union
+import pandas as pd
+import numpy as np
+import logging
+
+# Esquema único gerado por ambos os scrapers (coluna -> dtype)
+SCHEMA = {
+    "source": "string",
+    "domain": "string",
+    "id": "string",
+    "code": "string",
+    "title": "string",
+    "description": "string",
+    "type": "string",
+    "agreement": "string",
+    "exclusivity": "boolean",
+    "neighborhood": "string",
+    "city": "string",
+    "address": "string",
+    "bedrooms": "float64",
+    "bathrooms": "float64",
+    "parking_spaces": "float64",
+    "private_area_m2": "float64",
+    "price": "float64",
+    "latitude": "float64",
+    "longitude": "float64",
+    "image_urls": "string",
+    "property_url": "string",
+}
+
+# Campos das páginas de detalhe dos anúncios (Enrichment.py), mesclados ao dataset publicado
+DETAIL_SCHEMA = {
+    "full_description": "string",
+    "amenities": "string",
+    "total_area_m2": "float64",
+    "usable_area_m2": "float64",
+}
+
+# Colunas do CSV antigo do FrontEnd_Scraper -> campos brutos dos cards
+LEGACY_FRONTEND_COLUMNS = {
+    "bairro": "neighborhood",
+    "endereço": "address",
+    "tipo_negocio": "agreement",
+    "preco": "price",
+    "area": "private_area_m2",
+    "quartos": "bedrooms",
+    "banheiros": "bathrooms",
+    "vagas_de_garagem": "parking_spaces",
+    "id_anuncio": "code",
+    "link_anuncio": "property_url",
+    "flag_exclusivo": "exclusive",
+    "imagens": "images",
+}
+
+Rows = Union[pd.DataFrame, List[Dict[str, Any]]]
+
+
+def _to_frame(rows: Rows) -> pd.DataFrame:
+    if isinstance(rows, pd.DataFrame):
+        return rows.copy()
+    return pd.DataFrame(list(rows))
+
+
+def parse_brl_number(values: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna inteira de valores numéricos para float.
+
+    Aceita números já tipados e textos no formato brasileiro ("R$ 1.234,56", "72,5 m²")
+    ou com ponto decimal ("120.5"). Valores não numéricos viram NaN.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype("float64")
+
+    text = values.astype("string")
+    # Mantém apenas o primeiro número do texto (dígitos, separadores e sinal)
+    number = text.str.extract(r"(-?\d[\d.,]*)", expand=False)
+    has_comma = number.str.contains(",", regex=False).fillna(False)
+    # Sem vírgula, pontos só são separadores de milhar no padrão 1.234 / 1.234.567 (sem sinal:
+    # "-29.698" é uma coordenada com ponto decimal)
+    thousands_only = number.str.fullmatch(r"\d{1,3}(\.\d{3})+").fillna(False)
+    cleaned = number.where(~(has_comma | thousands_only), number.str.replace(".", "", regex=False))
+    cleaned = cleaned.str.replace(",", ".", regex=False)
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def parse_characteristics(characteristics: pd.Series, domains: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Extrai área, quartos, banheiros e vagas das listas de características dos cards
+    (ex: ["72,5 m²", "2 quartos", "1 banheiro", "1 vaga"]), uma lista por linha.
+    Características não reconhecidas são registradas no log (com o site, se informado).
+    """
+    exploded = characteristics.explode().dropna().astype("string")
+    lowered = exploded.str.lower()
+    number = parse_brl_number(exploded)
+
+    is_area = exploded.str.contains("m²", regex=False)
+    is_bedroom = ~is_area & lowered.str.contains("quarto", regex=False)
+    is_bathroom = ~is_area & ~is_bedroom & lowered.str.contains("banheiro", regex=False)
+    is_parking = ~is_area & ~is_bedroom & ~is_bathroom & lowered.str.contains("vaga", regex=False)
+
+    unknown = exploded[~(is_area | is_bedroom | is_bathroom | is_parking)]
+    if not unknown.empty:
+        sites = domains.reindex(unknown.index) if domains is not None else pd.Series(pd.NA, index=unknown.index)
+        for characteristic, site in dict.fromkeys(zip(unknown, sites)):
+            logging.warning(f"Característica desconhecida: {characteristic}. Site: {site}")
+
+    def per_row(mask: pd.Series) -> pd.Series:
+        return number[mask].groupby(level=0).last().reindex(characteristics.index)
+
+    return pd.DataFrame({
+        "private_area_m2": per_row(is_area),
+        "bedrooms": per_row(is_bedroom),
+        "bathrooms": per_row(is_bathroom),
+        "parking_spaces": per_row(is_parking),
+    }, index=characteristics.index)
+
+
+def _parse_bool(values: pd.Series) -> pd.Series:
+    text = values.astype("string").str.strip().str.lower()
+    parsed = text.isin(["true", "sim", "1", "yes"])
+    return parsed.astype("boolean").mask(values.isna())
+
+
+def _finalize(df: pd.DataFrame, schema: Dict[str, str] = SCHEMA) -> pd.DataFrame:
+    """
+    Garante todas as colunas do esquema, na ordem e com os tipos definidos.
+    """
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            df[column] = pd.Series(index=df.index, dtype=dtype)
+        elif dtype == "float64":
+            df[column] = parse_brl_number(df[column])
+        elif dtype == "boolean":
+            df[column] = _parse_bool(df[column])
+        else:
+            df[column] = df[column].astype("string").str.strip().replace("", pd.NA)
+    return df[list(schema)].reset_index(drop=True)
+
+
+def normalize_api(rows: Rows) -> pd.DataFrame:
+    """
+    Normaliza as linhas geradas por RealEstateAPIScraper._parse_property_data.
+    """
+    df = _to_frame(rows)
+    if df.empty:
+        return _finalize(df)
+
+    # IDs numéricos lidos como float (ex: 1283634.0) voltam a ser inteiros antes de virar texto
+    if "id" in df.columns and pd.api.types.is_numeric_dtype(df["id"]):
+        df["id"] = df["id"].astype("Int64")
+    df["source"] = "api"
+    return _finalize(df)
+
+
+def normalize_frontend(rows: Rows) -> pd.DataFrame:
+    """
+    Normaliza os cards brutos do FrontEnd_Scraper/StaticFrontEnd_Scraper, assim como
+    o CSV antigo (colunas site/bairro/preco/...).
+    """
+    df = _to_frame(rows).rename(columns=LEGACY_FRONTEND_COLUMNS)
+    if df.empty:
+        return _finalize(df)
+
+    if "site" in df.columns:
+        df["domain"] = df.pop("site")
+
+    # Características do card preenchem os campos que não vieram separados
+    if "characteristics" in df.columns:
+        characteristics = parse_characteristics(df.pop("characteristics"), df.get("domain"))
+        for column in characteristics.columns:
+            if column in df.columns:
+                df[column] = parse_brl_number(df[column]).fillna(characteristics[column])
+            else:
+                df[column] = characteristics[column]
+
+    if "code" in df.columns:
+        df["code"] = df["code"].astype("string").str.replace("Cód.", "", regex=False).str.strip()
+        df["id"] = df["code"]
+
+    if "exclusive" in df.columns:
+        df["exclusivity"] = df.pop("exclusive")
+
+    if "images" in df.columns:
+        images = df.pop("images").map(lambda urls: " | ".join(urls) if isinstance(urls, (list, tuple, np.ndarray)) else urls)
+        df["image_urls"] = images.astype("string").str.replace(r"\s*\|\s*", " | ", regex=True).replace("", pd.NA)
+
+    # Anúncios sem link usam a URL padrão do imóvel a partir do código
+    if "domain" in df.columns and "code" in df.columns:
+        default_url = "https://www." + df["domain"].astype("string") + "/imovel/" + df["code"]
+        df["property_url"] = df["property_url"].fillna(default_url) if "property_url" in df.columns else default_url
+
+    df["source"] = "frontend"
+    return _finalize(df)
+
+
+def normalize_details(rows: Rows) -> pd.DataFrame:
+    """
+    Normaliza os campos extraídos das páginas de detalhe (chave domain/id + DETAIL_SCHEMA).
+    Amenidades em lista viram texto separado por " | ", como as imagens.
+    """
+    df = _to_frame(rows)
+    if "amenities" in df.columns:
+        df["amenities"] = df["amenities"].map(lambda items: " | ".join(items) if isinstance(items, (list, tuple)) else items)
+    return _finalize(df, {"domain": "string", "id": "string", **DETAIL_SCHEMA})
+
+
+def concat_normalized(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Junta DataFrames já normalizados mantendo o SCHEMA (inclusive quando a lista está vazia).
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return _finalize(pd.DataFrame())
+    return pd.concat(frames, ignore_index=True)
+
+
+def normalize(rows: Rows) -> pd.DataFrame:
+    """
+    Normaliza linhas de qualquer origem, detectando o formato pelas colunas.
+    """
+    df = _to_frame(rows)
+    frontend_columns = {"site", "characteristics", "bairro", "preco"}
+    if frontend_columns & set(df.columns):
+        return normalize_frontend(df)
+    return normalize_api(df)
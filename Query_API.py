@@ -0,0 +1,306 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+import threading
+import argparse
+import hashlib
+import logging
+import base64
+import json
+import gzip
+import time
+import os
+
+import Data_Store
+import Query_Engine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MAX_LIMIT = 200
+DEFAULT_LIMIT = 20
+GZIP_MIN_BYTES = 1024
+
+
+class ListingIndex:
+    """
+    Dataset carregado uma vez por versão, com as permutações de cada ordenação e um
+    cache das máscaras de cada consulta.
+
+    Uma página percorre a permutação da ordenação a partir do cursor e para ao completar
+    o limite, então paginar uma consulta já vista não ordena nem filtra nada de novo.
+
+    Com backend="sql" o dataset não é carregado: cada página é consultada no Parquet
+    publicado pelo SQL_Backend (útil quando o dataset não cabe na memória).
+    """
+
+    def __init__(self, cache_size: int = 256, reload_interval: float = 2.0, backend: str = "pandas"):
+        self.backend = backend
+        self.sql_engine = None
+        self.count = 0
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._checked_at = 0.0
+        self._tags_mtime = None
+        self.version = None
+        self.df = pd.DataFrame()
+        self.sort_index = None
+        self.user_tags = {}
+
+    def refresh(self):
+        """Recarrega o dataset e as tags quando uma nova versão for publicada."""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = Data_Store.dataset_version()
+            if version is not None and version != self.version:
+                if self.backend == "sql":
+                    from SQL_Backend import SQLQueryEngine
+                    self.sql_engine = SQLQueryEngine(version=version)
+                    self.count = self.sql_engine.count()
+                else:
+                    self.df = Data_Store.load_frame(version)
+                    self.sort_index = Query_Engine.SortIndex(self.df)
+                    self.count = len(self.df)
+                self.version = version
+                self._results.clear()
+                logging.info(f"Dataset versão {version} carregado ({self.count} imóveis, backend {self.backend}).")
+
+            tags_file = Data_Store.data_path('user_tags.json')
+            tags_mtime = os.path.getmtime(tags_file) if os.path.exists(tags_file) else None
+            if tags_mtime != self._tags_mtime:
+                user_tags = {}
+                if tags_mtime is not None:
+                    # O main.py grava o arquivo no lugar: uma leitura no meio da gravação falha,
+                    # e as tags anteriores são mantidas até a próxima verificação
+                    try:
+                        with open(tags_file, 'r', encoding='utf-8') as f:
+                            user_tags = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logging.warning(f"Não foi possível ler {tags_file}, mantendo as tags anteriores: {e}")
+                        return
+                self.user_tags = user_tags
+                self._tags_mtime = tags_mtime
+                self._results.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Estado consistente (versão, dataset, ordenações e tags) para atender uma requisição
+        inteira, mesmo que refresh() carregue outra versão no meio dela.
+        """
+        with self._lock:
+            return {
+                "version": self.version,
+                "tags_mtime": self._tags_mtime,
+                "df": self.df,
+                "sort_index": self.sort_index,
+                "sql_engine": self.sql_engine,
+                "user_tags": self.user_tags,
+            }
+
+    @staticmethod
+    def etag_version(snapshot: dict) -> str:
+        return f"{snapshot['version']}-{snapshot['tags_mtime']}"
+
+    def mask(self, filters: dict, sort: str, snapshot: Optional[dict] = None) -> Tuple[str, np.ndarray, int]:
+        """Máscara das linhas do snapshot que atendem aos filtros e o total de resultados (com cache LRU)."""
+        snapshot = snapshot or self.snapshot()
+        key = Query_Engine.query_key(filters, sort)
+        cache_key = (self.etag_version(snapshot), key)
+        with self._lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                return (key, *self._results[cache_key])
+
+        mask = Query_Engine.filter_mask(snapshot["df"], filters, snapshot["user_tags"])
+        result = (mask, int(mask.sum()))
+
+        with self._lock:
+            # Uma máscara de uma versão (ou de tags) que já foi substituída não entra no cache
+            if snapshot["version"] == self.version and snapshot["tags_mtime"] == self._tags_mtime:
+                self._results[cache_key] = result
+                while len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+        return (key, *result)
+
+    def page(self, filters: dict, sort: str, limit: int, after: Optional[dict],
+             snapshot: Optional[dict] = None) -> Tuple[pd.DataFrame, int, Optional[dict]]:
+        """Linhas da página a partir do cursor, o total e o cursor da próxima página (None na última)."""
+        snapshot = snapshot or self.snapshot()
+        if self.backend == "sql":
+            return snapshot["sql_engine"].page(filters, snapshot["user_tags"], sort, limit, after)
+
+        _, mask, total = self.mask(filters, sort, snapshot)
+        sort_index = snapshot["sort_index"]
+        # Uma linha a mais indica se existe uma próxima página
+        positions = sort_index.page(mask, sort, limit + 1, after)
+        next_after = sort_index.cursor(sort, int(positions[limit - 1])) if len(positions) > limit else None
+        return snapshot["df"].iloc[positions[:limit]], total, next_after
+
+
+def encode_cursor(key: str, after: dict) -> str:
+    """Cursor da próxima página: a consulta e o último anúncio entregue (valor da ordenação + chave)."""
+    raw = json.dumps({"q": key, "a": after}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodifica e valida um cursor; levanta ValueError se ele não tiver o formato de encode_cursor."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    after = state.get("a") if isinstance(state, dict) else None
+    if not isinstance(after, dict) or not isinstance(state.get("q"), str):
+        raise ValueError("Cursor inválido")
+    value, key = after.get("value"), after.get("key")
+    if not isinstance(key, str) or not (value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))):
+        raise ValueError("Cursor inválido")
+    return state
+
+
+def filters_from_query(params: Dict[str, List[str]]) -> Tuple[dict, str, int, Optional[str]]:
+    """
+    Converte os parâmetros da URL nos filtros do Query_Engine.
+
+    Parâmetros repetíveis: type, neighborhood, agency, bedrooms, bathrooms, parking, tag.
+    Faixas: price_min, price_max, area_min, area_max. Parâmetros ausentes não filtram
+    (diferente da sidebar, que começa com os filtros padrão).
+    """
+    def single(name: str, default=None):
+        values = params.get(name)
+        return values[0] if values else default
+
+    def bound(name: str) -> Optional[float]:
+        value = single(name)
+        return None if value is None or value == "" else float(value)
+
+    filters = {
+        **Query_Engine.NO_FILTERS,
+        "city": single("city"),
+        "types": params.get("type", []),
+        "neighborhoods": params.get("neighborhood", []),
+        "agencies": params.get("agency", []),
+        "price_range": (bound("price_min"), bound("price_max")),
+        "area_range": (bound("area_min"), bound("area_max")),
+        "bedrooms": params.get("bedrooms", []),
+        "bathrooms": params.get("bathrooms", []),
+        "parking_spaces": params.get("parking", []),
+        "show_discarded": single("show_discarded", "0").lower() in ("1", "true", "sim"),
+        "tags": params.get("tag", []),
+    }
+    sort = single("sort", Query_Engine.DEFAULT_SORT)
+    if sort not in Query_Engine.SORT_OPTIONS:
+        raise ValueError(f"Ordenação inválida: {sort}")
+    limit = max(1, min(MAX_LIMIT, int(single("limit", DEFAULT_LIMIT))))
+    return Query_Engine.normalize_filters(filters), sort, limit, single("cursor")
+
+
+def records(df: pd.DataFrame) -> List[dict]:
+    """Converte as linhas em dicionários serializáveis (nulos viram None)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class QueryAPIHandler(BaseHTTPRequestHandler):
+    server_version = "ImoveisQueryAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    index: ListingIndex = None
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def _send_json(self, status: int, payload: dict, etag: Optional[str] = None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        headers = {"Content-Type": "application/json; charset=utf-8", "Vary": "Accept-Encoding"}
+        if etag:
+            headers["ETag"] = etag
+            headers["Cache-Control"] = "no-cache"
+        if len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_not_modified(self, etag: str):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        index = self.index
+        index.refresh()
+        snapshot = index.snapshot()
+
+        if url.path == "/health":
+            return self._send_json(200, {"status": "ok"})
+        if url.path == "/version":
+            return self._send_json(200, {"version": snapshot["version"], "count": index.count})
+        if url.path != "/listings":
+            return self._send_json(404, {"error": "Endpoint não encontrado"})
+        if snapshot["version"] is None:
+            return self._send_json(503, {"error": "Nenhum dataset publicado"})
+
+        try:
+            filters, sort, limit, cursor = filters_from_query(parse_qs(url.query))
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+
+        key = Query_Engine.query_key(filters, sort)
+        after = None
+        if cursor:
+            try:
+                state = decode_cursor(cursor)
+            except ValueError:
+                return self._send_json(400, {"error": "Cursor inválido"})
+            if state.get("q") != key:
+                return self._send_json(410, {"error": "Cursor expirado: a consulta mudou"})
+            after = state.get("a")
+
+        etag = f'W/"{hashlib.sha1(f"{index.etag_version(snapshot)}:{key}:{cursor}:{limit}".encode()).hexdigest()[:20]}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send_not_modified(etag)
+
+        rows, total, next_after = index.page(filters, sort, limit, after, snapshot)
+        payload = {
+            "version": snapshot["version"],
+            "total": total,
+            "items": records(rows),
+            "next_cursor": encode_cursor(key, next_after) if next_after else None,
+        }
+        self._send_json(200, payload, etag=etag)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, backend: str = "pandas"):
+    """
+    Inicia a API JSON local de consulta aos imóveis.
+    """
+    QueryAPIHandler.index = ListingIndex(backend=backend)
+    QueryAPIHandler.index.refresh()
+    server = ThreadingHTTPServer((host, port), QueryAPIHandler)
+    logging.info(f"API de consulta disponível em http://{host}:{port}/listings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON local de consulta aos imóveis.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--backend", choices=["pandas", "sql"], default="pandas",
+                        help="sql consulta o Parquet publicado via DuckDB, sem carregar o dataset")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.backend)
@@ -0,0 +1,398 @@
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+
+# Opções dos filtros por faixa (o último valor "4+" inclui todos os maiores)
+BUCKET_OPTIONS = {
+    "bedrooms": ["1", "2", "3", "4+"],
+    "bathrooms": ["1", "2", "3", "4+"],
+    "parking_spaces": ["0", "1", "2", "3", "4+"],
+}
+
+# Filtros padrão, iguais aos valores iniciais da sidebar
+DEFAULT_FILTERS = {
+    "city": "Santa Cruz do Sul",
+    "types": ["Apartamento"],
+    "neighborhoods": [],
+    "agencies": [],
+    "price_range": (100000.0, 500000.0),
+    "area_range": (30.0, 200.0),
+    "bedrooms": [],
+    "bathrooms": [],
+    "parking_spaces": [],
+    "show_discarded": False,
+    "tags": [],
+    "new_since": None,
+}
+
+# Filtros sem restrições (padrão da API JSON): faixas com limites None ficam abertas
+NO_FILTERS = {
+    **DEFAULT_FILTERS,
+    "city": None,
+    "types": [],
+    "price_range": (None, None),
+    "area_range": (None, None),
+}
+
+# Facetas exibidas com contagens (chave do filtro -> coluna)
+FACET_COLUMNS = {
+    "types": "type",
+    "neighborhoods": "neighborhood",
+    "agencies": "domain",
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "parking_spaces": "parking_spaces",
+}
+
+# Ordenações disponíveis (chave -> coluna, crescente). price_per_m2 é calculada a partir do preço e da área
+SORT_OPTIONS = {
+    "price_asc": ("price", True),
+    "price_desc": ("price", False),
+    "price_per_m2_asc": ("price_per_m2", True),
+    "area_desc": ("private_area_m2", False),
+    "newest": ("first_seen", False),
+}
+DEFAULT_SORT = "price_asc"
+
+
+def normalize_filters(filters: Optional[dict] = None) -> dict:
+    """
+    Completa os filtros com os valores padrão e padroniza os tipos (listas e tuplas).
+    """
+    normalized = dict(DEFAULT_FILTERS)
+    normalized.update({key: value for key, value in (filters or {}).items() if key in DEFAULT_FILTERS})
+    for key in ("types", "neighborhoods", "agencies", "bedrooms", "bathrooms", "parking_spaces", "tags"):
+        normalized[key] = sorted(str(value) for value in (normalized[key] or []))
+    for key in ("price_range", "area_range"):
+        low, high = normalized[key]
+        normalized[key] = (None if low is None else float(low), None if high is None else float(high))
+    normalized["show_discarded"] = bool(normalized["show_discarded"])
+    if normalized["new_since"] is not None:
+        normalized["new_since"] = float(normalized["new_since"])
+    return normalized
+
+
+def _contains_any(series: pd.Series, values: List[str]) -> np.ndarray:
+    mask = np.zeros(len(series), dtype=bool)
+    for value in values:
+        mask |= series.str.contains(value, case=False, na=False, regex=False).to_numpy(dtype=bool)
+    return mask
+
+
+def _bucket_mask(series: pd.Series, selected: List[str]) -> np.ndarray:
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    mask = np.zeros(len(values), dtype=bool)
+    if "4+" in selected:
+        mask |= values >= 4
+    numeric = [int(value) for value in selected if value.isdigit()]
+    if numeric:
+        mask |= np.isin(values, numeric)
+    return mask
+
+
+class FacetIndex:
+    """
+    Códigos inteiros das colunas categóricas de um DataFrame, calculados uma vez por versão.
+
+    Com os códigos, filtros de texto são avaliados apenas sobre os valores distintos e as
+    contagens das facetas saem de um np.bincount, sem operações de texto por linha.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self.codes = {}
+        self.labels = {}
+        for key, column in list(FACET_COLUMNS.items()) + [("city", "city")]:
+            if key in BUCKET_OPTIONS:
+                self.labels[key] = list(BUCKET_OPTIONS[key])
+                self.codes[key] = self._bucket_codes(df[column], self.labels[key])
+            else:
+                codes, uniques = pd.factorize(df[column].astype(object), sort=True)
+                self.codes[key] = codes.astype(np.int32)
+                self.labels[key] = [str(value) for value in uniques]
+
+    @staticmethod
+    def _bucket_codes(series: pd.Series, labels: List[str]) -> np.ndarray:
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        lookup = {float(label): i for i, label in enumerate(labels) if label.isdigit()}
+        codes = np.full(len(values), -1, dtype=np.int32)
+        for value, code in lookup.items():
+            codes[values == value] = code
+        if "4+" in labels:
+            codes[values >= 4] = labels.index("4+")
+        return codes
+
+    def label_mask(self, key: str, matches) -> np.ndarray:
+        """Máscara das linhas cujo valor (distinto) atende ao predicado matches(label)."""
+        lookup = np.array([bool(matches(label)) for label in self.labels[key]] + [False])
+        # Código -1 (nulo) indexa a última posição, sempre False
+        return lookup[self.codes[key]]
+
+    def counts(self, key: str, mask: np.ndarray) -> Dict[str, int]:
+        """Contagem de cada valor da faceta entre as linhas selecionadas pela máscara."""
+        codes = self.codes[key][mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.labels[key]))
+        return dict(zip(self.labels[key], counts.tolist()))
+
+
+def facet_counts(df: pd.DataFrame, filters: dict, user_tags: Optional[Dict[str, str]] = None,
+                 index: Optional[FacetIndex] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Contagens de cada faceta sob os filtros atuais, ignorando a seleção da própria faceta
+    (ex: quantos imóveis cada bairro teria se fosse escolhido junto com os demais filtros).
+
+    As máscaras "todas menos uma" saem de produtos acumulados (prefixo/sufixo), então
+    o custo é linear no número de filtros.
+    """
+    index = index or FacetIndex(df)
+    masks = build_masks(df, filters, user_tags, index=index)
+    names = list(masks)
+    ones = np.ones(len(df), dtype=bool)
+
+    prefix = [ones]
+    for name in names:
+        prefix.append(prefix[-1] & masks[name])
+    suffix = [ones]
+    for name in reversed(names):
+        suffix.append(suffix[-1] & masks[name])
+    suffix.reverse()
+
+    result = {}
+    for key in FACET_COLUMNS:
+        if key in masks:
+            i = names.index(key)
+            excluding = prefix[i] & suffix[i + 1]
+        else:
+            excluding = prefix[-1]
+        result[key] = index.counts(key, excluding)
+    return result
+
+
+def build_masks(df: pd.DataFrame, filters: dict, user_tags: Optional[Dict[str, str]] = None,
+                cache: Optional[dict] = None, index: Optional[FacetIndex] = None) -> Dict[str, np.ndarray]:
+    """
+    Calcula uma máscara booleana por filtro ativo. Filtros inativos não aparecem no resultado.
+
+    Ao avaliar muitas consultas sobre o mesmo DataFrame (ex: buscas salvas), um dicionário
+    passado em cache reaproveita as máscaras de valores repetidos entre elas. Com um
+    FacetIndex do mesmo DataFrame, os filtros de texto usam os códigos inteiros.
+    """
+    filters = normalize_filters(filters)
+    user_tags = user_tags or {}
+    cache = {} if cache is None else cache
+    masks = {}
+
+    def cached(key, compute):
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def numeric(column: str) -> np.ndarray:
+        return cached(("column", column), lambda: df[column].to_numpy(dtype="float64", na_value=np.nan))
+
+    def contains_any(key: str, column: str, values: List[str]) -> np.ndarray:
+        if index is not None:
+            lowered = [value.lower() for value in values]
+            return index.label_mask(key, lambda label: any(value in label.lower() for value in lowered))
+        return _contains_any(df[column], values)
+
+    if filters["city"]:
+        masks["city"] = cached(("city", filters["city"]), lambda: contains_any("city", "city", [filters["city"]]))
+    if filters["types"]:
+        masks["types"] = cached(("types", tuple(filters["types"])), lambda: contains_any("types", "type", filters["types"]))
+
+    # Faixas com os dois limites abertos não filtram (nem excluem valores ausentes)
+    for key, column in (("price_range", "price"), ("area_range", "private_area_m2")):
+        low, high = filters[key]
+        if low is None and high is None:
+            continue
+        values = numeric(column)
+        mask = ~np.isnan(values)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        masks[key] = mask
+
+    for key in ("neighborhoods", "agencies"):
+        if filters[key]:
+            selected = set(filters[key])
+            masks[key] = cached((key, tuple(filters[key])), lambda: (
+                index.label_mask(key, lambda label: label in selected) if index is not None
+                else df[FACET_COLUMNS[key]].isin(filters[key]).to_numpy(dtype=bool)
+            ))
+    for column in BUCKET_OPTIONS:
+        if filters[column]:
+            masks[column] = cached((column, tuple(filters[column])), lambda: (
+                index.label_mask(column, lambda label: label in filters[column]) if index is not None
+                else _bucket_mask(df[column], filters[column])
+            ))
+
+    # Apenas anúncios novos ou alterados depois do momento informado
+    if filters["new_since"] is not None and "updated_at" in df.columns:
+        masks["new_since"] = numeric("updated_at") > filters["new_since"]
+
+    # Tags do usuário
+    if not filters["show_discarded"] or filters["tags"]:
+        ids = cached(("column", "id"), lambda: df["id"].astype(str))
+        if not filters["show_discarded"]:
+            # Por padrão, ocultar imóveis marcados como descartados
+            discarded_ids = [prop_id for prop_id, tag in user_tags.items() if tag == "discarded"]
+            masks["discarded"] = cached(("discarded",), lambda: ~ids.isin(discarded_ids).to_numpy(dtype=bool))
+        if filters["tags"]:
+            # Apenas imóveis com as tags selecionadas
+            tagged_ids = [prop_id for prop_id, tag in user_tags.items() if tag in filters["tags"]]
+            masks["tags"] = cached(("tags", tuple(filters["tags"])), lambda: ids.isin(tagged_ids).to_numpy(dtype=bool))
+
+    return masks
+
+
+def filter_mask(df: pd.DataFrame, filters: dict, user_tags: Optional[Dict[str, str]] = None,
+                cache: Optional[dict] = None, index: Optional[FacetIndex] = None) -> np.ndarray:
+    """
+    Máscara booleana com todos os filtros aplicados.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for partial in build_masks(df, filters, user_tags, cache, index).values():
+        mask &= partial
+    return mask
+
+
+def apply_filters(df: pd.DataFrame, filters: dict, user_tags: Optional[Dict[str, str]] = None,
+                  index: Optional[FacetIndex] = None) -> pd.DataFrame:
+    """
+    Retorna apenas as linhas que atendem a todos os filtros.
+    """
+    return df[filter_mask(df, filters, user_tags, index=index)]
+
+
+def sort_values(df: pd.DataFrame, sort: str = DEFAULT_SORT) -> np.ndarray:
+    """
+    Valores usados pela ordenação, sempre em ordem crescente (ordenações decrescentes
+    têm o sinal invertido). Valores ausentes são NaN e ficam no fim.
+    """
+    column, ascending = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])
+    if column == "price_per_m2":
+        price = df["price"].to_numpy(dtype="float64", na_value=np.nan)
+        area = df["private_area_m2"].to_numpy(dtype="float64", na_value=np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(area > 0, price / area, np.nan)
+    elif column in df.columns:
+        values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        values = np.full(len(df), np.nan)
+    return values if ascending else -values
+
+
+def sorted_positions(df: pd.DataFrame, mask: np.ndarray, sort: str = DEFAULT_SORT) -> np.ndarray:
+    """
+    Posições (iloc) das linhas selecionadas pela máscara, na ordem escolhida (ordenação estável).
+    """
+    selected = np.flatnonzero(mask)
+    order = np.argsort(sort_values(df, sort)[selected], kind="stable")
+    return selected[order]
+
+
+class SortIndex:
+    """
+    Permutações do DataFrame para cada ordenação, calculadas uma vez por versão.
+
+    Empates são desfeitos pela chave do anúncio (domain/id), então a posição de um anúncio
+    na ordem é identificada por (valor, chave). Os cursores guardam esse par (keyset) e
+    continuam válidos mesmo depois de uma nova publicação. Uma página percorre a permutação
+    a partir do cursor e para assim que encontra limit linhas que atendem aos filtros.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self.keys = (df["domain"].astype(str) + "/" + df["id"].astype(str)).to_numpy(dtype=object)
+        key_rank, _ = pd.factorize(self.keys, sort=True)
+        self.orders = {}
+        self.values = {}
+        for sort in SORT_OPTIONS:
+            values = sort_values(df, sort)
+            self.values[sort] = values
+            # lexsort: a última chave é a principal; NaN fica no fim
+            permutation = np.lexsort((key_rank, values))
+            self.orders[sort] = (permutation, values[permutation], self.keys[permutation])
+
+    def cursor(self, sort: str, position: int) -> dict:
+        """Cursor (keyset) que continua a listagem logo depois da linha na posição informada."""
+        sort = sort if sort in self.orders else DEFAULT_SORT
+        value = self.values[sort][position]
+        return {"value": None if np.isnan(value) else float(value), "key": str(self.keys[position])}
+
+    def _resume(self, sort: str, cursor: dict) -> int:
+        """Primeira posição da permutação depois do anúncio do cursor."""
+        _, values, keys = self.orders[sort]
+        value = np.nan if cursor.get("value") is None else float(cursor["value"])
+        low = int(np.searchsorted(values, value, side="left"))
+        high = len(values) if np.isnan(value) else int(np.searchsorted(values, value, side="right"))
+        return low + int(np.searchsorted(keys[low:high], str(cursor.get("key", "")), side="right"))
+
+    def page(self, mask: np.ndarray, sort: str = DEFAULT_SORT, limit: int = 20,
+             after: Optional[dict] = None) -> np.ndarray:
+        """
+        Posições (iloc) da próxima página: as primeiras limit linhas da máscara na ordem
+        escolhida, a partir do cursor (ou do início).
+        """
+        sort = sort if sort in self.orders else DEFAULT_SORT
+        permutation = self.orders[sort][0]
+        start = self._resume(sort, after) if after else 0
+        chunk = max(limit * 8, 256)
+        found, remaining = [], limit
+        while remaining > 0 and start < self.size:
+            candidates = permutation[start:start + chunk]
+            hits = candidates[mask[candidates]][:remaining]
+            found.append(hits)
+            remaining -= len(hits)
+            start += chunk
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def last_page(self, mask: np.ndarray, sort: str = DEFAULT_SORT, count: int = 20) -> np.ndarray:
+        """As últimas count linhas da máscara na ordem escolhida (percorrendo a permutação do fim)."""
+        sort = sort if sort in self.orders else DEFAULT_SORT
+        reversed_permutation = self.orders[sort][0][::-1]
+        chunk = max(count * 8, 256)
+        found, remaining, start = [], count, 0
+        while remaining > 0 and start < self.size:
+            candidates = reversed_permutation[start:start + chunk]
+            hits = candidates[mask[candidates]][:remaining]
+            found.append(hits)
+            remaining -= len(hits)
+            start += chunk
+        return np.concatenate(found)[::-1] if found else np.empty(0, dtype=np.intp)
+
+    def page_at(self, mask: np.ndarray, sort: str = DEFAULT_SORT, offset: int = 0, limit: int = 20) -> np.ndarray:
+        """Página por deslocamento, para saltos sem cursor (percorre a permutação inteira, sem ordenar)."""
+        sort = sort if sort in self.orders else DEFAULT_SORT
+        permutation = self.orders[sort][0]
+        return permutation[mask[permutation]][offset:offset + limit]
+
+
+def sort_listings(df: pd.DataFrame, sort: str = DEFAULT_SORT) -> pd.DataFrame:
+    """
+    Ordena os imóveis pela opção escolhida.
+    """
+    return df.iloc[sorted_positions(df, np.ones(len(df), dtype=bool), sort)]
+
+
+def query(df: pd.DataFrame, filters: dict, user_tags: Optional[Dict[str, str]] = None, sort: str = DEFAULT_SORT,
+          offset: int = 0, limit: int = 20, sort_index: Optional[SortIndex] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Aplica filtros e ordenação e retorna uma página de resultados junto com o total.
+    Com um SortIndex do mesmo DataFrame, a ordenação usa as permutações pré-calculadas.
+    """
+    mask = filter_mask(df, filters, user_tags)
+    if sort_index is not None:
+        return df.iloc[sort_index.page_at(mask, sort, offset, limit)], int(mask.sum())
+    positions = sorted_positions(df, mask, sort)
+    return df.iloc[positions[offset:offset + limit]], len(positions)
+
+
+def query_key(filters: dict, sort: str) -> str:
+    """Identificador estável de uma consulta (filtros normalizados + ordenação)."""
+    payload = json.dumps({"filters": normalize_filters(filters), "sort": sort}, sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
@@ -0,0 +1,157 @@
+from contextlib import contextmanager, nullcontext
+from collections import deque
+from typing import Callable, List, Optional
+import tracemalloc
+import cProfile
+import logging
+import threading
+import pstats
+import time
+import os
+
+import Data_Store
+
+# Ativa a instrumentação para todas as sessões (também pode ser ativada com ?profile=1 na URL)
+PROFILE_ENV_VAR = "IMOVEIS_PROFILE"
+PROFILES_DIR = "profiles"
+
+
+def profiling_enabled_by_env() -> bool:
+    return os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "sim")
+
+
+# Medições de memória em andamento no processo (o pico do tracemalloc é um só para todos)
+_measuring_lock = threading.Lock()
+_measuring = 0
+
+
+class RerunProfiler:
+    """
+    Mede o tempo, a memória alocada e o pico de memória de cada etapa de um rerun.
+
+    Desativado, stage() devolve um contexto vazio e não há custo. A memória só é medida
+    com IMOVEIS_PROFILE=1, que liga o tracemalloc para o processo inteiro; com ?profile=1
+    apenas os tempos são medidos, sem custo para as demais sessões. Com várias sessões
+    simultâneas as alocações de outras sessões também entram na conta, e o pico só é
+    informado quando nenhuma outra etapa estava sendo medida no início da etapa.
+    """
+
+    def __init__(self, history: int = 20):
+        self.enabled = False
+        self.history = deque(maxlen=history)
+        self.profile_next = False
+        self.dumps: List[str] = []
+        self._current: Optional[dict] = None
+        # Maior pico do tracemalloc visto no rerun atual (as etapas zeram o pico global)
+        self._run_peak = 0
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+        if enabled and profiling_enabled_by_env() and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def _measure(self, name: str):
+        global _measuring
+        tracing = tracemalloc.is_tracing()
+        exclusive = False
+        if tracing:
+            with _measuring_lock:
+                exclusive = self._reset_peak_if_idle()
+                _measuring += 1
+            current_before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stage = {"stage": name, "ms": elapsed_ms, "alloc_kb": None, "peak_kb": None}
+            if tracing:
+                current_after, peak = tracemalloc.get_traced_memory()
+                self._run_peak = max(self._run_peak, peak)
+                with _measuring_lock:
+                    _measuring -= 1
+                stage["alloc_kb"] = (current_after - current_before) / 1024
+                if exclusive:
+                    stage["peak_kb"] = max(0, peak - current_before) / 1024
+            self._current["stages"].append(stage)
+
+    def _reset_peak_if_idle(self) -> bool:
+        """
+        Zera o pico do tracemalloc se nenhuma etapa estiver sendo medida (zerar no meio da
+        etapa de outra sessão estragaria a medição dela). Chamada com _measuring_lock.
+        """
+        if _measuring:
+            return False
+        self._run_peak = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        return True
+
+    def stage(self, name: str):
+        """Contexto que mede uma etapa do rerun atual (sem efeito fora de um rerun medido)."""
+        if not self.enabled or self._current is None:
+            return nullcontext()
+        return self._measure(name)
+
+    def run(self, func: Callable[[], None], fragment: Optional[str] = None):
+        """
+        Executa um rerun medindo o tempo total. Se um cProfile foi pedido, grava as
+        estatísticas do rerun em data/profiles/rerun-<momento>.prof.
+
+        Com fragment, é o rerun isolado de um fragmento (ex: troca de página); dentro de um
+        rerun completo o fragmento já é medido pela etapa que o chama e func roda direto.
+        """
+        if not self.enabled or self._current is not None:
+            return func()
+
+        self._current = {"started_at": time.time(), "fragment": fragment, "stages": []}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # O pico de cada rerun parte do uso atual, e não do maior uso desde o início do processo
+            with _measuring_lock:
+                self._reset_peak_if_idle()
+            self._run_peak = 0
+            memory_before = tracemalloc.get_traced_memory()[0]
+        profile = cProfile.Profile() if self.profile_next else None
+        started = time.perf_counter()
+        try:
+            if profile is not None:
+                self.profile_next = False
+                return profile.runcall(func)
+            return func()
+        finally:
+            self._current["total_ms"] = (time.perf_counter() - started) * 1000
+            self._current["peak_kb"] = None
+            if tracing:
+                peak = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+                self._current["peak_kb"] = max(0, peak - memory_before) / 1024
+            if profile is not None:
+                self._current["profile"] = self._dump(profile)
+            self.history.appendleft(self._current)
+            self._current = None
+
+    def _dump(self, profile: cProfile.Profile) -> Optional[str]:
+        """Grava o cProfile (abre no snakeviz, ou vira flame graph com flameprof/gprof2dot)."""
+        directory = Data_Store.data_path(PROFILES_DIR)
+        path = os.path.join(directory, f"rerun-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            pstats.Stats(profile).dump_stats(path)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar o cProfile em {path}: {e}")
+            return None
+        self.dumps.append(path)
+        return path
+
+    def top_functions(self, path: str, limit: int = 15) -> List[dict]:
+        """Funções com maior tempo acumulado de um cProfile gravado."""
+        stats = pstats.Stats(path)
+        rows = []
+        for (file_name, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                "função": f"{function} ({os.path.basename(file_name)}:{line})",
+                "chamadas": calls,
+                "total_ms": total * 1000,
+                "acumulado_ms": cumulative * 1000,
+            })
+        return sorted(rows, key=lambda row: -row["acumulado_ms"])[:limit]
@@ -0,0 +1,304 @@
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+import tempfile
+import argparse
+import logging
+import time
+import os
+
+import Data_Store
+import Query_Engine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Colunas retornadas por padrão (as exibidas nos cards e na API)
+DEFAULT_COLUMNS = [
+    "domain", "id", "code", "title", "type", "neighborhood", "city", "bedrooms", "bathrooms",
+    "parking_spaces", "private_area_m2", "price", "latitude", "longitude", "image_urls",
+    "property_url", "first_seen", "updated_at",
+]
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("O backend SQL precisa do DuckDB: pip install duckdb") from e
+    return duckdb
+
+
+def _sort_expression(sort: str) -> str:
+    """Valor de ordenação sempre crescente, como Query_Engine.sort_values (decrescentes com sinal invertido)."""
+    column, ascending = Query_Engine.SORT_OPTIONS.get(sort, Query_Engine.SORT_OPTIONS[Query_Engine.DEFAULT_SORT])
+    if column == "price_per_m2":
+        expression = "CASE WHEN private_area_m2 > 0 THEN price / private_area_m2 END"
+    else:
+        expression = f'CAST("{column}" AS DOUBLE)'
+    return expression if ascending else f"-({expression})"
+
+
+def build_where(filters: dict, user_tags: Optional[Dict[str, str]] = None,
+                cities: Optional[List[str]] = None) -> Tuple[str, list]:
+    """
+    Converte os filtros do Query_Engine em uma cláusula WHERE com parâmetros, com a mesma
+    semântica de Query_Engine.build_masks (textos por "contém", sem diferenciar maiúsculas).
+
+    Com cities (os valores distintos da coluna city), o filtro de cidade vira uma igualdade
+    com as cidades que contêm o texto pedido: ao contrário de contains(), city IN (...) é
+    comparado com as estatísticas de cada row group e os grupos de outras cidades são pulados.
+    """
+    filters = Query_Engine.normalize_filters(filters)
+    user_tags = user_tags or {}
+    clauses, params = [], []
+
+    def contains_any(column: str, values: List[str]):
+        clauses.append("(" + " OR ".join(f"contains(lower({column}), ?)" for _ in values) + ")")
+        params.extend(value.lower() for value in values)
+
+    if filters["city"] and cities is not None:
+        matches = pd.Series(cities, dtype="string").str.contains(filters["city"], case=False, regex=False)
+        matching = [city for city, match in zip(cities, matches) if match]
+        clauses.append(f"city IN ({', '.join('?' for _ in matching)})" if matching else "FALSE")
+        params.extend(matching)
+    elif filters["city"]:
+        contains_any("city", [filters["city"]])
+    if filters["types"]:
+        contains_any("type", filters["types"])
+
+    for key, column in (("price_range", "price"), ("area_range", "private_area_m2")):
+        low, high = filters[key]
+        if low is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(high)
+
+    for key in ("neighborhoods", "agencies"):
+        if filters[key]:
+            clauses.append(f"{Query_Engine.FACET_COLUMNS[key]} IN ({', '.join('?' for _ in filters[key])})")
+            params.extend(filters[key])
+
+    for column in Query_Engine.BUCKET_OPTIONS:
+        if filters[column]:
+            numeric = [int(value) for value in filters[column] if value.isdigit()]
+            options = []
+            if numeric:
+                options.append(f"{column} IN ({', '.join('?' for _ in numeric)})")
+                params.extend(numeric)
+            if "4+" in filters[column]:
+                options.append(f"{column} >= 4")
+            # Nenhuma opção reconhecida: nenhum anúncio corresponde (como em Query_Engine.build_masks)
+            clauses.append("(" + " OR ".join(options) + ")" if options else "FALSE")
+
+    if filters["new_since"] is not None:
+        clauses.append("updated_at > ?")
+        params.append(filters["new_since"])
+
+    if not filters["show_discarded"]:
+        discarded_ids = [prop_id for prop_id, tag in user_tags.items() if tag == "discarded"]
+        if discarded_ids:
+            clauses.append("NOT list_contains(?::VARCHAR[], CAST(id AS VARCHAR))")
+            params.append(discarded_ids)
+    if filters["tags"]:
+        tagged_ids = [prop_id for prop_id, tag in user_tags.items() if tag in filters["tags"]]
+        clauses.append("list_contains(?::VARCHAR[], CAST(id AS VARCHAR))")
+        params.append(tagged_ids)
+
+    return " AND ".join(clauses) or "TRUE", params
+
+
+class SQLQueryEngine:
+    """
+    Consultas dos filtros executadas em SQL (DuckDB) direto sobre o Parquet publicado.
+
+    Só as colunas pedidas são lidas e os filtros são empurrados para a leitura do
+    Parquet (row groups fora da cidade/faixa de preço são pulados pelas estatísticas;
+    o filtro de cidade é reescrito como igualdade com as cidades distintas), então uma
+    consulta retorna apenas a página atual e o total, sem carregar o dataset.
+    A ordem e os cursores (valor da ordenação + chave domain/id) são os mesmos do
+    Query_Engine.SortIndex.
+
+    Usado apenas pela Query_API (--backend sql). A interface Streamlit (main.py) não usa
+    este backend: o mapa, os semelhantes, as recomendações e as contagens das facetas
+    precisam do dataset inteiro em memória, que ela já carrega mapeado do Arrow IPC.
+    """
+
+    def __init__(self, path: Optional[str] = None, version: Optional[str] = None):
+        self.path = path or Data_Store.parquet_path(version)
+        if self.path is None or not os.path.exists(self.path):
+            raise FileNotFoundError(f"Parquet do dataset não encontrado: {self.path}")
+        self._connection = _duckdb().connect(database=":memory:")
+        escaped = self.path.replace("'", "''")
+        self._connection.execute(f"CREATE VIEW listings AS SELECT * FROM read_parquet('{escaped}')")
+        self.cities = [row[0] for row in self._connection.execute(
+            "SELECT DISTINCT CAST(city AS VARCHAR) FROM listings WHERE city IS NOT NULL").fetchall()]
+
+    def count(self, filters: Optional[dict] = None, user_tags: Optional[Dict[str, str]] = None) -> int:
+        where, params = build_where(filters or {}, user_tags, self.cities) if filters is not None else ("TRUE", [])
+        cursor = self._connection.cursor()
+        return int(cursor.execute(f"SELECT count(*) FROM listings WHERE {where}", params).fetchone()[0])
+
+    def page(self, filters: dict, user_tags: Optional[Dict[str, str]] = None, sort: str = Query_Engine.DEFAULT_SORT,
+             limit: int = 20, after: Optional[dict] = None, columns: Optional[List[str]] = None
+             ) -> Tuple[pd.DataFrame, int, Optional[dict]]:
+        """
+        Uma página de resultados a partir do cursor, o total e o cursor da próxima página
+        (None na última).
+        """
+        where, params = build_where(filters, user_tags, self.cities)
+        selected = ", ".join(f'"{column}"' for column in (columns or DEFAULT_COLUMNS))
+        query = f"""
+            SELECT * FROM (
+                SELECT {selected}, {_sort_expression(sort)} AS sort_value,
+                       CAST(domain AS VARCHAR) || '/' || CAST(id AS VARCHAR) AS listing_key
+                FROM listings WHERE {where}
+            )
+        """
+        page_params = list(params)
+        if after:
+            if after.get("value") is None:
+                query += " WHERE sort_value IS NULL AND listing_key > ?"
+                page_params.append(str(after.get("key", "")))
+            else:
+                query += " WHERE sort_value > ? OR (sort_value = ? AND listing_key > ?) OR sort_value IS NULL"
+                page_params.extend([after["value"], after["value"], str(after.get("key", ""))])
+        # Uma linha a mais indica se existe uma próxima página
+        query += " ORDER BY sort_value ASC NULLS LAST, listing_key ASC LIMIT ?"
+        page_params.append(limit + 1)
+
+        cursor = self._connection.cursor()
+        df = cursor.execute(query, page_params).df()
+        total = self.count(filters, user_tags)
+
+        next_after = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            next_after = {"value": None if pd.isna(last["sort_value"]) else float(last["sort_value"]), "key": last["listing_key"]}
+        return df.drop(columns=["sort_value", "listing_key"]).reset_index(drop=True), total, next_after
+
+
+PARITY_CASES = [
+    {},
+    {"types": ["Apartamento", "Casa"], "price_range": (0, 10_000_000), "area_range": (0, 10_000)},
+    {"types": [], "neighborhoods": ["Centro", "Goiás"], "bedrooms": ["2", "4+"], "price_range": (0, 10_000_000)},
+    {"city": "venâncio", "types": [], "parking_spaces": ["0", "1"], "area_range": (40, 120), "price_range": (0, 2_000_000)},
+    {"types": [], "show_discarded": True, "tags": ["favorite"], "price_range": (0, 10_000_000), "area_range": (0, 10_000)},
+]
+
+
+def _pandas_page(df: pd.DataFrame, sort_index: Query_Engine.SortIndex, filters: dict, user_tags: dict,
+                 sort: str, limit: int, after: Optional[dict]) -> Tuple[List[str], int, Optional[dict]]:
+    mask = Query_Engine.filter_mask(df, filters, user_tags)
+    positions = sort_index.page(mask, sort, limit + 1, after)
+    next_after = sort_index.cursor(sort, int(positions[limit - 1])) if len(positions) > limit else None
+    return list(sort_index.keys[positions[:limit]]), int(mask.sum()), next_after
+
+
+def check_parity(df: Optional[pd.DataFrame] = None, path: Optional[str] = None, user_tags: Optional[Dict[str, str]] = None,
+                 pages: int = 3, limit: int = 20) -> List[str]:
+    """
+    Compara o backend SQL com o caminho em pandas (Query_Engine + SortIndex) em vários
+    filtros e em todas as ordenações, percorrendo algumas páginas com cursores.
+
+    Returns:
+        List[str]: As divergências encontradas (vazia quando os resultados são iguais).
+    """
+    if df is None:
+        df, path = Data_Store.load_frame(), Data_Store.parquet_path()
+    if user_tags is None:
+        # Algumas tags determinísticas para exercitar os filtros de descartados/favoritos
+        ids = df["id"].astype(str).to_numpy()
+        user_tags = {prop_id: ("discarded" if i % 7 == 0 else "favorite") for i, prop_id in enumerate(ids[::97])}
+
+    engine = SQLQueryEngine(path=path)
+    sort_index = Query_Engine.SortIndex(df)
+    mismatches = []
+    for case, filters in enumerate(PARITY_CASES):
+        for sort in Query_Engine.SORT_OPTIONS:
+            pandas_after = sql_after = None
+            for page in range(pages):
+                expected, expected_total, pandas_after = _pandas_page(df, sort_index, filters, user_tags, sort, limit, pandas_after)
+                rows, total, sql_after = engine.page(filters, user_tags, sort, limit, sql_after, columns=["domain", "id"])
+                keys = list(rows["domain"].astype(str) + "/" + rows["id"].astype(str))
+                if total != expected_total:
+                    mismatches.append(f"caso {case}, {sort}: total {total} != {expected_total}")
+                if keys != expected:
+                    mismatches.append(f"caso {case}, {sort}, página {page + 1}: chaves diferentes")
+                if pandas_after is None or sql_after is None:
+                    break
+    return mismatches
+
+
+def _write_parquet(df: pd.DataFrame, path: str):
+    """Grava como Data_Store.publish_dataset (ordenado por cidade e preço, mesmo tamanho de row group)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df, preserve_index=False).sort_by([("city", "ascending"), ("price", "ascending")])
+    pq.write_table(table, path, row_group_size=Data_Store.PARQUET_ROW_GROUP_SIZE)
+
+
+def benchmark(rows: int = 1_000_000, repeats: int = 5, seed: int = 42) -> Dict[str, float]:
+    """
+    Compara os dois caminhos sobre um dataset sintético: carga completa em pandas + filtro
+    e paginação em memória, contra consultas SQL sobre o Parquet (página + total).
+
+    Returns:
+        Dict[str, float]: Tempos em milissegundos (medianas das repetições).
+    """
+    from Synthetic_Data import synthetic_listings
+
+    filters = {"city": "Santa Cruz do Sul", "types": ["Apartamento"], "price_range": (200_000, 400_000),
+               "area_range": (30, 200), "bedrooms": ["2", "3"]}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "listings.parquet")
+        _write_parquet(synthetic_listings(rows, seed), path)
+
+        def timed(func) -> float:
+            started = time.perf_counter()
+            func()
+            return (time.perf_counter() - started) * 1000
+
+        results = {}
+        started = time.perf_counter()
+        df = pd.read_parquet(path)
+        sort_index = Query_Engine.SortIndex(df)
+        results["pandas_load_ms"] = (time.perf_counter() - started) * 1000
+        results["pandas_query_ms"] = float(np.median([
+            timed(lambda: _pandas_page(df, sort_index, filters, {}, sort, 20, None))
+            for sort in Query_Engine.SORT_OPTIONS for _ in range(repeats)
+        ]))
+        results["pandas_memory_mb"] = df.memory_usage(deep=True).sum() / 1024 ** 2
+        df = sort_index = None  # libera o dataset antes de medir o caminho SQL
+
+        started = time.perf_counter()
+        engine = SQLQueryEngine(path=path)
+        results["sql_open_ms"] = (time.perf_counter() - started) * 1000
+        results["sql_query_ms"] = float(np.median([
+            timed(lambda: engine.page(filters, {}, sort, 20))
+            for sort in Query_Engine.SORT_OPTIONS for _ in range(repeats)
+        ]))
+        results["parity_mismatches"] = float(len(check_parity(pd.read_parquet(path), path, pages=2)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend SQL (DuckDB) sobre o Parquet publicado.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("parity", help="Compara os resultados com o caminho em pandas no dataset publicado")
+    bench_parser = subparsers.add_parser("benchmark", help="Compara os dois caminhos em um dataset sintético")
+    bench_parser.add_argument("--rows", type=int, default=1_000_000)
+    bench_parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "parity":
+        mismatches = check_parity()
+        for mismatch in mismatches:
+            logging.error(mismatch)
+        logging.info("Resultados idênticos." if not mismatches else f"{len(mismatches)} divergências.")
+        raise SystemExit(1 if mismatches else 0)
+    elif args.command == "benchmark":
+        for name, value in benchmark(args.rows, args.repeats).items():
+            print(f"{name:>20}: {value:,.1f}")
@@ -0,0 +1,189 @@
+from typing import Dict, List, Optional
+import pandas as pd
+import threading
+import tempfile
+import logging
+import json
+import time
+import os
+
+import Data_Store
+import Query_Engine
+
+SAVED_SEARCHES_FILE = "saved_searches.json"
+NOTIFICATIONS_FILE = "notifications.jsonl"
+LAST_VISIT_FILE = "last_visit.json"
+
+# Acessos a menos disso da última atividade continuam a mesma visita (ex: recarregar a página)
+VISIT_GAP_SECONDS = 30 * 60
+
+# Sessões do Streamlit são threads do mesmo processo: leitura, alteração e gravação dos
+# arquivos JSON acontecem sob este lock para que uma sessão não perca a gravação de outra
+_update_lock = threading.Lock()
+
+
+def _read_json(file_name: str, default):
+    path = Data_Store.data_path(file_name)
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Não foi possível ler {path}: {e}")
+        return default
+
+
+def _write_json(file_name: str, data):
+    path = Data_Store.data_path(file_name)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Arquivo temporário único: gravações simultâneas não disputam o mesmo .tmp
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_saved_searches() -> Dict[str, dict]:
+    """Buscas salvas, por nome: {"filters": {...}, "sort": ..., "created_at": ...}."""
+    searches = _read_json(SAVED_SEARCHES_FILE, {})
+    return searches if isinstance(searches, dict) else {}
+
+
+def save_search(name: str, filters: dict, sort: str = Query_Engine.DEFAULT_SORT):
+    """Salva (ou substitui) uma busca com os filtros atuais da sidebar."""
+    filters = Query_Engine.normalize_filters(filters)
+    # O filtro "novos desde a última visita" depende da sessão e não faz parte da busca
+    filters["new_since"] = None
+    with _update_lock:
+        searches = load_saved_searches()
+        searches[name] = {"filters": filters, "sort": sort, "created_at": time.time()}
+        _write_json(SAVED_SEARCHES_FILE, searches)
+
+
+def delete_search(name: str):
+    with _update_lock:
+        searches = load_saved_searches()
+        if searches.pop(name, None) is not None:
+            _write_json(SAVED_SEARCHES_FILE, searches)
+
+
+def evaluate_searches(delta: pd.DataFrame, searches: Dict[str, dict],
+                      user_tags: Optional[Dict[str, str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Avalia as buscas salvas apenas sobre os anúncios novos ou alterados.
+
+    As máscaras de cada filtro são compartilhadas entre as buscas (mesma cidade, mesmos
+    tipos, ...), então o custo cresce pouco com o número de buscas.
+    """
+    if delta.empty or not searches:
+        return {}
+    cache = {}
+    matches = {}
+    for name, search in searches.items():
+        mask = Query_Engine.filter_mask(delta, search.get("filters", {}), user_tags, cache)
+        if mask.any():
+            matches[name] = delta[mask]
+    return matches
+
+
+def notify_new_listings(version: Optional[str] = None) -> int:
+    """
+    Avalia as buscas salvas sobre o delta da versão publicada e acrescenta as
+    correspondências ao arquivo de notificações (uma linha JSON por anúncio).
+
+    Returns:
+        int: O número de notificações geradas.
+    """
+    searches = load_saved_searches()
+    if not searches:
+        return 0
+    version = version or Data_Store.dataset_version()
+    delta = Data_Store.load_delta(version)
+    user_tags = _read_json('user_tags.json', {})
+
+    started = time.perf_counter()
+    matches = evaluate_searches(delta, searches, user_tags)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    notifications = []
+    for name, rows in matches.items():
+        for row in Query_Engine.sort_listings(rows, searches[name].get("sort", Query_Engine.DEFAULT_SORT)).itertuples(index=False):
+            notifications.append({
+                "search": name,
+                "version": version,
+                "notified_at": time.time(),
+                "is_new": row.first_seen == row.updated_at,
+                "domain": row.domain,
+                "id": str(row.id),
+                "title": None if pd.isna(row.title) else row.title,
+                "neighborhood": row.neighborhood,
+                "price": float(row.price),
+                "property_url": None if pd.isna(row.property_url) else row.property_url,
+            })
+
+    if notifications:
+        path = Data_Store.data_path(NOTIFICATIONS_FILE)
+        with open(path, 'a', encoding='utf-8') as f:
+            for notification in notifications:
+                f.write(json.dumps(notification, ensure_ascii=False) + "\n")
+
+    logging.info(f"{len(searches)} buscas salvas avaliadas sobre {len(delta)} anúncios novos/alterados "
+                 f"em {elapsed_ms:.1f} ms: {len(notifications)} notificações.")
+    return len(notifications)
+
+
+def read_notifications(limit: int = 50) -> List[dict]:
+    """Últimas notificações, da mais recente para a mais antiga."""
+    path = Data_Store.data_path(NOTIFICATIONS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()[-limit:]
+    return [json.loads(line) for line in reversed(lines) if line.strip()]
+
+
+def _read_visits() -> Dict[str, dict]:
+    """Visitas por visitante: {"previous": fim da visita anterior, "last_seen": última atividade}."""
+    visits = _read_json(LAST_VISIT_FILE, {})
+    # O formato antigo ({"last_visit": ...}) era global, sem visitante
+    if not isinstance(visits, dict) or "last_visit" in visits:
+        return {}
+    return visits
+
+
+def register_visit(visitor: str, now: Optional[float] = None) -> Optional[float]:
+    """
+    Registra o início de uma sessão do visitante e retorna o fim da visita anterior dele
+    (None na primeira visita).
+
+    Sessões abertas a menos de VISIT_GAP_SECONDS da última atividade (recarregar a página,
+    outra aba) continuam a mesma visita, então o "desde a última visita" não avança.
+    """
+    now = now or time.time()
+    with _update_lock:
+        visits = _read_visits()
+        visit = visits.get(visitor)
+        if visit is None:
+            visit = {"previous": None}
+        elif now - visit.get("last_seen", 0) >= VISIT_GAP_SECONDS:
+            visit = {"previous": visit.get("last_seen")}
+        visit["last_seen"] = now
+        visits[visitor] = visit
+        _write_json(LAST_VISIT_FILE, visits)
+    return visit["previous"]
+
+
+def touch_visit(visitor: str, now: Optional[float] = None):
+    """Atualiza a última atividade da visita atual do visitante (chamada periodicamente pela aplicação)."""
+    with _update_lock:
+        visits = _read_visits()
+        if visitor in visits:
+            visits[visitor]["last_seen"] = now or time.time()
+            _write_json(LAST_VISIT_FILE, visits)
@@ -0,0 +1,327 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, suppress
+from typing import Dict, List, Optional
+import pandas as pd
+import threading
+import argparse
+import logging
+import sqlite3
+import socket
+import time
+import uuid
+import os
+
+import Data_Store
+from Domains import load_domains
+from Normalizer import concat_normalized
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+QUEUE_FILE = "scrape_queue.sqlite"
+PARTITIONS_DIR = "partitions"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    heartbeat_at REAL,
+    updated_at REAL NOT NULL,
+    rows INTEGER,
+    partition_path TEXT,
+    error TEXT,
+    PRIMARY KEY (run_id, domain)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (run_id, status, lease_expires_at);
+"""
+
+
+class ScrapeQueue:
+    """
+    Fila de jobs de scraping (um por domínio) gravada em SQLite.
+
+    Um worker recebe um job por vez com um lease (prazo de posse) e o renova com
+    heartbeats enquanto extrai o domínio. Se o worker morrer, o lease expira e o job
+    volta a ser entregue a outro worker, até max_attempts tentativas; um job cujo lease
+    expira na última tentativa é marcado como falho. Vários processos da mesma máquina
+    podem consumir a mesma fila. O modo WAL do SQLite depende de memória compartilhada
+    local, então o arquivo da fila não deve ficar em um sistema de arquivos de rede.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: int = 3):
+        self.path = path or Data_Store.data_path(QUEUE_FILE)
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA_SQL)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: cada worker e cada thread de heartbeat usa a sua
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def latest_run(self) -> Optional[str]:
+        with closing(self._connect()) as connection:
+            # Os ids das rodadas são o momento da criação (%Y%m%d%H%M%S): a ordem do texto é a cronológica
+            row = connection.execute("SELECT run_id FROM jobs ORDER BY run_id DESC LIMIT 1").fetchone()
+        return row["run_id"] if row else None
+
+    def enqueue_run(self, domains: List[str], run_id: Optional[str] = None) -> str:
+        """Cria uma nova rodada com um job pendente por domínio."""
+        run_id = run_id or time.strftime('%Y%m%d%H%M%S')
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, domain, updated_at) VALUES (?, ?, ?)",
+                [(run_id, domain, now) for domain in domains],
+            )
+        logging.info(f"Rodada {run_id}: {len(domains)} domínios na fila.")
+        return run_id
+
+    def _expire_exhausted(self, connection: sqlite3.Connection, run_id: str, now: float):
+        """Marca como falhos os jobs com lease expirado que já esgotaram as tentativas."""
+        connection.execute(
+            """UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL,
+               error = COALESCE(error, 'Lease expirado na última tentativa'), updated_at = ?
+               WHERE run_id = ? AND status = 'leased' AND lease_expires_at < ? AND attempts >= ?""",
+            (now, run_id, now, self.max_attempts),
+        )
+
+    def lease(self, worker_id: str, run_id: str, lease_seconds: float = 120) -> Optional[dict]:
+        """
+        Entrega ao worker um job pendente (ou com lease expirado) da rodada. A seleção e a
+        atualização acontecem na mesma transação de escrita, então dois workers nunca
+        recebem o mesmo job.
+        """
+        now = time.time()
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self._expire_exhausted(connection, run_id, now)
+            row = connection.execute(
+                """SELECT domain, attempts FROM jobs
+                   WHERE run_id = ? AND attempts < ?
+                     AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < ?))
+                   ORDER BY attempts, updated_at LIMIT 1""",
+                (run_id, self.max_attempts, now),
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                """UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                   lease_expires_at = ?, heartbeat_at = ?, updated_at = ?
+                   WHERE run_id = ? AND domain = ?""",
+                (worker_id, now + lease_seconds, now, now, run_id, row["domain"]),
+            )
+            connection.execute("COMMIT")
+            return {"run_id": run_id, "domain": row["domain"], "attempt": row["attempts"] + 1, "worker_id": worker_id}
+        except sqlite3.Error:
+            # Uma falha no próprio ROLLBACK não pode esconder o erro original
+            with suppress(sqlite3.Error):
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def heartbeat(self, job: dict, lease_seconds: float = 120) -> bool:
+        """Renova o lease. Retorna False se o job não pertence mais ao worker (lease perdido)."""
+        now = time.time()
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                """UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?
+                   WHERE run_id = ? AND domain = ? AND status = 'leased' AND lease_owner = ?""",
+                (now + lease_seconds, now, job["run_id"], job["domain"], job["worker_id"]),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job: dict, partition_path: str, rows: int) -> bool:
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                """UPDATE jobs SET status = 'done', partition_path = ?, rows = ?, error = NULL, updated_at = ?
+                   WHERE run_id = ? AND domain = ? AND status = 'leased' AND lease_owner = ?""",
+                (partition_path, rows, time.time(), job["run_id"], job["domain"], job["worker_id"]),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job: dict, error: str):
+        """Devolve o job à fila, ou o marca como falho após max_attempts tentativas."""
+        with closing(self._connect()) as connection:
+            connection.execute(
+                """UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   lease_owner = NULL, lease_expires_at = NULL, error = ?, updated_at = ?
+                   WHERE run_id = ? AND domain = ? AND lease_owner = ?""",
+                (self.max_attempts, error[:500], time.time(), job["run_id"], job["domain"], job["worker_id"]),
+            )
+
+    def status(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        """Número de jobs da rodada por status (pending, leased, done, failed)."""
+        run_id = run_id or self.latest_run()
+        with closing(self._connect()) as connection:
+            self._expire_exhausted(connection, run_id, time.time())
+            rows = connection.execute("SELECT status, COUNT(*) AS count FROM jobs WHERE run_id = ? GROUP BY status", (run_id,))
+            return {row["status"]: row["count"] for row in rows}
+
+    def is_finished(self, run_id: str) -> bool:
+        """Rodada sem jobs pendentes ou em andamento (jobs que esgotaram as tentativas contam como finalizados)."""
+        with closing(self._connect()) as connection:
+            self._expire_exhausted(connection, run_id, time.time())
+            row = connection.execute(
+                "SELECT COUNT(*) AS count FROM jobs WHERE run_id = ? AND status IN ('pending', 'leased') AND attempts < ?",
+                (run_id, self.max_attempts),
+            ).fetchone()
+            leased = connection.execute(
+                "SELECT COUNT(*) AS count FROM jobs WHERE run_id = ? AND status = 'leased' AND lease_expires_at >= ?",
+                (run_id, time.time()),
+            ).fetchone()
+        return row["count"] == 0 and leased["count"] == 0
+
+    def partitions(self, run_id: str) -> List[str]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT partition_path FROM jobs WHERE run_id = ? AND status = 'done' ORDER BY domain", (run_id,)
+            )
+            return [row["partition_path"] for row in rows]
+
+
+def partition_path(run_id: str, domain: str) -> str:
+    """Partição (Parquet) com os imóveis de um domínio em uma rodada."""
+    return Data_Store.data_path(PARTITIONS_DIR, f"run={run_id}", f"domain={domain}", "part.parquet")
+
+
+def _write_partition(job: dict, df: pd.DataFrame) -> str:
+    path = partition_path(job["run_id"], job["domain"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Arquivo temporário próprio do worker: um worker cujo lease expirou pode ainda estar gravando
+    temp_path = f"{path}.{job['worker_id']}.tmp"
+    df.to_parquet(temp_path, index=False)
+    os.replace(temp_path, path)
+    return path
+
+
+class _Heartbeat(threading.Thread):
+    """Renova o lease de um job em segundo plano enquanto ele é processado."""
+
+    def __init__(self, queue: ScrapeQueue, job: dict, lease_seconds: float, interval: float):
+        super().__init__(daemon=True)
+        self.queue, self.job = queue, job
+        self.lease_seconds, self.interval = lease_seconds, interval
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if not self.queue.heartbeat(self.job, self.lease_seconds):
+                logging.warning(f"Lease de {self.job['domain']} perdido pelo worker {self.job['worker_id']}.")
+                self.lost = True
+                return
+
+
+def run_worker(run_id: Optional[str] = None, worker_id: Optional[str] = None, lease_seconds: float = 120,
+               heartbeat_interval: float = 30, poll_interval: float = 5) -> int:
+    """
+    Consome jobs da rodada até ela terminar, gravando uma partição por domínio.
+
+    Returns:
+        int: O número de domínios processados por este worker.
+    """
+    # Importado aqui para que o módulo da fila não dependa do scraper ao ser importado
+    from Scraper import fetch_domain
+
+    queue = ScrapeQueue()
+    run_id = run_id or queue.latest_run()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    processed = 0
+
+    while True:
+        job = queue.lease(worker_id, run_id, lease_seconds)
+        if job is None:
+            if queue.is_finished(run_id):
+                break
+            # Outros workers ainda têm jobs: espera para o caso de algum lease expirar
+            time.sleep(poll_interval)
+            continue
+
+        logging.info(f"[{worker_id}] {job['domain']} (tentativa {job['attempt']})")
+        heartbeat = _Heartbeat(queue, job, lease_seconds, heartbeat_interval)
+        heartbeat.start()
+        try:
+            df = fetch_domain(job["domain"], raise_on_error=True)
+            if heartbeat.lost:
+                continue
+            path = _write_partition(job, df)
+            if queue.complete(job, path, len(df)):
+                processed += 1
+        except Exception as e:
+            logging.error(f"[{worker_id}] Falha ao processar {job['domain']}: {e}")
+            queue.fail(job, str(e))
+        finally:
+            heartbeat.stopped.set()
+            heartbeat.join()
+
+    logging.info(f"[{worker_id}] Rodada {run_id} finalizada: {processed} domínios processados.")
+    return processed
+
+
+def publish_run(run_id: Optional[str] = None) -> Optional[str]:
+    """
+    Junta as partições dos domínios concluídos na rodada e publica o dataset
+    (mesmo caminho do Scraper.update_scraped_data).
+    """
+    from Scraper import publish_scraped_data
+
+    queue = ScrapeQueue()
+    run_id = run_id or queue.latest_run()
+    status = queue.status(run_id)
+    if status.get("failed"):
+        logging.warning(f"Rodada {run_id}: {status['failed']} domínios falharam e ficarão fora do dataset.")
+    frames = [pd.read_parquet(path) for path in queue.partitions(run_id) if os.path.exists(path)]
+    df = concat_normalized(frames)
+    if df.empty:
+        logging.warning(f"Rodada {run_id} sem imóveis extraídos. Nada foi publicado.")
+        return None
+    return publish_scraped_data(df)
+
+
+def run_all(workers: int = 4, **worker_options) -> Optional[str]:
+    """
+    Enfileira todos os domínios, processa a rodada com vários processos e publica o resultado.
+    """
+    queue = ScrapeQueue()
+    run_id = queue.enqueue_run(load_domains())
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, run_id, **worker_options) for _ in range(workers)]
+        processed = sum(future.result() for future in futures)
+    logging.info(f"Rodada {run_id}: {processed} domínios processados por {workers} workers.")
+    return publish_run(run_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fila de scraping por domínio com vários workers.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("enqueue", help="Cria uma nova rodada com todos os domínios")
+    worker_parser = subparsers.add_parser("worker", help="Consome jobs da rodada mais recente")
+    worker_parser.add_argument("--run-id")
+    worker_parser.add_argument("--lease", type=float, default=120, help="Duração do lease, em segundos")
+    subparsers.add_parser("publish", help="Publica o dataset a partir das partições da rodada")
+    subparsers.add_parser("status", help="Jobs da rodada mais recente por status")
+    run_parser = subparsers.add_parser("run", help="Enfileira, processa com vários workers e publica")
+    run_parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        ScrapeQueue().enqueue_run(load_domains())
+    elif args.command == "worker":
+        run_worker(args.run_id, lease_seconds=args.lease, heartbeat_interval=args.lease / 4)
+    elif args.command == "publish":
+        publish_run()
+    elif args.command == "status":
+        print(ScrapeQueue().status())
+    elif args.command == "run":
+        run_all(args.workers)
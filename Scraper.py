@@ -4,6 +4,13 @@ import requests
 import logging
 import os
 
+from Normalizer import normalize_api, concat_normalized
+from Domains import load_domains
+from Data_Store import DATA_DIR, data_path, publish_dataset
+import Saved_Searches
+import Market_Stats
+import Enrichment
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
@@ -111,11 +118,15 @@ class RealEstateAPIScraper:
             "property_url": full_property_url,
         }
 
-    def fetch_properties(self) -> List[Dict[str, Any]]:
+    def fetch_properties(self, raise_on_error: bool = False) -> List[Dict[str, Any]]:
         """
         Orquestra o processo de scraping para o domínio, buscando todas as páginas e
         processando os dados.
 
+        Args:
+            raise_on_error (bool): Se True, a falha na busca de uma página lança RuntimeError
+                                   em vez de devolver apenas as páginas já extraídas.
+
         Returns:
             List[Dict[str, Any]]: Uma lista de todos os imóveis analisados para o domínio.
         """
@@ -129,6 +140,8 @@ class RealEstateAPIScraper:
             items = self._fetch_page_data(offset)
 
             if items is None: # Ocorreu um erro
+                if raise_on_error:
+                    raise RuntimeError(f"Falha ao buscar a página {page_count} de {self.domain_name} (offset {offset}).")
                 logging.error(f"Interrompendo a extração para {self.domain_name} devido a um erro na busca.")
                 break
             
@@ -147,61 +160,86 @@ class RealEstateAPIScraper:
         return all_properties
 
 
+def fetch_domain(domain: str, raise_on_error: bool = False) -> pd.DataFrame:
+    """
+    Extrai e normaliza todos os imóveis de um domínio. Com raise_on_error, uma página que
+    falhe interrompe a extração com RuntimeError (a fila devolve o job em vez de concluí-lo
+    com resultados parciais).
+    """
+    scraper = RealEstateAPIScraper(domain_name=domain)
+    return normalize_api(scraper.fetch_properties(raise_on_error))
+
+
+def publish_scraped_data(df: pd.DataFrame) -> Optional[str]:
+    """
+    Enriquece, salva e publica os imóveis extraídos (já normalizados) de todos os domínios.
+
+    Returns:
+        Optional[str]: A versão do dataset publicada, ou None se a gravação ou a publicação
+        falhar. Falhas nas buscas salvas ou nos agregados são registradas no log e não
+        impedem as demais etapas.
+    """
+    # Descrição completa, comodidades e áreas das páginas de detalhe (apenas anúncios novos ou alterados)
+    df = Enrichment.enrich(df)
+    output_filename = data_path("all_properties.csv")
+
+    try:
+        df.to_csv(output_filename, index=False, encoding='utf-8')
+        df.to_parquet(output_filename.replace('.csv', '.parquet'), index=False)
+        logging.info(f"Todos os imóveis foram salvos com sucesso em {output_filename}")
+    except (OSError, ValueError) as e:
+        logging.error(f"Falha ao escrever os arquivos CSV/Parquet {output_filename}: {e}")
+        return None
+
+    # Publica o dataset limpo para a aplicação (Arrow IPC mapeável em memória)
+    try:
+        version = publish_dataset(df)
+    except Exception as e:
+        logging.error(f"Falha ao publicar o dataset: {e}")
+        return None
+
+    # Avalia as buscas salvas apenas sobre os anúncios novos ou alterados
+    try:
+        Saved_Searches.notify_new_listings(version)
+    except Exception as e:
+        logging.error(f"Falha ao avaliar as buscas salvas da versão {version}: {e}")
+
+    # Materializa os agregados de mercado da nova versão (independente das notificações)
+    try:
+        Market_Stats.publish_market_stats(version)
+    except Exception as e:
+        logging.error(f"Falha ao materializar os agregados de mercado da versão {version}: {e}")
+    return version
+
+
 def update_scraped_data():
     """
     Função principal para executar o scraper em uma lista de domínios e salvar os resultados em um CSV.
+
+    Executa tudo em um único processo; para muitos domínios, use a fila do Scrape_Queue.py
+    com vários workers.
     """
     logging.info("Iniciando o processo de scraping para múltiplos domínios...")
-    os.makedirs("data", exist_ok=True)
-
-    # Lista de domínios a serem processados
-    domains_to_scrape = [
-        'imoveisinvest.com', 
-        'imobiliariadcasa.com.br', 
-        'barbianimoveis.com.br', 
-        'oktoberimoveis.com.br', 
-        'borbaimoveis.com.br', 
-        'predilarimoveis.com.br', 
-        'karnoppimoveis.com.br', 
-        'imoveismdm.com.br', 
-        'verenaimoveis.com.br', 
-        'imoveisdasantinha.com.br', 
-        'muranoimobiliaria.com.br', 
-        'imobjardim.com.br', 
-        'imobiliariaimigrante.com.br', 
-        'garbonegociosimobiliarios.com.br'
-    ]
-
-    all_scraped_data = []
-
-    for domain in domains_to_scrape:
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    frames = []
+    for domain in load_domains():
         try:
-            scraper = RealEstateAPIScraper(domain_name=domain)
-            properties = scraper.fetch_properties()
-            if properties:
-                all_scraped_data.extend(properties)
+            frames.append(fetch_domain(domain))
             logging.info(f"--- Processamento de {domain} finalizado ---\n")
         except ValueError as e:
             logging.error(f"Não foi possível criar o scraper para o domínio '{domain}': {e}")
         except Exception as e:
             logging.error(f"Ocorreu um erro inesperado ao processar {domain}: {e}")
 
-    if all_scraped_data:
-        logging.info(f"Total de imóveis extraídos de todos os domínios: {len(all_scraped_data)}")
-        
-        # Cria o DataFrame e salva em um único CSV
-        df = pd.DataFrame(all_scraped_data)
-        output_filename = "data\\all_properties.csv"
-
-        try:
-            df.to_csv(output_filename, index=False, encoding='utf-8')
-            df.to_parquet(output_filename.replace('.csv', '.parquet'), index=False)
-            logging.info(f"Todos os imóveis foram salvos com sucesso em {output_filename}")
-        except IOError as e:
-            logging.error(f"Falha ao escrever no arquivo CSV {output_filename}: {e}")
+    # Normaliza para o esquema único e salva em um único CSV
+    df = concat_normalized(frames)
+    if not df.empty:
+        logging.info(f"Total de imóveis extraídos de todos os domínios: {len(df)}")
+        publish_scraped_data(df)
     else:
         logging.warning("Nenhum imóvel foi extraído de nenhum domínio. O arquivo CSV não será criado.")
 
 
 if __name__ == "__main__":
-   update_scraped_data()
\ No newline at end of file
+   update_scraped_data()
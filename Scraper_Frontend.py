@@ -1,208 +1,307 @@
-from selenium import webdriver
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, TYPE_CHECKING
 import pandas as pd
-import numpy as np
-import time
+import threading
 import os
 
+from Normalizer import normalize_frontend, concat_normalized
+from Domains import load_domains
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+
+# Seletores usados para detectar o estado da página
+LISTING_CARD_SELECTOR = '[itemtype="https://schema.org/Apartment"]'
+PAGE_BUTTON_SELECTOR = '[class^="building-card-pages_labelText__"]'
+
+# Recursos bloqueados quando block_resources=True (imagens, fontes e rastreadores)
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*facebook.com/tr*', '*hotjar.com*', '*clarity.ms*',
+]
+
+# Extrai os campos de todos os cards da página em uma única chamada (retorna uma lista de objetos JSON)
+EXTRACT_CARDS_SCRIPT = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.innerText.trim() : null;
+};
+return Array.from(document.querySelectorAll(arguments[0])).map(card => ({
+    neighborhood: text(card, '[class^="vertical-property-card_neighborhood__"]'),
+    address: text(card, '[class^="vertical-property-card_fullAddress__"]'),
+    agreement: text(card, '[class^="contracts_typeOfAgreement__"]'),
+    price: text(card, '[class^="contracts_priceNumber__"]'),
+    exclusive: card.querySelector('[class^="carousel-card_exclusivity__"]') !== null,
+    code: text(card, '[class^="card-buttons_code__"]'),
+    characteristics: Array.from(
+        card.querySelectorAll('[class^="vertical-property-card_characteristics__"] span')
+    ).map(span => span.innerText.trim()),
+    images: Array.from(card.querySelectorAll('[aria-label="Ver imagem"] img'))
+        .map(img => img.getAttribute('src'))
+        .filter(src => src),
+}));
+"""
+
+
+def build_link_params(params: Optional[dict] = None, page: int = 1) -> str:
+    """
+    Build the query string of the /venda listing pages from the given filters.
+    """
+    link_params = ['ordenacao="menor-valor"', f'pagina={page}']
+    if params is not None:
+        # Iterate through the provided parameters and build the query string
+        for key, value in params.items():
+            if isinstance(value, list):
+                value = '%2C'.join(value)
+            if isinstance(value, str):
+                value = '"' + value + '"'
+            else:
+                value = str(value)
+            link_params.append(f'{key}={value}')
+    return '&'.join(link_params)
+
 
 class FrontEnd_Scraper:
     
-    def __init__(self, params: Optional[dict] = None):
-        from selenium.webdriver.chrome.service import Service
-        from selenium.webdriver.chrome.options import Options
-        
+    def __init__(self, params: Optional[dict] = None, max_workers: int = 4, headless: bool = True,
+                 block_resources: bool = True, timeout: float = 15, scroll_timeout: float = 1.5):
+        """
+        Args:
+            params: Query parameters appended to the /venda URL of each site.
+            max_workers: Maximum number of browsers running in parallel (one site per worker).
+            headless: Run Chrome without a visible window.
+            block_resources: Block images, fonts and trackers to speed up page loads.
+            timeout: Maximum wait (seconds) for listing cards and page changes.
+            scroll_timeout: Maximum wait (seconds) for new content after each scroll step.
+        """
         # Fixed parameters
-        self.sites = ['imoveisinvest.com', 'imobiliariadcasa.com.br', 'barbianimoveis.com.br', 'oktoberimoveis.com.br', 'borbaimoveis.com.br', 'predilarimoveis.com.br', 'karnoppimoveis.com.br', 'imoveismdm.com.br', 'verenaimoveis.com.br', 'imoveisdasantinha.com.br', 'muranoimobiliaria.com.br', 'imobjardim.com.br', 'imobiliariaimigrante.com.br', 'garbonegociosimobiliarios.com.br']
+        self.sites = load_domains()
 
         # Query parameters
-        link_params = ['ordenacao="menor-valor"', 'pagina=1']
-        if params is not None:
-            # Iterate through the provided parameters and build the query string
-            for key, value in params.items():
-                if isinstance(value, list):
-                    value = '%2C'.join(value)
-                if isinstance(value, str):
-                    value = '"' + value + '"'
-                else:
-                    value = str(value)
-                link_params.append(f'{key}={value}')
-        self.link_params = '&'.join(link_params)
+        self.link_params = build_link_params(params)
         print(self.link_params)
 
-        # Initialize the browser
+        # Browser pool settings. Drivers are created lazily, one per worker thread
+        self.max_workers = max(1, min(max_workers, len(self.sites)))
+        self.headless = headless
+        self.block_resources = block_resources
+        self.timeout = timeout
+        self.scroll_timeout = scroll_timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+
+    def __del__(self):
+        """
+        Ensure the drivers are closed when the scraper is deleted from memory.
+        """
+        if hasattr(self, '_drivers_lock'):
+            self.close()
+
+
+    def close(self):
+        """
+        Quit every browser created by the pool.
+        """
+        with self._drivers_lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+    def _create_driver(self) -> 'webdriver.Chrome':
+        """
+        Start a new Chrome instance configured for scraping.
+        """
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+
         options = Options()
         options.add_argument("--log-level=3")  # Suppresses INFO, WARNING, and DEBUG messages
         options.add_experimental_option("excludeSwitches", ["enable-logging"])  # Suppresses "DevTools listening" message
+        options.page_load_strategy = 'eager'  # Don't wait for images/iframes before returning from get()
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument("--window-size=1920,1080")
+            options.add_argument("--disable-gpu")
+        if self.block_resources:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
         service = Service(log_path=os.devnull)  # Hides chromedriver's own logging
-        self.driver = webdriver.Chrome(service=service, options=options)
+        driver = webdriver.Chrome(service=service, options=options)
 
+        if self.block_resources:
+            # Blocks fonts and trackers (and any image the preference above misses)
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
 
-    def __del__(self):
+        with self._drivers_lock:
+            self._drivers.append(driver)
+        return driver
+
+
+    def _get_driver(self) -> 'webdriver.Chrome':
+        """
+        Return the browser owned by the current worker thread, creating it if needed.
+        """
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            driver = self._create_driver()
+            self._local.driver = driver
+        return driver
+
+
+    def __wait_for_listings(self, driver: 'webdriver.Chrome') -> bool:
         """
-        Ensure the driver is closed when the scraper is deleted from memory.
+        Wait until at least one listing card is present. Returns False on timeout.
         """
-        if self.driver:
-            self.driver.quit()
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+
+        try:
+            WebDriverWait(driver, self.timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, LISTING_CARD_SELECTOR))
+            )
+            return True
+        except TimeoutException:
+            return False
 
 
-    def __force_page_load(self, driver: webdriver.Chrome) -> webdriver.Chrome:
+    def __force_page_load(self, driver: 'webdriver.Chrome') -> 'webdriver.Chrome':
         """
         Force the page to load completely by scrolling to the bottom.
         """
-        
-        last_height = driver.execute_script("return document.body.scrollHeight")
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+
+        get_height = "return document.body.scrollHeight"
+        last_height = driver.execute_script(get_height)
         while True:
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # Wait for new content to load
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
+            try:
+                # Wait for new content to load, stopping as soon as the page grows
+                WebDriverWait(driver, self.scroll_timeout, poll_frequency=0.2).until(
+                    lambda d: d.execute_script(get_height) != last_height
+                )
+            except TimeoutException:
                 break
-            last_height = new_height
+            last_height = driver.execute_script(get_height)
 
         driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)  # Wait for the scroll to complete
 
         return driver
 
 
-    def scrape_all(self) -> list:
+    def __go_to_next_page(self, driver: 'webdriver.Chrome', first_card) -> bool:
         """
-        Scrape all sites defined in the class.
+        Click the "Próximo" button and wait for the next page of listings.
+        Returns False when there is no next page.
         """
-        all_data = []
-        for site in self.sites:
-            print(f'Scraping {site}...')
-            data = self.get_listings(site)
-            all_data.extend(data)
-            print(f'Finished scraping {site}. Found {len(data)} listings.')
-        
-        df = pd.DataFrame(all_data)
-        df.to_csv('data\\all_data_frontend.csv', index=False, encoding='utf-8')
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException, WebDriverException, StaleElementReferenceException
+
+        next_btn = None
+        for btn in driver.find_elements(By.CSS_SELECTOR, PAGE_BUTTON_SELECTOR):
+            if btn.text == 'Próximo':
+                next_btn = btn
+                break
+        if next_btn is None or not next_btn.is_enabled():
+            return False
+
+        old_url = driver.current_url
+        old_first_text = first_card.text if first_card is not None else None
+
+        def page_changed(d):
+            if d.current_url == old_url:
+                return False
+            if first_card is None:
+                return True
+            # The old cards are either removed from the DOM or re-rendered with new content
+            try:
+                return first_card.text != old_first_text
+            except StaleElementReferenceException:
+                return True
+
+        try:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
+            next_btn.click()
+            WebDriverWait(driver, self.timeout, poll_frequency=0.2).until(page_changed)
+        except (TimeoutException, WebDriverException):
+            return False
+
+        return self.__wait_for_listings(driver)
+
+
+    def scrape_all(self) -> pd.DataFrame:
+        """
+        Scrape all sites defined in the class, one site per worker, with at most
+        max_workers browsers open at the same time.
+        """
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(self.get_listings, site): site for site in self.sites}
+                for future in as_completed(futures):
+                    site = futures[future]
+                    try:
+                        results[site] = future.result()
+                    except Exception as e:
+                        print(f'Failed to scrape {site}: {e}')
+                        continue
+                    print(f'Finished scraping {site}. Found {len(results[site])} listings.')
+        finally:
+            self.close()
+
+        # Keeps the output in the same order as self.sites
+        df = concat_normalized([results[site] for site in self.sites if site in results])
+        os.makedirs('data', exist_ok=True)
+        output_filename = os.path.join('data', 'all_data_frontend.csv')
+        df.to_csv(output_filename, index=False, encoding='utf-8')
+        df.to_parquet(output_filename.replace('.csv', '.parquet'), index=False)
         print('Data saved successfully.')
 
-        return all_data
+        return df
     
 
-    def get_listings(self, site) -> list:
+    def get_listings(self, site) -> pd.DataFrame:
         from selenium.webdriver.common.by import By
-        from selenium.common.exceptions import NoSuchElementException
 
+        print(f'Scraping {site}...')
+        driver = self._get_driver()
         data = []
-        reached_end = False
         
         # Open the URL
         url = f'https://www.{site}/venda?{self.link_params}'
-        self.driver.get(url)
-        time.sleep(3)
+        driver.get(url)
+        reached_end = not self.__wait_for_listings(driver)
         
         while not reached_end:
 
             # Force the page to load completely
-            self.driver = self.__force_page_load(self.driver)
-
-            # Iterate through each listing card
-            listings = self.driver.find_elements(By.CSS_SELECTOR, f'[itemtype="https://schema.org/Apartment"]')
-            for element in listings:
-
-                # Suspended | Extrai imagens do card
-                images = []
-                #try:
-                #    img_bullets_container = element.find_element(By.CSS_SELECTOR, '[class^="image-gallery-bullets-container"]')
-
-                #    # Faz o scroll para o container de imagens
-                #    location = img_bullets_container.location # Dict {'x': int, 'y': int}
-                #    self.driver.execute_script(f'window.scrollTo({location["x"]}, {location["y"]-100});')  # Scroll to the bullet
-                #    time.sleep(1)  # Wait for the scroll to complete
-                #    
-                #    # Clica em cada botão de imagem do Card, para carregar as imagens
-                #    img_bullets = img_bullets_container.find_elements(By.CSS_SELECTOR, '[type="button"]')
-                #    for bullet in img_bullets:
-                #        bullet.click()
-                #        time.sleep(.1)  # Wait for the image to load
-
-                #    # Extrai as imagens do card        
-                #    for img in element.find_elements(By.CSS_SELECTOR, '[aria-label="Ver imagem"]'):
-                #        try:
-                #            img_src = img.find_element(By.TAG_NAME, 'img')
-                #            images.append(img_src.get_attribute('src'))
-                #        except NoSuchElementException:
-                #            print("Image not found in card, skipping...")
-                #            continue
-                #except NoSuchElementException:
-                #    continue
-
-                # Extrai informações do card
-                neighborhood = element.find_element(By.CSS_SELECTOR, '[class^="vertical-property-card_neighborhood__"]').text
-                address = element.find_element(By.CSS_SELECTOR, '[class^="vertical-property-card_fullAddress__"]').text
-                typeOfAgreement = element.find_element(By.CSS_SELECTOR, '[class^="contracts_typeOfAgreement__"]').text
-                price = float(element.find_element(By.CSS_SELECTOR, '[class^="contracts_priceNumber__"]').text.replace('R$', '').replace('.', '').replace(',', '.').strip())
-                try:
-                    exclusivity_elem = element.find_element(By.CSS_SELECTOR, '[class^="carousel-card_exclusivity__"]')
-                    isExclusive = 'Sim'
-                except NoSuchElementException:
-                    isExclusive = 'Não'
-                listing_id = element.find_element(By.CSS_SELECTOR, '[class^="card-buttons_code__"]').text.replace('Cód.', '').strip()
-                listing_link = f'https://www.{site}/imovel/{listing_id}'
-
-                # Extrai informações da linha de características do card
-                characteristics = element.find_element(By.CSS_SELECTOR, '[class^="vertical-property-card_characteristics__"]')
-                characteristics_list = []
-                for span in characteristics.find_elements(By.TAG_NAME, 'span'):
-                    characteristics_list.append(span.text)
-
-                # Extrai cada característica individualmente
-                size = bedrooms = restrooms = parkingSpaces = None
-                for characteristic in characteristics_list:
-                    if 'm²' in characteristic:
-                        size = characteristic.split(' ')[0].replace('m²', '').replace('.', '').replace(',', '.').strip()
-                        size = float(size) if size.isdigit() else np.nan
-                    elif 'quarto' in characteristic.lower():
-                        bedrooms = characteristic.split(' ')[0]
-                        bedrooms = int(bedrooms) if bedrooms.isdigit() else np.nan
-                    elif 'banheiro' in characteristic.lower():
-                        restrooms = characteristic.split(' ')[0]
-                        restrooms = int(restrooms) if restrooms.isdigit() else np.nan
-                    elif 'vaga' in characteristic.lower():
-                        parkingSpaces = characteristic.split(' ')[0]
-                        parkingSpaces = int(parkingSpaces) if parkingSpaces.isdigit() else np.nan
-                    else:
-                        print(f'Unknown characteristic: {characteristic}. Website: {site}')
-
-                data.append({
-                    'site': site,
-                    'bairro': neighborhood,
-                    'endereço': address,
-                    'tipo_negocio': typeOfAgreement,
-                    'preco': price,
-                    'area': size,
-                    'quartos': bedrooms,
-                    'banheiros': restrooms,
-                    'vagas_de_garagem': parkingSpaces,
-                    'id_anuncio': listing_id,
-                    'link_anuncio': listing_link,
-                    'flag_exclusivo': isExclusive,
-                    'imagens': '|'.join(images)
-                })
+            driver = self.__force_page_load(driver)
+
+            # Extract every card on the page with a single script call
+            cards = driver.execute_script(EXTRACT_CARDS_SCRIPT, LISTING_CARD_SELECTOR)
+            data.extend(dict(card, site=site) for card in cards)
+
+            # Grab the first card only to detect the page change
+            first_card = driver.find_elements(By.CSS_SELECTOR, LISTING_CARD_SELECTOR)[:1]
 
             # Go to next page if available
-            try:
-                for btn in self.driver.find_elements(By.CSS_SELECTOR, '[class^="building-card-pages_labelText__"]'):
-                    if btn.text == 'Próximo':
-                        if btn.is_enabled():
-                            location = btn.location # Dict {'x': int, 'y': int}
-                            self.driver.execute_script(f'window.scrollTo({location["x"]}, {location["y"]-100});')  # Scroll to the bullet
-                            time.sleep(1)  # Wait for the scroll to complete
-                            old_url = self.driver.current_url
-                            btn.click()
-                            time.sleep(3)
-                            if self.driver.current_url == old_url:
-                                reached_end = True
-                        break
-            except NoSuchElementException:
-                reached_end = True
-
-        return data
+            reached_end = not self.__go_to_next_page(driver, first_card[0] if first_card else None)
+
+        return normalize_frontend(data)
 
 
 def update_scraped_data():
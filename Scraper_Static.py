@@ -0,0 +1,273 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pandas as pd
+import requests
+import logging
+import json
+import os
+
+from Scraper import RealEstateAPIScraper
+from Scraper_Frontend import build_link_params
+from Domains import load_domains
+from Normalizer import normalize_api, normalize_frontend, concat_normalized
+from Next_Data import NEXT_DATA_PATTERN
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class _Node:
+    """Nó mínimo da árvore HTML usado pelo parser de cards."""
+
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional['_Node']):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, _Node):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, tag: Optional[str] = None, class_prefix: Optional[str] = None, **attrs) -> List['_Node']:
+        found = []
+        for node in self.iter():
+            if tag is not None and node.tag != tag:
+                continue
+            if class_prefix is not None and not node.attrs.get('class', '').startswith(class_prefix):
+                continue
+            if any(node.attrs.get(key) != value for key, value in attrs.items()):
+                continue
+            found.append(node)
+        return found
+
+    def find(self, tag: Optional[str] = None, class_prefix: Optional[str] = None, **attrs) -> Optional['_Node']:
+        found = self.find_all(tag, class_prefix, **attrs)
+        return found[0] if found else None
+
+    def text(self) -> str:
+        parts = []
+        for child in self.children:
+            parts.append(child.text() if isinstance(child, _Node) else child)
+        return ' '.join(' '.join(parts).split())
+
+
+class _TreeBuilder(HTMLParser):
+    """Constrói uma árvore de _Node a partir do HTML estático da página."""
+
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node('document', {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, {key: value or '' for key, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in self.VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(_Node(tag, {key: value or '' for key, value in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        # Sobe até o nó correspondente, tolerando tags não fechadas
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if data.strip():
+            self.current.children.append(data)
+
+
+class StaticFrontEnd_Scraper:
+    """
+    Extrai os anúncios das páginas /venda sem navegador.
+
+    As páginas são renderizadas no servidor, então os anúncios são lidos dos dados
+    embutidos (__NEXT_DATA__) ou, na falta deles, do HTML estático dos cards. Usa os
+    mesmos parâmetros de consulta do FrontEnd_Scraper, permitindo os filtros exclusivos
+    do frontend sem Selenium.
+    """
+
+    def __init__(self, params: Optional[dict] = None, max_workers: int = 8, timeout: float = 15, max_pages: int = 200):
+        """
+        Args:
+            params (Optional[dict]): Filtros da página /venda (mesmo formato do FrontEnd_Scraper).
+            max_workers (int): Número máximo de sites buscados em paralelo.
+            timeout (float): Tempo limite de cada requisição, em segundos.
+            max_pages (int): Limite de páginas por site, como proteção contra laços infinitos.
+        """
+        self.sites = load_domains()
+        self.params = params
+        self.max_workers = max(1, min(max_workers, len(self.sites)))
+        self.timeout = timeout
+        self.max_pages = max_pages
+
+        # Sessão HTTP compartilhada com pool de conexões e novas tentativas
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=len(self.sites), pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        })
+
+    def _fetch_page(self, site: str, page: int) -> Optional[str]:
+        """
+        Busca o HTML de uma página de listagem. Retorna None se a requisição falhar.
+        """
+        url = f'https://www.{site}/venda?{build_link_params(self.params, page=page)}'
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+        except requests.exceptions.RequestException as e:
+            logging.error(f"A requisição para {url} falhou: {e}")
+            return None
+
+    @staticmethod
+    def _find_embedded_properties(data: Any) -> List[Dict[str, Any]]:
+        """
+        Percorre o JSON embutido procurando objetos com o formato de imóvel da API.
+        """
+        found = []
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                if 'id' in item and 'address' in item and ('contracts' in item or 'privateArea' in item):
+                    found.append(item)
+                    continue
+                stack.extend(item.values())
+            elif isinstance(item, list):
+                stack.extend(reversed(item))
+        return found
+
+    def _parse_embedded_data(self, html: str, site: str) -> Optional[pd.DataFrame]:
+        """
+        Extrai os anúncios do __NEXT_DATA__. Retorna None se a página não trouxer esses dados.
+        """
+        match = NEXT_DATA_PATTERN.search(html)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            logging.warning(f"Falha ao decodificar o __NEXT_DATA__ de {site}.")
+            return None
+
+        properties = self._find_embedded_properties(data)
+        if not properties:
+            return None
+
+        # Os objetos embutidos têm o mesmo formato da API, então reaproveita o parser dela
+        api_parser = RealEstateAPIScraper(domain_name=site)
+        rows = [api_parser._parse_property_data(prop) for prop in properties]
+        df = normalize_api(rows)
+        df['agreement'] = pd.Series([((prop.get('contracts') or [{}])[0] or {}).get('type') for prop in properties], dtype='string')
+        return df
+
+    @staticmethod
+    def _parse_static_markup(html: str, site: str) -> pd.DataFrame:
+        """
+        Extrai os cards diretamente do HTML, com os mesmos campos do EXTRACT_CARDS_SCRIPT.
+        """
+        builder = _TreeBuilder()
+        builder.feed(html)
+
+        def text(card: _Node, class_prefix: str) -> Optional[str]:
+            node = card.find(class_prefix=class_prefix)
+            return node.text() if node is not None else None
+
+        cards = []
+        for card in builder.root.find_all(itemtype='https://schema.org/Apartment'):
+            characteristics = card.find(class_prefix='vertical-property-card_characteristics__')
+            images = [img.attrs.get('src') for node in card.find_all(**{'aria-label': 'Ver imagem'})
+                      for img in node.find_all('img') if img.attrs.get('src')]
+            cards.append({
+                'site': site,
+                'neighborhood': text(card, 'vertical-property-card_neighborhood__'),
+                'address': text(card, 'vertical-property-card_fullAddress__'),
+                'agreement': text(card, 'contracts_typeOfAgreement__'),
+                'price': text(card, 'contracts_priceNumber__'),
+                'exclusive': card.find(class_prefix='carousel-card_exclusivity__') is not None,
+                'code': text(card, 'card-buttons_code__'),
+                'characteristics': [span.text() for span in characteristics.find_all('span')] if characteristics else [],
+                'images': images,
+            })
+        return normalize_frontend(cards)
+
+    def get_listings(self, site: str) -> pd.DataFrame:
+        """
+        Percorre as páginas de um site até não encontrar novos anúncios.
+        """
+        logging.info(f"Iniciando a extração estática de {site}...")
+        pages = []
+        seen_ids = set()
+
+        for page in range(1, self.max_pages + 1):
+            html = self._fetch_page(site, page)
+            if html is None:
+                break
+
+            df = self._parse_embedded_data(html, site)
+            if df is None:
+                df = self._parse_static_markup(html, site)
+
+            # Alguns sites repetem a última página quando o número passa do total
+            df = df[~df['id'].isin(seen_ids)]
+            if df.empty:
+                break
+            seen_ids.update(df['id'].dropna())
+            pages.append(df)
+
+        data = concat_normalized(pages)
+        logging.info(f"Extração estática de {site} finalizada. {len(data)} anúncios encontrados.")
+        return data
+
+    def scrape_all(self) -> pd.DataFrame:
+        """
+        Extrai todos os sites em paralelo e salva o resultado em CSV e Parquet.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.get_listings, site): site for site in self.sites}
+            for future in as_completed(futures):
+                site = futures[future]
+                try:
+                    results[site] = future.result()
+                except Exception as e:
+                    logging.error(f"Ocorreu um erro inesperado ao processar {site}: {e}")
+
+        df = concat_normalized([results[site] for site in self.sites if site in results])
+        logging.info(f"Total de anúncios extraídos: {len(df)}")
+
+        os.makedirs('data', exist_ok=True)
+        output_filename = os.path.join('data', 'all_data_frontend.csv')
+        try:
+            df.to_csv(output_filename, index=False, encoding='utf-8')
+            df.to_parquet(output_filename.replace('.csv', '.parquet'), index=False)
+        except IOError as e:
+            logging.error(f"Falha ao escrever no arquivo {output_filename}: {e}")
+
+        return df
+
+
+def update_scraped_data():
+    scraper = StaticFrontEnd_Scraper(params={'tipos': ['apartamento', 'casa'], 'precoMinimo': 25000000, 'precoMaximo': 32000000})
+    scraper.scrape_all()
+
+if __name__ == "__main__":
+    update_scraped_data()
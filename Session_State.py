@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUState:
+    """
+    Estado de interface por item (ex: imagem atual de cada card), limitado aos
+    max_items usados mais recentemente.
+
+    Fica guardado em uma única chave do st.session_state, em vez de uma chave por
+    card, então o estado de uma sessão longa não cresce sem limite.
+    """
+
+    def __init__(self, max_items: int = 200):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def set(self, key: Hashable, value: Any):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._items.pop(key, default)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
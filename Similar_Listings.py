@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+# Peso de cada característica na distância (aplicado ao quadrado da diferença normalizada)
+FEATURE_WEIGHTS = {
+    "price": 1.0,
+    "area": 1.0,
+    "bedrooms": 0.7,
+    "parking_spaces": 0.4,
+    "location": 1.0,
+}
+
+# Distância geográfica (km) que pesa o mesmo que um desvio padrão das demais características
+LOCATION_SCALE_KM = 2.0
+
+# Quilômetros por grau de latitude (projeção equirretangular, suficiente para a escala de uma região)
+KM_PER_DEGREE = 111.32
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    """Centraliza pela mediana e divide pelo desvio padrão; ausentes ficam na mediana."""
+    median = np.nanmedian(values) if np.isfinite(values).any() else 0.0
+    values = np.where(np.isfinite(values), values, median)
+    std = values.std()
+    return (values - median) / (std if std > 0 else 1.0)
+
+
+class SimilarityIndex:
+    """
+    Vizinhos mais próximos entre os anúncios, calculado uma vez por versão do dataset.
+
+    Cada anúncio vira um vetor com log do preço, log da área, quartos e vagas normalizados,
+    mais as coordenadas projetadas em km (divididas por LOCATION_SCALE_KM). Uma consulta é
+    uma única passada vetorizada sobre a matriz float32 (n x 6) seguida de argpartition,
+    sem ordenar o dataset inteiro. Só anúncios do mesmo tipo (apartamento, casa, ...) são
+    comparados, de qualquer imobiliária.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        def numeric(column: str) -> np.ndarray:
+            return df[column].to_numpy(dtype="float64", na_value=np.nan)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price = np.log(np.where(numeric("price") > 0, numeric("price"), np.nan))
+            area = np.log(np.where(numeric("private_area_m2") > 0, numeric("private_area_m2"), np.nan))
+        latitude, longitude = numeric("latitude"), numeric("longitude")
+        center_latitude = np.nanmedian(latitude) if np.isfinite(latitude).any() else 0.0
+        center_longitude = np.nanmedian(longitude) if np.isfinite(longitude).any() else 0.0
+        # Sem coordenadas, o anúncio fica no centro da região (não é favorecido nem excluído)
+        north_km = np.where(np.isfinite(latitude), latitude - center_latitude, 0.0) * KM_PER_DEGREE
+        east_km = np.where(np.isfinite(longitude), longitude - center_longitude, 0.0) * KM_PER_DEGREE * np.cos(np.radians(center_latitude))
+
+        columns = [
+            _standardize(price) * np.sqrt(FEATURE_WEIGHTS["price"]),
+            _standardize(area) * np.sqrt(FEATURE_WEIGHTS["area"]),
+            _standardize(numeric("bedrooms")) * np.sqrt(FEATURE_WEIGHTS["bedrooms"]),
+            _standardize(numeric("parking_spaces")) * np.sqrt(FEATURE_WEIGHTS["parking_spaces"]),
+            north_km / LOCATION_SCALE_KM * np.sqrt(FEATURE_WEIGHTS["location"]),
+            east_km / LOCATION_SCALE_KM * np.sqrt(FEATURE_WEIGHTS["location"]),
+        ]
+        self.size = len(df)
+        self.matrix = np.ascontiguousarray(np.column_stack(columns), dtype=np.float32) if self.size else np.empty((0, 6), dtype=np.float32)
+        self.type_codes, _ = pd.factorize(df["type"].astype(object))
+        self._keys = pd.Index((df["domain"].astype(str) + "/" + df["id"].astype(str)).to_numpy(dtype=object))
+        self._ids = pd.Index(df["id"].astype(str).to_numpy(dtype=object))
+
+    def position(self, key: str) -> Optional[int]:
+        """Posição (iloc) do anúncio com a chave domain/id, ou None se ele não existir nesta versão."""
+        positions = self._keys.get_indexer_for([key])
+        return int(positions[0]) if len(positions) and positions[0] >= 0 else None
+
+    def tagged_positions(self, user_tags: Dict[str, str], tags: Iterable[str]) -> np.ndarray:
+        """Posições dos anúncios marcados com alguma das tags (as tags são guardadas por id)."""
+        tags = set(tags)
+        ids = [prop_id for prop_id, tag in user_tags.items() if tag in tags]
+        if not ids:
+            return np.empty(0, dtype=np.intp)
+        positions = self._ids.get_indexer_for(ids)
+        return np.unique(positions[positions >= 0])
+
+    def tagged_mask(self, user_tags: Dict[str, str], tags: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.tagged_positions(user_tags, tags)] = True
+        return mask
+
+    def distances(self, position: int) -> np.ndarray:
+        """Distância (ao quadrado) de todos os anúncios até o da posição; outros tipos ficam em infinito."""
+        diff = self.matrix - self.matrix[position]
+        distances = np.einsum("ij,ij->i", diff, diff)
+        distances[self.type_codes != self.type_codes[position]] = np.inf
+        return distances
+
+    @staticmethod
+    def _nearest(distances: np.ndarray, k: int) -> np.ndarray:
+        """As k menores distâncias finitas, em ordem crescente."""
+        valid = int(np.isfinite(distances).sum())
+        k = min(k, valid)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return nearest[np.argsort(distances[nearest], kind="stable")]
+
+    def similar(self, position: int, k: int = 12, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Os k anúncios mais parecidos com o da posição (sem ele mesmo e sem os excluídos).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Posições (iloc) e distâncias, da mais próxima à mais distante.
+        """
+        distances = self.distances(position)
+        distances[position] = np.inf
+        if exclude is not None:
+            distances[exclude] = np.inf
+        nearest = self._nearest(distances, k)
+        return nearest, np.sqrt(distances[nearest])
+
+    def recommend(self, favorites: np.ndarray, k: int = 12, exclude: Optional[np.ndarray] = None
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Anúncios ordenados pela distância ao favorito mais parecido (uma passada por favorito).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Posições, distâncias e a posição do
+            favorito mais próximo de cada recomendação.
+        """
+        best = np.full(self.size, np.inf, dtype=np.float32)
+        closest = np.full(self.size, -1, dtype=np.intp)
+        for favorite in favorites:
+            distances = self.distances(int(favorite))
+            closer = distances < best
+            best[closer] = distances[closer]
+            closest[closer] = favorite
+        best[favorites] = np.inf
+        if exclude is not None:
+            best[exclude] = np.inf
+        nearest = self._nearest(best, k)
+        return nearest, np.sqrt(best[nearest]), closest[nearest]
+
+
+def benchmark(rows: int = 100_000, queries: int = 200, favorites: int = 20, seed: int = 42) -> Dict[str, float]:
+    """
+    Tempo de construção do índice e de cada consulta (mediana, em ms) em um dataset sintético.
+    """
+    from Synthetic_Data import synthetic_listings
+
+    df = synthetic_listings(rows, seed)
+    started = time.perf_counter()
+    index = SimilarityIndex(df)
+    results = {"build_ms": (time.perf_counter() - started) * 1000}
+
+    rng = np.random.default_rng(seed)
+    timings: List[float] = []
+    for position in rng.integers(0, rows, queries):
+        started = time.perf_counter()
+        index.similar(int(position))
+        timings.append((time.perf_counter() - started) * 1000)
+    results["similar_ms"] = float(np.median(timings))
+
+    started = time.perf_counter()
+    index.recommend(rng.integers(0, rows, favorites))
+    results[f"recommend_{favorites}_favorites_ms"] = (time.perf_counter() - started) * 1000
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o índice de anúncios semelhantes em dados sintéticos.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    for name, value in benchmark(args.rows).items():
+        print(f"{name:>28}: {value:,.2f}")
@@ -0,0 +1,60 @@
+from typing import Optional
+import pandas as pd
+import numpy as np
+import time
+
+from Normalizer import SCHEMA
+from Domains import DOMAINS
+
+CITIES = ["Santa Cruz do Sul", "Venâncio Aires", "Vera Cruz", "Rio Pardo", "Candelária"]
+NEIGHBORHOODS = ["Centro", "Goiás", "Santo Inácio", "Universitário", "Arroio Grande", "Higienópolis",
+                 "Schulz", "Bom Jesus", "Avenida", "Ana Nery", "Linha Santa Cruz", "Independência"]
+TYPES = ["Apartamento", "Casa", "Terreno", "Sala Comercial", "Cobertura", "Sobrado"]
+
+# Centro aproximado de Santa Cruz do Sul, usado para espalhar as coordenadas
+CENTER = (-29.7175, -52.4264)
+
+
+def synthetic_listings(rows: int, seed: int = 42, published_at: Optional[float] = None) -> pd.DataFrame:
+    """
+    Gera um DataFrame de anúncios fictícios no SCHEMA (mais as colunas de rastreamento),
+    para benchmarks e testes de carga sem depender dos sites.
+    """
+    rng = np.random.default_rng(seed)
+    published_at = published_at or time.time()
+    bedrooms = rng.integers(0, 6, rows).astype("float64")
+    area = np.round(rng.gamma(4.0, 25.0, rows) + 20 * bedrooms, 1)
+    price = np.round(area * rng.normal(5500, 1500, rows).clip(1500, None), -3)
+
+    df = pd.DataFrame({
+        "source": "api",
+        "domain": rng.choice(DOMAINS, rows),
+        "id": np.arange(1, rows + 1).astype(str),
+        "code": rng.integers(1000, 99999, rows).astype(str),
+        "title": None,
+        "description": None,
+        "type": rng.choice(TYPES, rows, p=[0.45, 0.25, 0.12, 0.08, 0.05, 0.05]),
+        "agreement": "Venda",
+        "exclusivity": rng.random(rows) < 0.2,
+        "neighborhood": rng.choice(NEIGHBORHOODS, rows),
+        "city": rng.choice(CITIES, rows, p=[0.6, 0.15, 0.1, 0.1, 0.05]),
+        "address": None,
+        "bedrooms": bedrooms,
+        "bathrooms": np.maximum(1, bedrooms - rng.integers(0, 2, rows)).astype("float64"),
+        "parking_spaces": rng.integers(0, 4, rows).astype("float64"),
+        "private_area_m2": area,
+        "price": price,
+        "latitude": CENTER[0] + rng.normal(0, 0.03, rows),
+        "longitude": CENTER[1] + rng.normal(0, 0.03, rows),
+        "image_urls": None,
+        "property_url": None,
+    })
+    # Três imagens fictícias por anúncio, para exercitar a navegação de imagens dos cards
+    urls = "https://" + df["domain"] + "/imovel/" + df["id"]
+    df["image_urls"] = urls + "/1.jpg | " + urls + "/2.jpg | " + urls + "/3.jpg"
+    df["property_url"] = urls
+    df = df.astype(SCHEMA)
+    df["content_hash"] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    df["first_seen"] = published_at - rng.integers(0, 90 * 86400, rows)
+    df["updated_at"] = np.maximum(df["first_seen"], published_at - rng.integers(0, 30 * 86400, rows))
+    return df
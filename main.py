@@ -1,12 +1,34 @@
 import streamlit.components.v1 as components
 import streamlit as st
 import pandas as pd
+import functools
+import threading
+import logging
+import uuid
 import os
 import json
+import time
+
+import Data_Store
+import Query_Engine
+import Saved_Searches
+import Market_Stats
+import Session_State
+import Rerun_Profiler
+import Similar_Listings
 
 # Configuração da página
 st.set_page_config(layout="wide", page_title="Imóveis em Santa Cruz do Sul", page_icon="🏠")
 
+# Número máximo de cards com estado de interface guardado por sessão
+CARD_STATE_LIMIT = 200
+
+# Número de anúncios exibidos em "Semelhantes" e nas recomendações pelos favoritos
+SIMILAR_COUNT = 12
+
+# Intervalo mínimo (s) entre as atualizações da última atividade da visita
+VISIT_TOUCH_INTERVAL = 60
+
 # Tag definitions
 TAG_OPTIONS = {
     "potential": {"label": "💡 Potencial", "color": "#28a745"},
@@ -23,7 +45,7 @@ def init_user_tags():
 
 def get_tags_file_path():
     """Get the path for the user tags file."""
-    return os.path.join('data', 'user_tags.json')
+    return Data_Store.data_path('user_tags.json')
 
 def load_tags_from_file():
     """Load user tags from a local file."""
@@ -88,37 +110,102 @@ def set_property_tag(property_id, tag):
     save_user_tags()
 
 
-@st.cache_data
-def load_data(file_path):
+@st.cache_resource(max_entries=1)
+def load_shared_dataset(version):
     """
-    Carrega os dados do arquivo Parquet e faz um pré-processamento básico.
+    Carrega o dataset publicado uma única vez por processo (e por versão).
+
+    O arquivo Arrow é mapeado em memória e o DataFrame é compartilhado, sem cópia,
+    por todas as sessões. Ele deve ser tratado como somente leitura.
     """
-    
-    # Se o arquivo não existir, executa o scraper para atualizá-lo
-    if not os.path.exists(file_path):
-        import Scraper
-        Scraper.update_scraped_data()
-        if not os.path.exists(file_path):
-            st.error(f"Erro: O arquivo '{file_path}' não foi encontrado após a atualização. Verifique se o scraper foi executado corretamente.")
-            return pd.DataFrame()
-    
-    # Se o arquivo existir, verifica se foi modificado hoje. Se não, executa o scraper novamente
-    if os.path.exists(file_path) and pd.to_datetime(os.path.getmtime(file_path), unit='s').date() != pd.to_datetime('today').date():
+    return Data_Store.load_frame(version)
+
+
+@st.cache_resource(max_entries=1)
+def load_shared_market_stats(version):
+    """
+    Agregados de mercado materializados da versão, compartilhados entre as sessões.
+    """
+    return Market_Stats.load_market_stats(version)
+
+
+@st.cache_resource(max_entries=1)
+def load_facet_index(version, _df):
+    """
+    Códigos inteiros das facetas (tipo, bairro, imobiliária, ...) da versão, usados nos
+    filtros e nas contagens da sidebar. Calculados uma vez e compartilhados entre as sessões.
+    """
+    return Query_Engine.FacetIndex(_df)
+
+
+@st.cache_resource(max_entries=1)
+def load_sort_index(version, _df):
+    """
+    Permutações de cada ordenação da versão, compartilhadas entre as sessões.
+    """
+    return Query_Engine.SortIndex(_df)
+
+
+@st.cache_resource(max_entries=1)
+def load_similarity_index(version, _df):
+    """
+    Vetores normalizados dos anúncios da versão para as buscas de semelhantes, compartilhados entre as sessões.
+    """
+    return Similar_Listings.SimilarityIndex(_df)
+
+
+@st.cache_resource
+def get_scrape_guard():
+    """
+    Lock e data da última tentativa de atualização dos dados, compartilhados por todas as sessões do processo.
+    """
+    return {"lock": threading.Lock(), "last_attempt": None}
+
+
+def refresh_dataset_if_stale():
+    """
+    Executa o scraper se o dataset não existir ou não for de hoje, no máximo uma vez por dia
+    por processo (mesmo que a extração falhe ou não publique nada). Enquanto uma sessão
+    atualiza, as demais seguem com o dataset atual; só esperam se ainda não houver nenhum.
+    """
+    today = pd.to_datetime('today').date()
+    published_at = Data_Store.dataset_mtime()
+    if published_at is not None and pd.to_datetime(published_at, unit='s').date() == today:
+        return
+
+    guard = get_scrape_guard()
+    if guard["last_attempt"] == today or not guard["lock"].acquire(blocking=published_at is None):
+        return
+    try:
+        # Outra sessão pode ter atualizado enquanto esta esperava o lock
+        if guard["last_attempt"] == today:
+            return
+        guard["last_attempt"] = today
         import Scraper
         Scraper.update_scraped_data()
-        if not os.path.exists(file_path):
-            st.error(f"Erro: O arquivo '{file_path}' não foi encontrado após a atualização. Verifique se o scraper foi executado corretamente.")
-            return pd.DataFrame()
-    
-    # Carrega os dados do arquivo Parquet    
-    data = pd.read_parquet(file_path)
-    
-    # Garante que as colunas numéricas sejam do tipo float
-    for col in ['bedrooms', 'bathrooms', 'parking_spaces', 'private_area_m2', 'price', 'latitude', 'longitude']:
-        data[col] = pd.to_numeric(data[col], errors='coerce')
-    # Remove linhas onde colunas essenciais são nulas
-    data.dropna(subset=['id', 'price', 'city', 'neighborhood'], inplace=True) # TODO Review
-    return data
+    except Exception as e:
+        st.error(f"Não foi possível atualizar os dados: {e}")
+    finally:
+        guard["lock"].release()
+
+
+def load_data():
+    """
+    Carrega o dataset publicado, executando o scraper se ele não existir ou não for de hoje.
+
+    Returns:
+        tuple: (versão, DataFrame). Os índices compartilhados devem usar essa versão, e não
+        consultar a versão atual de novo: uma publicação no meio do rerun os misturaria.
+    """
+    Data_Store.migrate_legacy_parquet()
+    refresh_dataset_if_stale()
+
+    version = Data_Store.dataset_version()
+    if version is None:
+        st.error("Erro: Nenhum dataset foi publicado após a atualização. Verifique se o scraper foi executado corretamente.")
+        return None, pd.DataFrame()
+
+    return version, load_shared_dataset(version)
 
 
 def get_unique_sorted_values(series):
@@ -134,83 +221,637 @@ def float_to_str(value: float, decimals: int) -> str:
     return ''
 
 
+# Rótulos da ordenação -> chave do Query_Engine
+SORT_LABELS = {
+    "Menor Preço": "price_asc",
+    "Maior Preço": "price_desc",
+    "Menor Preço por m²": "price_per_m2_asc",
+    "Maior Área": "area_desc",
+    "Mais Recentes": "newest",
+}
+
+# Chaves dos widgets da sidebar -> chave do filtro no Query_Engine
+FILTER_WIDGET_KEYS = {
+    "types_filter": "types",
+    "city_filter": "city",
+    "neighborhoods_filter": "neighborhoods",
+    "agencies_filter": "agencies",
+    "bedrooms_filter": "bedrooms",
+    "bathrooms_filter": "bathrooms",
+    "parking_filter": "parking_spaces",
+    "show_discarded": "show_discarded",
+}
+
+
+def init_filter_state(types, cities):
+    """
+    Define os valores iniciais dos widgets de filtro no session state (uma vez por sessão).
+    Os widgets usam apenas a chave, assim uma busca salva pode alterá-los sem conflito.
+    """
+    defaults = Query_Engine.DEFAULT_FILTERS
+    initial = {
+        "types_filter": [t for t in defaults["types"] if t in types],
+        "city_filter": defaults["city"] if defaults["city"] in cities else (cities[0] if cities else None),
+        "neighborhoods_filter": [],
+        "agencies_filter": [],
+        "bedrooms_filter": [],
+        "bathrooms_filter": [],
+        "parking_filter": [],
+        "min_price": defaults["price_range"][0],
+        "max_price": defaults["price_range"][1],
+        "min_area": defaults["area_range"][0],
+        "max_area": defaults["area_range"][1],
+        "show_discarded": defaults["show_discarded"],
+        "tags_filter": ["Todos"],
+        "only_new_filter": False,
+    }
+    for key, value in initial.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+    # Uma busca salva pode trazer valores que não existem no dataset atual
+    st.session_state.types_filter = [t for t in st.session_state.types_filter if t in types]
+    if st.session_state.city_filter not in cities:
+        st.session_state.city_filter = initial["city_filter"]
+
+
+def filters_from_state():
+    """Filtros do Query_Engine a partir dos valores atuais dos widgets da sidebar."""
+    filters = {filter_key: st.session_state[widget_key] for widget_key, filter_key in FILTER_WIDGET_KEYS.items()}
+    filters["price_range"] = (st.session_state.min_price, st.session_state.max_price)
+    filters["area_range"] = (st.session_state.min_area, st.session_state.max_area)
+    tag_keys = {tag_info["label"]: key for key, tag_info in TAG_OPTIONS.items()}
+    selected_tag_labels = st.session_state.tags_filter
+    filters["tags"] = [] if "Todos" in selected_tag_labels else [tag_keys[label] for label in selected_tag_labels if label in tag_keys]
+    previous_visit = st.session_state.previous_visit
+    filters["new_since"] = previous_visit if st.session_state.only_new_filter and previous_visit else None
+    return filters
+
+
+def with_count(counts):
+    """format_func dos widgets de faceta: mostra o número de imóveis ao lado de cada opção."""
+    return lambda option: f"{option} ({counts.get(str(option), 0)})"
+
+
+def apply_saved_search(name):
+    """Callback: carrega uma busca salva nos widgets da sidebar."""
+    search = Saved_Searches.load_saved_searches().get(name)
+    if not search:
+        return
+    filters = Query_Engine.normalize_filters(search.get("filters"))
+    for widget_key, filter_key in FILTER_WIDGET_KEYS.items():
+        st.session_state[widget_key] = filters[filter_key]
+    st.session_state.min_price, st.session_state.max_price = filters["price_range"]
+    st.session_state.min_area, st.session_state.max_area = filters["area_range"]
+    st.session_state.tags_filter = [TAG_OPTIONS[tag]["label"] for tag in filters["tags"] if tag in TAG_OPTIONS] or ["Todos"]
+    sort_labels = {key: label for label, key in SORT_LABELS.items()}
+    st.session_state.sort_order = sort_labels.get(search.get("sort"), sort_labels[Query_Engine.DEFAULT_SORT])
+    st.session_state.page_number = 1
+
+
+def render_listing_details(row):
+    """Expander com o título, a descrição completa (ou a resumida da listagem) e as comodidades."""
+    description = row.get('full_description', pd.NA)
+    if pd.isna(description):
+        description = row['description']
+    amenities = row.get('amenities', pd.NA)
+    if pd.isna(description) and pd.isna(row['title']) and pd.isna(amenities):
+        return
+    with st.expander("Descrição do Anúncio", expanded=False):
+        if pd.notna(row['title']):
+            st.markdown(f"**{row['title']}**")
+        if pd.notna(description):
+            st.write(description)
+        if pd.notna(amenities):
+            st.markdown("**Comodidades do imóvel**")
+            st.markdown("\n".join(f"- {amenity}" for amenity in str(amenities).split(' | ')))
+
+
+def render_market_stats(market_stats, selected_city, selected_neighborhoods):
+    """Resumo do preço por m² da cidade e dos bairros na sidebar (consultas O(1) aos agregados)."""
+    with st.sidebar:
+        with st.expander("📊 Mercado", expanded=False):
+            city_stats = market_stats.lookup("city", selected_city)
+            if city_stats:
+                st.markdown(f"**{selected_city}**: mediana de R$ {float_to_str(city_stats['median'], 0)}/m² ({city_stats['count']} imóveis)")
+
+            rows = []
+            for neighborhood in selected_neighborhoods:
+                stats = market_stats.lookup("neighborhood", selected_city, neighborhood)
+                if stats:
+                    rows.append({
+                        "Bairro": neighborhood,
+                        "Mediana R$/m²": float_to_str(stats["median"], 0),
+                        "P25–P75 R$/m²": f"{float_to_str(stats['p25'], 0)} – {float_to_str(stats['p75'], 0)}",
+                        "Imóveis": stats["count"],
+                    })
+            if rows:
+                st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+            if market_stats.agencies:
+                st.markdown("**Anúncios por imobiliária**")
+                agencies = pd.DataFrame(sorted(market_stats.agencies.items(), key=lambda item: -item[1]), columns=["Imobiliária", "Imóveis"])
+                st.dataframe(agencies, hide_index=True, use_container_width=True)
+
+
+def render_saved_searches(filters, sort_key):
+    """Seção da sidebar para salvar/carregar buscas e ver as notificações."""
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("🔖 Buscas Salvas", expanded=False):
+            searches = Saved_Searches.load_saved_searches()
+            if searches:
+                selected_search = st.selectbox("Busca", options=sorted(searches), key="saved_search_choice")
+                col1, col2 = st.columns(2)
+                col1.button("Carregar", on_click=apply_saved_search, args=(selected_search,), use_container_width=True)
+                if col2.button("Excluir", use_container_width=True):
+                    Saved_Searches.delete_search(selected_search)
+                    st.rerun()
+
+            search_name = st.text_input("Nome da busca", key="saved_search_name")
+            if st.button("Salvar busca atual", disabled=not search_name.strip(), use_container_width=True):
+                Saved_Searches.save_search(search_name.strip(), filters, sort_key)
+                st.success(f"Busca '{search_name.strip()}' salva.")
+
+        notifications = Saved_Searches.read_notifications(limit=10)
+        if notifications:
+            with st.expander(f"🔔 Notificações ({len(notifications)})", expanded=False):
+                for notification in notifications:
+                    label = "Novo" if notification.get("is_new") else "Alterado"
+                    st.markdown(
+                        f"**{notification['search']}** · {label}: "
+                        f"[R$ {float_to_str(notification['price'], 0)} · {notification['neighborhood']}]({notification['property_url']})"
+                    )
+
+
+def get_card_state():
+    """Estado de interface dos cards (imagem atual), com limite LRU de cards por sessão."""
+    if 'card_state' not in st.session_state:
+        st.session_state.card_state = Session_State.LRUState(max_items=CARD_STATE_LIMIT)
+    return st.session_state.card_state
+
+
+def tag_changes_results(filters, old_tag, new_tag):
+    """
+    Indica se trocar a tag de um imóvel altera algo fora do card (exigindo um rerun completo):
+    a lista filtrada, os semelhantes (que ocultam descartados) ou as recomendações, que partem
+    dos favoritos e deixam de fora qualquer anúncio com tag.
+    """
+    if filters["tags"]:
+        return True
+    if "discarded" in (old_tag, new_tag) or "favorite" in (old_tag, new_tag):
+        return True
+    return "favorite" in st.session_state.user_tags.values()
+
+
+def get_profiler():
+    """Profiler de reruns da sessão, ativado por IMOVEIS_PROFILE=1 ou ?profile=1 na URL."""
+    if 'rerun_profiler' not in st.session_state:
+        st.session_state.rerun_profiler = Rerun_Profiler.RerunProfiler()
+    profiler = st.session_state.rerun_profiler
+    if not profiler.enabled and (Rerun_Profiler.profiling_enabled_by_env() or st.query_params.get("profile") == "1"):
+        profiler.enable()
+    return profiler
+
+
+def profiled_fragment(func):
+    """
+    st.fragment que também mede os reruns isolados do fragmento (ex: trocar de página ou
+    de imagem), que não passam pelo profiler.run do rerun completo.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return get_profiler().run(lambda: func(*args, **kwargs), fragment=func.__name__)
+    return st.fragment(wrapper)
+
+
+@profiled_fragment
+def render_card(row, market_stats, filters, key_prefix="property"):
+    """
+    Card de um imóvel. É um fragmento: as setas de imagem e as tags renderizam de novo
+    apenas este card, sem executar o restante da aplicação. O key_prefix separa os widgets
+    de um mesmo imóvel exibido em mais de uma seção (ex: na listagem e em "Semelhantes").
+    """
+    # Obter todas as imagens da propriedade
+    image_urls_str = str(row['image_urls']) if pd.notna(row['image_urls']) else ""
+    image_urls = [url.strip() for url in image_urls_str.split(' | ') if url.strip() and url.strip() != 'nan'] if image_urls_str else []
+
+    # Identificador único para cada propriedade (estável entre páginas e reruns da mesma versão)
+    property_id = f"{key_prefix}_{row['domain']}_{row['id']}_{row.name}"
+    card_state = get_card_state()
+
+    # Índice da imagem atual (estado limitado aos cards vistos mais recentemente)
+    current_img_idx = card_state.get(property_id, 0)
+    if image_urls and current_img_idx >= len(image_urls):
+        current_img_idx = 0
+
+    # Exibir imagem sem controles de navegação
+    if image_urls:
+        current_image = image_urls[current_img_idx]
+
+        # Exibir imagem
+        st.image(current_image, use_container_width=True)
+
+        # Indicador de posição das imagens (se houver mais de uma)
+        if len(image_urls) > 1:
+            st.markdown(f"<div style='text-align: center; font-size: 12px; color: #666; margin-top: -10px;'>{current_img_idx + 1} / {len(image_urls)}</div>", unsafe_allow_html=True)
+    else:
+        # Placeholder quando não há imagens
+        st.markdown("""
+        <div style="width:100%; height: 200px; background-color: #f0f0f0; display: flex; align-items: center; justify-content: center; border-radius: 8px; margin-bottom: 10px;">
+            <span style="color: #888; font-size: 14px;">Imagem Indisponível</span>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Cabeçalho com preço e informações básicas
+    col_price, col_features = st.columns([2, 4])
+    col_price.markdown(f"**R$ {float_to_str(row['price'], 0)}**")
+    # Area, Bedrooms, Bathrooms, Parking Spaces
+    area = f"{float_to_str(row['private_area_m2'], 0)} m²" if pd.notna(row['private_area_m2']) else None
+    bedrooms = f"🛏️ {float_to_str(row['bedrooms'], 0)}" if pd.notna(row['bedrooms']) else None
+    bathrooms = f"🚿 {float_to_str(row['bathrooms'], 0)}" if pd.notna(row['bathrooms']) else None
+    parking_spaces = f"🚗 {float_to_str(row['parking_spaces'], 0)}" if pd.notna(row['parking_spaces']) else None
+    col_features.markdown(f"<div style='text-align: right;'>{' | '.join(filter(None, [area, bedrooms, bathrooms, parking_spaces]))}</div>", unsafe_allow_html=True)
+    st.markdown(f"<a href='{row['property_url']}' target='_blank' style='text-decoration: none; color: inherit;'>📍 {row['neighborhood']}, {row['city']} 🔗</a>", unsafe_allow_html=True)
+
+    # Áreas útil e total, quando extraídas da página de detalhe
+    usable_area, total_area = row.get('usable_area_m2', pd.NA), row.get('total_area_m2', pd.NA)
+    if pd.notna(usable_area) or pd.notna(total_area):
+        areas = [f"Útil: {float_to_str(usable_area, 0)} m²" if pd.notna(usable_area) else None,
+                 f"Total: {float_to_str(total_area, 0)} m²" if pd.notna(total_area) else None]
+        st.markdown(f"<div style='font-size: 12px; color: #666;'>{' · '.join(filter(None, areas))}</div>", unsafe_allow_html=True)
+
+    # Comparação do preço por m² com a mediana do bairro
+    comparison = market_stats.compare(row)
+    if comparison:
+        diff = comparison['diff']
+        color = "#28a745" if diff < 0 else "#dc3545"
+        direction = "abaixo" if diff < 0 else "acima"
+        st.markdown(f"<div style='font-size: 12px; color: {color};' title='R$ {float_to_str(comparison['price_per_m2'], 0)}/m² vs. mediana de R$ {float_to_str(comparison['median'], 0)}/m² ({comparison['count']} imóveis)'>{abs(diff) * 100:.0f}% {direction} da mediana {comparison['label']}</div>", unsafe_allow_html=True)
+
+    # Controles de navegação de imagem na parte inferior (só aparecem se houver mais de uma imagem)
+    if image_urls and len(image_urls) > 1:
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 6, 1])
+
+        with nav_col1:
+            if st.button("◀", key=f"{property_id}_prev", help="Imagem anterior", use_container_width=True):
+                card_state.set(property_id, (current_img_idx - 1) % len(image_urls))
+                # Apenas este card é renderizado de novo
+                st.rerun(scope="fragment")
+
+        with nav_col2:
+            # Mostrar descrição do anúncio na coluna central
+            render_listing_details(row)
+
+        with nav_col3:
+            if st.button("▶", key=f"{property_id}_next", help="Próxima imagem", use_container_width=True):
+                card_state.set(property_id, (current_img_idx + 1) % len(image_urls))
+                # Apenas este card é renderizado de novo
+                st.rerun(scope="fragment")
+    else:
+        # Se não há navegação de imagem, mostrar descrição normalmente
+        render_listing_details(row)
+
+    # Sistema de Tags do Usuário
+    st.markdown("---")
+    current_tag = get_property_tag(row['id'])
+
+    # Display current tag if exists
+    if current_tag:
+        tag_info = TAG_OPTIONS[current_tag]
+        st.markdown(f"<div style='background-color: {tag_info['color']}15; border-left: 3px solid {tag_info['color']}; padding: 5px 10px; margin-bottom: 10px; border-radius: 3px;'><small>{tag_info['label']}</small></div>", unsafe_allow_html=True)
+
+    # Tag selection buttons in a compact layout
+    tag_cols = st.columns(len(TAG_OPTIONS))
+    for i, (tag_key, tag_info) in enumerate(TAG_OPTIONS.items()):
+        with tag_cols[i]:
+            is_current = current_tag == tag_key
+            button_style = "primary" if is_current else "secondary"
+
+            if st.button(
+                tag_info["label"].split()[-1],  # Just the text part, no emoji for space
+                key=f"tag_{property_id}_{tag_key}",
+                help=tag_info["label"],
+                use_container_width=True,
+                type=button_style
+            ):
+                # Toggle tag: remove if same, set if different
+                new_tag = None if is_current else tag_key
+                set_property_tag(row['id'], new_tag)
+                # Só o card muda se a tag não afetar os filtros, os semelhantes nem as recomendações
+                if tag_changes_results(filters, current_tag, new_tag):
+                    st.rerun()
+                st.rerun(scope="fragment")
+
+    # Anúncios parecidos de qualquer imobiliária (exibidos no topo da aba de anúncios)
+    if st.button("🔎 Semelhantes", key=f"{property_id}_similar", use_container_width=True):
+        st.session_state.similar_to = f"{row['domain']}/{row['id']}"
+        st.rerun()
+
+    st.markdown("---")
+
+
+def render_card_grid(df_cards, market_stats, filters, key_prefix="property", captions=None):
+    """Cards distribuídos em 3 colunas, com uma legenda opcional acima de cada um."""
+    # Criar uma única estrutura de 3 colunas
+    cols = st.columns(3)
+
+    # Distribuir os imóveis nas 3 colunas
+    for idx, (_, row) in enumerate(df_cards.iterrows()):
+        with cols[idx % 3]:
+            if captions is not None:
+                st.caption(captions[idx])
+            render_card(row, market_stats, filters, key_prefix)
+
+
+def hidden_mask(similarity, filters):
+    """Anúncios descartados, ocultos também nos semelhantes e nas recomendações (exceto com "Mostrar Descartados")."""
+    if filters["show_discarded"]:
+        return None
+    return similarity.tagged_mask(st.session_state.user_tags, ["discarded"])
+
+
+def listing_summary(row):
+    """Descrição curta de um anúncio (tipo, preço e bairro)."""
+    return f"{row['type']} de R$ {float_to_str(row['price'], 0)} em {row['neighborhood']}"
+
+
+def render_similar(df, similarity, market_stats, filters):
+    """Anúncios mais parecidos com o escolhido em "🔎 Semelhantes" (preço, área, quartos, vagas e localização)."""
+    key = st.session_state.get('similar_to')
+    if not key:
+        return
+    position = similarity.position(key)
+    if position is None:
+        # O anúncio saiu do dataset em uma nova publicação
+        st.session_state.pop('similar_to', None)
+        return
+
+    col_title, col_close = st.columns([5, 1])
+    col_title.markdown(f"#### 🔎 Semelhantes a: {listing_summary(df.iloc[position])}")
+    if col_close.button("✖ Fechar", key="close_similar", use_container_width=True):
+        st.session_state.pop('similar_to', None)
+        st.rerun()
+
+    positions, _ = similarity.similar(position, SIMILAR_COUNT, exclude=hidden_mask(similarity, filters))
+    if len(positions) == 0:
+        st.write("Nenhum imóvel semelhante encontrado.")
+    else:
+        render_card_grid(df.iloc[positions], market_stats, filters, key_prefix="similar")
+    st.markdown("---")
+
+
+def render_recommendations(df, similarity, market_stats, filters):
+    """Anúncios ainda sem tag, ordenados pela semelhança com os marcados como ❤️ Favorito."""
+    favorites = similarity.tagged_positions(st.session_state.user_tags, ["favorite"])
+    if len(favorites) == 0:
+        st.write("Marque imóveis como ❤️ Favorito para receber recomendações parecidas com eles.")
+        return
+
+    # Apenas anúncios ainda não avaliados (sem nenhuma tag)
+    tagged = similarity.tagged_mask(st.session_state.user_tags, TAG_OPTIONS)
+    positions, _, closest = similarity.recommend(favorites, SIMILAR_COUNT, exclude=tagged)
+    if len(positions) == 0:
+        st.write("Nenhuma recomendação encontrada.")
+        return
+    captions = [f"Parecido com: {listing_summary(df.iloc[favorite])}" for favorite in closest]
+    render_card_grid(df.iloc[positions], market_stats, filters, key_prefix="recommended", captions=captions)
+
+
+@profiled_fragment
+def render_listings(version, df, mask, sort_key, filters, market_stats):
+    """
+    Aba de anúncios (grade de cards e paginação). Trocar de página renderiza de novo
+    apenas este fragmento, com os filtros calculados no último rerun completo.
+    """
+    sort_index = load_sort_index(version, df)
+
+    # Paginação
+    items_per_page = 20
+    total_items = int(mask.sum())
+    total_pages = max(1, (total_items + items_per_page - 1) // items_per_page)
+
+    # Initialize page_number in session state if not exists
+    if 'page_number' not in st.session_state:
+        st.session_state.page_number = 1
+
+    # Cursores (keyset) do início de cada página, válidos apenas para a consulta atual
+    query_key = Query_Engine.query_key(filters, sort_key)
+    if st.session_state.get('page_cursors_query') != query_key:
+        st.session_state.page_cursors_query = query_key
+        st.session_state.page_cursors = {}
+
+    # Ensure page_number is within valid range
+    if st.session_state.page_number > total_pages:
+        st.session_state.page_number = total_pages
+
+    page_number = st.session_state.page_number
+
+    # Informações de paginação centralizadas
+    st.markdown(f"<div style='text-align: center; margin-bottom: 20px;'>Página {page_number} de {total_pages} | Exibindo {min(items_per_page, total_items - (page_number-1)*items_per_page)} de {total_items} imóveis</div>", unsafe_allow_html=True)
+
+    start_index = (page_number - 1) * items_per_page
+    # A página percorre a permutação pré-calculada e para ao completar items_per_page imóveis
+    page_cursors = st.session_state.page_cursors
+    if page_number == 1:
+        positions = sort_index.page(mask, sort_key, items_per_page)
+    elif page_number in page_cursors:
+        positions = sort_index.page(mask, sort_key, items_per_page, page_cursors[page_number])
+    elif page_number == total_pages:
+        positions = sort_index.last_page(mask, sort_key, total_items - start_index)
+    else:
+        positions = sort_index.page_at(mask, sort_key, start_index, items_per_page)
+    if len(positions):
+        page_cursors[page_number + 1] = sort_index.cursor(sort_key, int(positions[-1]))
+    df_paginated = df.iloc[positions]
+
+    # Exibição em cards
+    if df_paginated.empty:
+        st.write("Nenhum imóvel encontrado para os filtros selecionados nesta página.")
+    else:
+        render_card_grid(df_paginated, market_stats, filters)
+
+        # Controles de paginação na parte inferior
+        st.markdown("---")
+        col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+
+        with col1:
+            if st.button("⏮️ Primeira", disabled=(page_number == 1), use_container_width=True):
+                st.session_state.page_number = 1
+                st.rerun(scope="fragment")
+
+        with col2:
+            if st.button("⬅️ Anterior", disabled=(page_number == 1), use_container_width=True):
+                st.session_state.page_number = max(1, page_number - 1)
+                st.rerun(scope="fragment")
+
+        with col3:
+            st.markdown(f"<div style='text-align: center; padding: 8px; background-color: #f0f2f6; border-radius: 5px; margin: 0 10px;'>Página {page_number} de {total_pages}</div>", unsafe_allow_html=True)
+
+        with col4:
+            if st.button("Próxima ➡️", disabled=(page_number == total_pages), use_container_width=True):
+                st.session_state.page_number = min(total_pages, page_number + 1)
+                st.rerun(scope="fragment")
+
+        with col5:
+            if st.button("Última ⏭️", disabled=(page_number == total_pages), use_container_width=True):
+                st.session_state.page_number = total_pages
+                st.rerun(scope="fragment")
+
+
+def get_visitor_id():
+    """
+    Identificador do navegador, guardado na URL (?visitor=...) para sobreviver a recarregamentos.
+    Cada pessoa da casa pode usar o próprio link salvo.
+    """
+    visitor = st.query_params.get("visitor")
+    if not visitor:
+        visitor = uuid.uuid4().hex[:12]
+        st.query_params["visitor"] = visitor
+    return visitor
+
+
+def track_visit():
+    """Registra a visita no início da sessão e mantém a última atividade atualizada."""
+    now = time.time()
+    # Uma falha ao gravar as visitas não impede o uso da aplicação: sem a visita anterior,
+    # o filtro "somente novos" fica indisponível e a atividade é gravada no próximo intervalo
+    if 'previous_visit' not in st.session_state:
+        st.session_state.visitor = get_visitor_id()
+        try:
+            st.session_state.previous_visit = Saved_Searches.register_visit(st.session_state.visitor, now)
+        except OSError as e:
+            logging.error(f"Não foi possível registrar a visita: {e}")
+            st.session_state.previous_visit = None
+        st.session_state.visit_touched_at = now
+    elif now - st.session_state.visit_touched_at >= VISIT_TOUCH_INTERVAL:
+        st.session_state.visit_touched_at = now
+        try:
+            Saved_Searches.touch_visit(st.session_state.visitor, now)
+        except OSError as e:
+            logging.error(f"Não foi possível atualizar a visita: {e}")
+
+
+def render_profiler_panel(profiler):
+    """Painel de depuração com o tempo e a memória de cada etapa dos últimos reruns."""
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("🛠️ Desempenho (reruns anteriores)", expanded=False):
+            if not profiler.history:
+                st.caption("Nenhum rerun medido ainda.")
+            for i, rerun in enumerate(profiler.history):
+                started = time.strftime('%H:%M:%S', time.localtime(rerun['started_at']))
+                summary = f"**{started}** · {rerun['total_ms']:.0f} ms"
+                if rerun.get('fragment'):
+                    summary += f" · fragmento {rerun['fragment']}"
+                if rerun['peak_kb'] is not None:
+                    summary += f" · pico {rerun['peak_kb'] / 1024:.1f} MB"
+                st.markdown(summary)
+                if i == 0 or st.checkbox("Detalhar", key=f"profiler_details_{rerun['started_at']}"):
+                    stages = pd.DataFrame(rerun['stages'])
+                    if not stages.empty:
+                        st.dataframe(stages.round(1), hide_index=True, use_container_width=True)
+                if rerun.get('profile'):
+                    st.caption(f"cProfile: {rerun['profile']}")
+                    st.dataframe(pd.DataFrame(profiler.top_functions(rerun['profile'])).round(1), hide_index=True, use_container_width=True)
+            if st.button("Gravar cProfile do próximo rerun", disabled=profiler.profile_next, use_container_width=True):
+                profiler.profile_next = True
+
+
 def main():
     """
     Função principal que executa a aplicação Streamlit.
     """
     # Initialize user tags first (before any sidebar access)
     init_user_tags()
+
+    # Visita do navegador atual e o fim da visita anterior dele (para "somente novos")
+    track_visit()
     
+    # Instrumentação opcional do rerun (IMOVEIS_PROFILE=1 ou ?profile=1)
+    profiler = get_profiler()
+
     # Carregamento dos dados
-    df = load_data('data\\all_properties.parquet')
+    with profiler.stage("load_data"):
+        version, df = load_data()
     if df.empty:
         return
+    market_stats = load_shared_market_stats(version)
 
     # --- PAINEL DE FILTROS (SIDEBAR) ---
     with st.sidebar:
         st.title("Filtros")
 
         # Ordenação
-        sort_order = st.selectbox("Ordenar por Preço", ["Menor para o Maior", "Maior para o Menor"])
-        ascending_order = sort_order == "Menor para o Maior"
+        sort_order = st.selectbox("Ordenar por", list(SORT_LABELS), key="sort_order")
+        sort_key = SORT_LABELS[sort_order]
+
+        # Valores iniciais dos filtros (ou os de uma busca salva carregada)
+        index = load_facet_index(version, df)
+        types = index.labels["types"]
+        cities = index.labels["city"]
+        init_filter_state(types, cities)
+
+        # Contagens de cada opção sob os demais filtros (ignorando a seleção da própria faceta)
+        with profiler.stage("facet_counts"):
+            counts = Query_Engine.facet_counts(df, filters_from_state(), st.session_state.user_tags, index)
 
         # Filtro de Tipo (multiselect)
-        types = get_unique_sorted_values(df['type'])
-        default_types = ["Apartamento"] if "Apartamento" in types else []
-        selected_types = st.multiselect(
+        st.multiselect(
             "Tipo",
             options=types,
-            default=default_types
+            format_func=with_count(counts["types"]),
+            key="types_filter"
         )
 
         # Filtro de Cidade
-        cities = get_unique_sorted_values(df['city'])
-        default_city_index = cities.index("Santa Cruz do Sul") if "Santa Cruz do Sul" in cities else 0
         selected_city = st.selectbox(
             "Cidade",
             options=cities,
-            index=default_city_index
+            key="city_filter"
         )
 
-        # Filtros aplicados à cidade e tipos para gerar opções dinâmicas
-        df_filtered_for_options = df[
-            df['city'].str.contains(selected_city, case=False, na=False)
-        ]
-        
-        if selected_types:
-            type_conditions = pd.Series([False] * len(df_filtered_for_options), index=df_filtered_for_options.index)
-            for selected_type in selected_types:
-                type_conditions |= df_filtered_for_options['type'].str.contains(selected_type, case=False, na=False)
-            df_filtered_for_options = df_filtered_for_options[type_conditions]
-
-        # Filtro de Bairro
-        neighborhoods = get_unique_sorted_values(df_filtered_for_options['neighborhood'])
-        selected_neighborhoods = st.multiselect("Bairros", options=neighborhoods)
+        # Filtro de Bairro: apenas bairros com imóveis para os demais filtros (e os já selecionados)
+        neighborhood_counts = counts["neighborhoods"]
+        st.session_state.neighborhoods_filter = [n for n in st.session_state.neighborhoods_filter if n in neighborhood_counts]
+        neighborhoods = [n for n, count in neighborhood_counts.items() if count > 0 or n in st.session_state.neighborhoods_filter]
+        selected_neighborhoods = st.multiselect(
+            "Bairros",
+            options=neighborhoods,
+            format_func=with_count(neighborhood_counts),
+            key="neighborhoods_filter"
+        )
+
+        # Filtro de Imobiliária
+        agencies = index.labels["agencies"]
+        st.session_state.agencies_filter = [a for a in st.session_state.agencies_filter if a in agencies]
+        st.multiselect(
+            "Imobiliárias",
+            options=agencies,
+            format_func=with_count(counts["agencies"]),
+            key="agencies_filter"
+        )
         
         # Filtro de Preço
         st.markdown("**Preço (R$)**")
         col1, col2 = st.columns(2)
         with col1:
-            min_price = st.number_input(
+            st.number_input(
                 "Mínimo", 
                 min_value=0.0, 
-                value=100000.0, 
                 step=10000.0,
                 format="%.0f",
                 key="min_price"
             )
         with col2:
-            max_price = st.number_input(
+            st.number_input(
                 "Máximo", 
                 min_value=0.0, 
-                value=500000.0, 
                 step=10000.0,
                 format="%.0f",
                 key="max_price"
             )
-        
-        # Create price range tuple for compatibility with existing filtering logic
-        price_range = (min_price, max_price)
+
 
         # Filtro de Área Privativa
 #        min_area, max_area = float(df_filtered_for_options['private_area_m2'].min()), float(df_filtered_for_options['private_area_m2'].max())
@@ -225,48 +866,47 @@ def main():
         st.markdown("**Área Privativa (m²)**")
         col1, col2 = st.columns(2)
         with col1:
-            min_area = st.number_input(
+            st.number_input(
                 "Mínimo", 
                 min_value=0.0,
-                value=30.0,
                 step=5.0,
                 format="%.0f",
                 key="min_area"
             )
         with col2:
-            max_area = st.number_input(
+            st.number_input(
                 "Máximo", 
                 min_value=0.0, 
-                value=200.0, 
                 step=5.0,
                 format="%.0f",
                 key="max_area"
             )
-        
-        # Create area range tuple for compatibility with existing filtering logic
-        area_range = (min_area, max_area)
+
 
         # Filtro de Quartos
-        selected_bedrooms = st.pills(
+        st.pills(
             "Quartos",
-            options=["1", "2", "3", "4+"],
+            options=Query_Engine.BUCKET_OPTIONS["bedrooms"],
             selection_mode="multi",
+            format_func=with_count(counts["bedrooms"]),
             key="bedrooms_filter"
         )
 
         # Filtro de Banheiros
-        selected_bathrooms = st.pills(
+        st.pills(
             "Banheiros",
-            options=["1", "2", "3", "4+"],
+            options=Query_Engine.BUCKET_OPTIONS["bathrooms"],
             selection_mode="multi",
+            format_func=with_count(counts["bathrooms"]),
             key="bathrooms_filter"
         )
 
         # Filtro de Vagas de Garagem
-        selected_parking = st.pills(
+        st.pills(
             "Vagas de Garagem",
-            options=["0", "1", "2", "3", "4+"],
+            options=Query_Engine.BUCKET_OPTIONS["parking_spaces"],
             selection_mode="multi",
+            format_func=with_count(counts["parking_spaces"]),
             key="parking_filter"
         )
 
@@ -275,266 +915,52 @@ def main():
         st.markdown("**🏷️ Minhas Tags**")
         
         # Checkbox para mostrar descartados
-        show_discarded = st.checkbox("Mostrar Descartados", value=False, help="Por padrão, imóveis marcados como descartados ficam ocultos")
+        st.checkbox("Mostrar Descartados", help="Por padrão, imóveis marcados como descartados ficam ocultos", key="show_discarded")
         
         # Multiselect para filtrar por tags específicas
         tag_labels = [TAG_OPTIONS[key]["label"] for key in TAG_OPTIONS.keys()]
-        selected_tag_labels = st.multiselect(
+        st.multiselect(
             "Filtrar por Tags",
             options=["Todos"] + tag_labels,
-            default=["Todos"],
-            help="Selecione as tags que deseja visualizar"
+            help="Selecione as tags que deseja visualizar",
+            key="tags_filter"
         )
         
-        # Convert labels back to tag keys
-        selected_tag_keys = []
-        if "Todos" not in selected_tag_labels:
-            for label in selected_tag_labels:
-                for key, tag_info in TAG_OPTIONS.items():
-                    if tag_info["label"] == label:
-                        selected_tag_keys.append(key)
-                        break
+        # Filtro de anúncios novos ou alterados desde o acesso anterior
+        previous_visit = st.session_state.previous_visit
+        st.checkbox(
+            "🆕 Somente novos desde a última visita",
+            key="only_new_filter",
+            disabled=previous_visit is None,
+            help=f"Novos ou alterados desde {time.strftime('%d/%m/%Y %H:%M', time.localtime(previous_visit))}" if previous_visit else "Disponível a partir do próximo acesso"
+        )
 
     # --- LÓGICA DE FILTRAGEM ---
-    if True:
-        df_filtered = df.copy()
+    filters = filters_from_state()
 
-        # Aplica filtros sequencialmente
-        df_filtered = df_filtered[df_filtered['city'].str.contains(selected_city, case=False, na=False)]
-        
-        if selected_types:
-            type_conditions = pd.Series([False] * len(df_filtered), index=df_filtered.index)
-            for selected_type in selected_types:
-                type_conditions |= df_filtered['type'].str.contains(selected_type, case=False, na=False)
-            df_filtered = df_filtered[type_conditions]
-            
-        df_filtered = df_filtered[df_filtered['price'].between(price_range[0], price_range[1])]
-        df_filtered = df_filtered[df_filtered['private_area_m2'].between(area_range[0], area_range[1])]
-
-        if selected_neighborhoods:
-            df_filtered = df_filtered[df_filtered['neighborhood'].isin(selected_neighborhoods)]
-
-        if selected_bedrooms:
-            bedroom_conditions = pd.Series([False] * len(df_filtered), index=df_filtered.index)
-            if "4+" in selected_bedrooms:
-                bedroom_conditions |= (df_filtered['bedrooms'] >= 4)
-            numeric_bedrooms = [int(b) for b in selected_bedrooms if b.isdigit()]
-            if numeric_bedrooms:
-                bedroom_conditions |= (df_filtered['bedrooms'].isin(numeric_bedrooms))
-            df_filtered = df_filtered[bedroom_conditions]
-
-        if selected_bathrooms:
-            bathroom_conditions = pd.Series([False] * len(df_filtered), index=df_filtered.index)
-            if "4+" in selected_bathrooms:
-                bathroom_conditions |= (df_filtered['bathrooms'] >= 4)
-            numeric_bathrooms = [int(b) for b in selected_bathrooms if b.isdigit()]
-            if numeric_bathrooms:
-                bathroom_conditions |= (df_filtered['bathrooms'].isin(numeric_bathrooms))
-            df_filtered = df_filtered[bathroom_conditions]
-
-        if selected_parking:
-            parking_conditions = pd.Series([False] * len(df_filtered), index=df_filtered.index)
-            if "4+" in selected_parking:
-                parking_conditions |= (df_filtered['parking_spaces'] >= 4)
-            numeric_parking = [int(p) for p in selected_parking if p.isdigit()]
-            if numeric_parking:
-                parking_conditions |= (df_filtered['parking_spaces'].isin(numeric_parking))
-            df_filtered = df_filtered[parking_conditions]
-
-        # Filtro de Tags do Usuário
-        if not show_discarded:
-            # Por padrão, ocultar imóveis marcados como descartados
-            discarded_ids = [prop_id for prop_id, tag in st.session_state.user_tags.items() if tag == "discarded"]
-            if discarded_ids:
-                df_filtered = df_filtered[~df_filtered['id'].astype(str).isin(discarded_ids)]
-        
-        if selected_tag_keys:
-            # Filtrar apenas imóveis com as tags selecionadas
-            tagged_ids = [prop_id for prop_id, tag in st.session_state.user_tags.items() if tag in selected_tag_keys]
-            if tagged_ids:
-                df_filtered = df_filtered[df_filtered['id'].astype(str).isin(tagged_ids)]
-            else:
-                # Se não há imóveis com essas tags, mostrar dataframe vazio
-                df_filtered = df_filtered.iloc[0:0]
+    # Buscas salvas e notificações (depois dos filtros, para poder salvar a busca atual)
+    render_saved_searches(filters, sort_key)
+    render_market_stats(market_stats, selected_city, selected_neighborhoods)
+    # O DataFrame carregado é compartilhado entre sessões; os filtros geram novos frames sem alterá-lo
+    with profiler.stage("filter_mask"):
+        mask = Query_Engine.filter_mask(df, filters, st.session_state.user_tags, index=index)
+        df_filtered = df[mask]
 
     # --- VISUALIZAÇÃO PRINCIPAL ---
 #    st.markdown(f"### Imóveis em Santa Cruz do Sul")
-    tab1, tab2 = st.tabs(["Anúncios", "Mapa"])
+    tab1, tab2, tab3 = st.tabs(["Anúncios", "Mapa", "❤️ Recomendados"])
+    similarity = load_similarity_index(version, df)
 
     with tab1:
-        # --- ABA DE ANÚNCIOS ---        
-        df_sorted = df_filtered.sort_values(by="price", ascending=ascending_order)
-
-        # Paginação
-        items_per_page = 20
-        total_items = len(df_sorted)
-        total_pages = max(1, (total_items + items_per_page - 1) // items_per_page)
-        
-        # Initialize page_number in session state if not exists
-        if 'page_number' not in st.session_state:
-            st.session_state.page_number = 1
-        
-        # Ensure page_number is within valid range
-        if st.session_state.page_number > total_pages:
-            st.session_state.page_number = total_pages
-        
-        page_number = st.session_state.page_number
-        
-        # Informações de paginação centralizadas
-        st.markdown(f"<div style='text-align: center; margin-bottom: 20px;'>Página {page_number} de {total_pages} | Exibindo {min(items_per_page, total_items - (page_number-1)*items_per_page)} de {total_items} imóveis</div>", unsafe_allow_html=True)
-        
-        start_index = (page_number - 1) * items_per_page
-        end_index = start_index + items_per_page
-        df_paginated = df_sorted.iloc[start_index:end_index]
-
-        # Exibição em cards
-        if df_paginated.empty:
-            st.write("Nenhum imóvel encontrado para os filtros selecionados nesta página.")
-        else:
-            # Criar uma única estrutura de 3 colunas
-            col1, col2, col3 = st.columns(3)
-            cols = [col1, col2, col3]
-            
-            # Distribuir os imóveis nas 3 colunas
-            for idx, (_, row) in enumerate(df_paginated.iterrows()):
-                col_idx = idx % 3  # Determina qual coluna usar (0, 1, ou 2)
-                
-                with cols[col_idx]:
-                    # Obter todas as imagens da propriedade
-                    image_urls_str = str(row['image_urls']) if pd.notna(row['image_urls']) else ""
-                    image_urls = [url.strip() for url in image_urls_str.split(' | ') if url.strip() and url.strip() != 'nan'] if image_urls_str else []
-                    
-                    # Identificador único para cada propriedade
-                    property_id = f"property_{row['id']}_{start_index + idx}"
-                    image_key = f"{property_id}_current_image"
-                    
-                    # Inicializar índice da imagem atual se não existir
-                    if image_key not in st.session_state:
-                        st.session_state[image_key] = 0
-                    
-                    # Garantir que o índice esteja dentro dos limites
-                    if image_urls and st.session_state[image_key] >= len(image_urls):
-                        st.session_state[image_key] = 0
-                    
-                    # Exibir imagem sem controles de navegação
-                    if image_urls:
-                        current_img_idx = st.session_state[image_key]
-                        current_image = image_urls[current_img_idx]
-                        
-                        # Exibir imagem
-                        st.image(current_image, use_container_width=True)
-                        
-                        # Indicador de posição das imagens (se houver mais de uma)
-                        if len(image_urls) > 1:
-                            st.markdown(f"<div style='text-align: center; font-size: 12px; color: #666; margin-top: -10px;'>{current_img_idx + 1} / {len(image_urls)}</div>", unsafe_allow_html=True)
-                    else:
-                        # Placeholder quando não há imagens
-                        st.markdown("""
-                        <div style="width:100%; height: 200px; background-color: #f0f0f0; display: flex; align-items: center; justify-content: center; border-radius: 8px; margin-bottom: 10px;">
-                            <span style="color: #888; font-size: 14px;">Imagem Indisponível</span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Cabeçalho com preço e informações básicas
-                    col_price, col_features = st.columns([2, 4])
-                    col_price.markdown(f"**R$ {float_to_str(row['price'], 0)}**")
-                    # Area, Bedrooms, Bathrooms, Parking Spaces
-                    area = f"{float_to_str(row['private_area_m2'], 0)} m²" if pd.notna(row['private_area_m2']) else None
-                    bedrooms = f"🛏️ {float_to_str(row['bedrooms'], 0)}" if pd.notna(row['bedrooms']) else None
-                    bathrooms = f"🚿 {float_to_str(row['bathrooms'], 0)}" if pd.notna(row['bathrooms']) else None
-                    parking_spaces = f"🚗 {float_to_str(row['parking_spaces'], 0)}" if pd.notna(row['parking_spaces']) else None
-                    col_features.markdown(f"<div style='text-align: right;'>{' | '.join(filter(None, [area, bedrooms, bathrooms, parking_spaces]))}</div>", unsafe_allow_html=True)
-                    st.markdown(f"<a href='{row['property_url']}' target='_blank' style='text-decoration: none; color: inherit;'>📍 {row['neighborhood']}, {row['city']} 🔗</a>", unsafe_allow_html=True)
-                    
-                    # Controles de navegação de imagem na parte inferior (só aparecem se houver mais de uma imagem)
-                    if image_urls and len(image_urls) > 1:
-                        nav_col1, nav_col2, nav_col3 = st.columns([1, 6, 1])
-                        
-                        with nav_col1:
-                            if st.button("◀", key=f"{property_id}_prev", help="Imagem anterior", use_container_width=True):
-                                st.session_state[image_key] = (current_img_idx - 1) % len(image_urls)
-                                st.rerun()
-                        
-                        with nav_col2:
-                            # Mostrar descrição do anúncio na coluna central
-                            if pd.notna(row['description']) or pd.notna(row['title']):
-                                with st.expander("Descrição do Anúncio", expanded=False):
-                                    if pd.notna(row['title']):
-                                        st.markdown(f"**{row['title']}**")
-                                    if pd.notna(row['description']):
-                                        st.write(row['description'])
-                        
-                        with nav_col3:
-                            if st.button("▶", key=f"{property_id}_next", help="Próxima imagem", use_container_width=True):
-                                st.session_state[image_key] = (current_img_idx + 1) % len(image_urls)
-                                st.rerun()
-                    else:
-                        # Se não há navegação de imagem, mostrar descrição normalmente
-                        if pd.notna(row['description']) or pd.notna(row['title']):
-                            with st.expander("Descrição do Anúncio", expanded=False):
-                                if pd.notna(row['title']):
-                                    st.markdown(f"**{row['title']}**")
-                                if pd.notna(row['description']):
-                                    st.write(row['description'])
-                    
-                    # Sistema de Tags do Usuário
-                    st.markdown("---")
-                    current_tag = get_property_tag(row['id'])
-                    
-                    # Display current tag if exists
-                    if current_tag:
-                        tag_info = TAG_OPTIONS[current_tag]
-                        st.markdown(f"<div style='background-color: {tag_info['color']}15; border-left: 3px solid {tag_info['color']}; padding: 5px 10px; margin-bottom: 10px; border-radius: 3px;'><small>{tag_info['label']}</small></div>", unsafe_allow_html=True)
-                    
-                    # Tag selection buttons in a compact layout
-                    tag_cols = st.columns(len(TAG_OPTIONS))
-                    for i, (tag_key, tag_info) in enumerate(TAG_OPTIONS.items()):
-                        with tag_cols[i]:
-                            is_current = current_tag == tag_key
-                            button_style = "primary" if is_current else "secondary"
-                            
-                            if st.button(
-                                tag_info["label"].split()[-1],  # Just the text part, no emoji for space
-                                key=f"tag_{property_id}_{tag_key}",
-                                help=tag_info["label"],
-                                use_container_width=True,
-                                type=button_style
-                            ):
-                                # Toggle tag: remove if same, set if different
-                                new_tag = None if is_current else tag_key
-                                set_property_tag(row['id'], new_tag)
-                                st.rerun()
-                    
-                    
-                    st.markdown("---")
-            
-            # Controles de paginação na parte inferior
-            st.markdown("---")
-            col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
-            
-            with col1:
-                if st.button("⏮️ Primeira", disabled=(page_number == 1), use_container_width=True):
-                    st.session_state.page_number = 1
-                    st.rerun()
-            
-            with col2:
-                if st.button("⬅️ Anterior", disabled=(page_number == 1), use_container_width=True):
-                    st.session_state.page_number = max(1, page_number - 1)
-                    st.rerun()
-            
-            with col3:
-                st.markdown(f"<div style='text-align: center; padding: 8px; background-color: #f0f2f6; border-radius: 5px; margin: 0 10px;'>Página {page_number} de {total_pages}</div>", unsafe_allow_html=True)
-            
-            with col4:
-                if st.button("Próxima ➡️", disabled=(page_number == total_pages), use_container_width=True):
-                    st.session_state.page_number = min(total_pages, page_number + 1)
-                    st.rerun()
-            
-            with col5:
-                if st.button("Última ⏭️", disabled=(page_number == total_pages), use_container_width=True):
-                    st.session_state.page_number = total_pages
-                    st.rerun()
-
+        # --- ABA DE ANÚNCIOS ---
+        with profiler.stage("similar_listings"):
+            render_similar(df, similarity, market_stats, filters)
+        with profiler.stage("render_listings"):
+            render_listings(version, df, mask, sort_key, filters, market_stats)
+    with tab3:
+        # --- ABA DE RECOMENDAÇÕES ---
+        with profiler.stage("recommendations"):
+            render_recommendations(df, similarity, market_stats, filters)
     with tab2:
         # --- ABA DE MAPA ---
         df_map = df_filtered.dropna(subset=['latitude', 'longitude'])
@@ -581,7 +1007,14 @@ def main():
                         </div>
                     """
             
-            df_map['popup'] = df_map.apply(create_popup, axis=1)
+            # Apenas as colunas usadas pelo mapa, em tipos nativos serializáveis (o dataset usa colunas Arrow)
+            with profiler.stage("map_popups"):
+                df_map = pd.DataFrame({
+                    'latitude': df_map['latitude'].astype('float64'),
+                    'longitude': df_map['longitude'].astype('float64'),
+                    'property_url': df_map['property_url'].astype(object).fillna(''),
+                    'popup': df_map.apply(create_popup, axis=1),
+                })
             
 
             # Função para lidar com cliques no mapa
@@ -597,35 +1030,40 @@ def main():
                             </script>
                         """, height=0)
 
-            st.pydeck_chart(pdk.Deck(
-                map_style='road',  # Usa um estilo que não requer token do Mapbox
+            with profiler.stage("map_render"):
+                st.pydeck_chart(pdk.Deck(
+                    map_style='road',  # Usa um estilo que não requer token do Mapbox
                 
-                # Initial view é de Santa Cruz do Sul
-                initial_view_state=pdk.ViewState(
-                    latitude=-29.7175,
-                    longitude=-52.4264,
-                    zoom=11.7,
-                    pitch=0  # Vista superior (sem inclinação) para melhor visualização dos pontos
-                ),
-                
-                layers=[
-                    pdk.Layer(
-                       'ScatterplotLayer',
-                       data=df_map,
-                       get_position='[longitude, latitude]',
-                       get_color='[200, 30, 0, 160]',  # Cor vermelha para os pontos
-                       get_radius=30,  # Raio fixo otimizado para visualização
-                       radius_scale=1,
-                       radius_min_pixels=6,  # Raio mínimo em pixels
-                       radius_max_pixels=30,  # Raio máximo em pixels
-                       pickable=True,
-                       auto_highlight=True,  # Destaca o ponto ao passar o mouse
-                       id='code',  # ID para seleção
+                    # Initial view é de Santa Cruz do Sul
+                    initial_view_state=pdk.ViewState(
+                        latitude=-29.7175,
+                        longitude=-52.4264,
+                        zoom=11.7,
+                        pitch=0  # Vista superior (sem inclinação) para melhor visualização dos pontos
                     ),
-                ],
-                tooltip={"html": "{popup}", "style": {"color": "white", "background": "rgba(0,0,0,0.8)", "border-radius": "5px"}}
-            ), height=680, on_select=handle_map_selection, selection_mode='single-object', key='code')
-            
+                
+                    layers=[
+                        pdk.Layer(
+                           'ScatterplotLayer',
+                           data=df_map,
+                           get_position='[longitude, latitude]',
+                           get_color='[200, 30, 0, 160]',  # Cor vermelha para os pontos
+                           get_radius=30,  # Raio fixo otimizado para visualização
+                           radius_scale=1,
+                           radius_min_pixels=6,  # Raio mínimo em pixels
+                           radius_max_pixels=30,  # Raio máximo em pixels
+                           pickable=True,
+                           auto_highlight=True,  # Destaca o ponto ao passar o mouse
+                           id='code',  # ID para seleção
+                        ),
+                    ],
+                    tooltip={"html": "{popup}", "style": {"color": "white", "background": "rgba(0,0,0,0.8)", "border-radius": "5px"}}
+                ), height=680, on_select=handle_map_selection, selection_mode='single-object', key='code')
+
+    if profiler.enabled:
+        render_profiler_panel(profiler)
+
+
 # Adiciona PyDeck se necessário para o mapa
 try:
     import pydeck as pdk
@@ -634,4 +1072,4 @@ except ImportError:
 
 
 if __name__ == "__main__":
-    main()
+    get_profiler().run(main)
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import Data_Store
+import Enrichment
+from Enrichment import DetailEnricher, enrich
+from Synthetic_Data import synthetic_listings
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Data_Store, "DATA_DIR", str(tmp_path))
+
+
+def _page(properties, meta=None):
+    data = {"props": {"pageProps": {"property": properties[0], "similar": properties[1:]}}}
+    head = f'<meta name="description" content="{meta}">' if meta else ""
+    return f'<html><head>{head}</head><body><script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></body></html>'
+
+
+def test_detail_matches_id_or_code():
+    page = _page([
+        {"id": 10, "code": "A10", "url": "/imovel/10", "description": "Casa ampla", "amenities": ["Piscina"]},
+        {"id": 11, "code": "A11", "url": "/imovel/11", "description": "Outra casa"},
+    ])
+    assert DetailEnricher.parse_detail(page, "10")["full_description"] == "Casa ampla"
+    # Anúncios do frontend usam o código como id
+    assert DetailEnricher.parse_detail(page, "A11", code="A11")["full_description"] == "Outra casa"
+    assert DetailEnricher.parse_detail(page, "x", url="https://www.a.com.br/imovel/11")["full_description"] == "Outra casa"
+
+
+def test_detail_of_another_listing_is_not_used():
+    page = _page([{"id": 11, "code": "A11", "description": "Outra casa"}])
+    assert DetailEnricher.parse_detail(page, "99", code="B99") is None
+    page = _page([{"id": 11, "description": "Outra casa"}], meta="Descrição da página")
+    assert DetailEnricher.parse_detail(page, "99") == {"full_description": "Descrição da página"}
+
+
+def test_pages_without_details_are_cached(monkeypatch):
+    fetched = []
+
+    def fake_fetch(self, url):
+        fetched.append(url)
+        return "<html></html>"
+
+    monkeypatch.setattr(DetailEnricher, "_fetch_html", fake_fetch)
+    df = synthetic_listings(20, seed=3)
+    first = enrich(df, max_workers=2)
+    assert len(fetched) == 20
+    assert first["full_description"].isna().all()
+
+    enrich(df, max_workers=2)
+    assert len(fetched) == 20
+
+
+def test_failed_pages_are_retried(monkeypatch):
+    fetched = []
+
+    def failing_fetch(self, url):
+        fetched.append(url)
+        return None
+
+    monkeypatch.setattr(DetailEnricher, "_fetch_html", failing_fetch)
+    df = synthetic_listings(5, seed=3)
+    enrich(df, max_workers=2)
+    enrich(df, max_workers=2)
+    assert len(fetched) == 10
+    assert Enrichment.load_details_cache().empty
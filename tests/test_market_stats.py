@@ -0,0 +1,32 @@
+import pandas as pd
+
+from Market_Stats import GROUP_COLUMNS, build_market_stats, update_market_stats
+from Synthetic_Data import synthetic_listings
+
+
+def test_incremental_update_matches_full_rebuild():
+    previous_df = synthetic_listings(3_000, seed=7)
+    previous = build_market_stats(previous_df, "v1")
+
+    df = previous_df.copy()
+    changed_rows = df.index[::50]
+    # Preços alterados, anúncios que mudaram de bairro e anúncios removidos
+    df.loc[changed_rows, "price"] = df.loc[changed_rows, "price"] * 1.1
+    moved_rows = df.index[5::97]
+    df.loc[moved_rows, "neighborhood"] = "Centro"
+    removed_rows = df.index[7::131]
+    new_rows = synthetic_listings(40, seed=8)
+    new_rows["id"] = "novo-" + new_rows["id"]
+    df = pd.concat([df.drop(index=removed_rows), new_rows], ignore_index=True)
+
+    changed = pd.concat([
+        previous_df.loc[changed_rows.union(moved_rows), GROUP_COLUMNS],
+        previous_df.loc[moved_rows, GROUP_COLUMNS].assign(neighborhood="Centro"),
+        previous_df.loc[removed_rows, GROUP_COLUMNS],
+        new_rows[GROUP_COLUMNS],
+    ], ignore_index=True)
+
+    updated = update_market_stats(previous, df, changed, "v2")
+    rebuilt = build_market_stats(df, "v2")
+    assert updated.levels == rebuilt.levels
+    assert updated.agencies == rebuilt.agencies
@@ -0,0 +1,56 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Normalizer import SCHEMA, normalize_frontend, parse_brl_number, parse_characteristics
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ 1.234,56", 1234.56),
+    ("R$ 350.000", 350_000.0),
+    ("1.250.000", 1_250_000.0),
+    ("72,5 m²", 72.5),
+    ("120.5", 120.5),
+    ("120", 120.0),
+    ("-29.698", -29.698),
+    ("-52,4264", -52.4264),
+    ("-29.6981234", -29.6981234),
+    ("3 quartos", 3.0),
+])
+def test_parse_brl_number(text, expected):
+    assert parse_brl_number(pd.Series([text]))[0] == pytest.approx(expected)
+
+
+def test_parse_brl_number_invalid_and_missing():
+    parsed = parse_brl_number(pd.Series(["Consulte", None, ""]))
+    assert parsed.dtype == "float64"
+    assert parsed.isna().all()
+
+
+def test_parse_brl_number_keeps_numeric_columns():
+    parsed = parse_brl_number(pd.Series([1, 2.5, np.nan]))
+    assert parsed.dtype == "float64"
+    assert parsed[:2].tolist() == [1.0, 2.5]
+
+
+def test_parse_characteristics_and_unknown_warning(caplog):
+    characteristics = pd.Series([["72,5 m²", "2 quartos", "1 banheiro", "2 vagas", "Piscina"], [], ["3 Quartos"]])
+    domains = pd.Series(["a.com.br", "b.com.br", "c.com.br"])
+    with caplog.at_level(logging.WARNING):
+        parsed = parse_characteristics(characteristics, domains)
+
+    assert parsed.loc[0].tolist() == [72.5, 2.0, 1.0, 2.0]
+    assert parsed.loc[1].isna().all()
+    assert parsed.loc[2, "bedrooms"] == 3.0
+    assert "Característica desconhecida: Piscina. Site: a.com.br" in caplog.text
+
+
+def test_normalize_frontend_fills_schema():
+    df = normalize_frontend([{"site": "a.com.br", "code": "Cód. 10", "price": "R$ 200.000", "characteristics": ["50 m²"]}])
+    assert list(df.columns) == list(SCHEMA)
+    assert df.loc[0, "id"] == "10"
+    assert df.loc[0, "price"] == 200_000.0
+    assert df.loc[0, "private_area_m2"] == 50.0
+    assert pd.isna(df.loc[0, "latitude"])
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+import Data_Store
+import Market_Stats
+import Saved_Searches
+import Scraper
+from Synthetic_Data import synthetic_listings
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Data_Store, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(Scraper.Enrichment, "enrich", lambda df: df)
+
+
+def test_market_stats_are_published_when_notify_fails(monkeypatch):
+    def failing_notify(version):
+        raise RuntimeError("falha nas buscas salvas")
+
+    monkeypatch.setattr(Saved_Searches, "notify_new_listings", failing_notify)
+    version = Scraper.publish_scraped_data(synthetic_listings(200, seed=4))
+    assert version == Data_Store.dataset_version()
+    assert os.path.exists(Data_Store.data_path(Market_Stats.MARKET_STATS_FILE))
+    assert Market_Stats.load_market_stats_file().version == version
@@ -0,0 +1,101 @@
+import base64
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import Data_Store
+import Query_Engine
+from Query_API import ListingIndex, decode_cursor, encode_cursor, filters_from_query
+from Synthetic_Data import synthetic_listings
+
+
+def test_missing_params_do_not_filter():
+    filters, sort, limit, cursor = filters_from_query({})
+    assert filters["city"] is None
+    assert filters["types"] == []
+    assert filters["price_range"] == (None, None)
+    assert filters["area_range"] == (None, None)
+    assert (sort, limit, cursor) == (Query_Engine.DEFAULT_SORT, 20, None)
+
+    df = pd.DataFrame({
+        "domain": ["a", "a", "b"], "id": ["1", "2", "3"], "type": ["Casa", "Apartamento", None],
+        "city": ["Vera Cruz", "Santa Cruz do Sul", None], "neighborhood": ["Centro", "Goiás", None],
+        "price": [50_000.0, 900_000.0, None], "private_area_m2": [500.0, None, 40.0],
+        "bedrooms": [1.0, 2.0, None], "bathrooms": [1.0, 1.0, None], "parking_spaces": [0.0, 1.0, None],
+    })
+    assert Query_Engine.filter_mask(df, filters).all()
+
+
+def test_partial_ranges():
+    filters, *_ = filters_from_query({"price_max": ["400000"], "type": ["Casa"]})
+    assert filters["price_range"] == (None, 400_000.0)
+    assert filters["types"] == ["Casa"]
+    with pytest.raises(ValueError):
+        filters_from_query({"price_min": ["barato"]})
+
+
+def test_cursor_round_trip():
+    after = {"value": 350_000.0, "key": "a/1"}
+    assert decode_cursor(encode_cursor("q", after)) == {"q": "q", "a": after}
+
+
+@pytest.mark.parametrize("payload", [
+    [1, 2],
+    {"q": "q"},
+    {"q": "q", "a": "x"},
+    {"q": "q", "a": {"value": "caro", "key": "a/1"}},
+    {"q": "q", "a": {"value": 1.0}},
+])
+def test_malformed_cursor_raises_value_error(payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_invalid_base64_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("!!!")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Data_Store, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_mask_of_a_replaced_version_is_not_cached(data_dir):
+    Data_Store.publish_dataset(synthetic_listings(3_000, seed=1))
+    index = ListingIndex(reload_interval=0)
+    index.refresh()
+    filters, sort, limit, _ = filters_from_query({})
+    old = index.snapshot()
+
+    # Uma versão menor é publicada enquanto a máscara da anterior é calculada
+    Data_Store.publish_dataset(synthetic_listings(1_000, seed=2))
+    index.refresh()
+    _, mask, total = index.mask(filters, sort, old)
+    assert total == 3_000
+
+    rows, total, _ = index.page(filters, sort, limit, None)
+    assert total == 1_000
+    assert len(rows) == limit
+
+
+def test_half_written_tags_keep_the_previous_tags(data_dir):
+    Data_Store.publish_dataset(synthetic_listings(100, seed=1))
+    tags_file = data_dir / "user_tags.json"
+    tags_file.write_text(json.dumps({"1": "discarded"}), encoding="utf-8")
+    index = ListingIndex(reload_interval=0)
+    index.refresh()
+    assert index.user_tags == {"1": "discarded"}
+
+    tags_file.write_text('{"1": "disc', encoding="utf-8")
+    os.utime(tags_file, (1, 1))
+    index.refresh()
+    assert index.user_tags == {"1": "discarded"}
+
+    tags_file.write_text(json.dumps({"2": "favorite"}), encoding="utf-8")
+    index.refresh()
+    assert index.user_tags == {"2": "favorite"}
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import Query_Engine
+from Query_API import decode_cursor, encode_cursor
+from Synthetic_Data import synthetic_listings
+
+
+@pytest.fixture(scope="module")
+def df():
+    df = synthetic_listings(2_000, seed=11)
+    # Preços arredondados e alguns ausentes: muitos empates e valores NaN no fim da ordem
+    df["price"] = (df["price"] // 50_000) * 50_000
+    df.loc[df.index[::37], "price"] = np.nan
+    df.loc[df.index[::53], "private_area_m2"] = np.nan
+    return df
+
+
+def _expected_order(df, mask, sort):
+    """Ordem por força bruta: valor crescente (NaN no fim) e, nos empates, a chave domain/id."""
+    values = Query_Engine.sort_values(df, sort)
+    keys = (df["domain"].astype(str) + "/" + df["id"].astype(str)).to_numpy(dtype=object)
+    rows = sorted(np.flatnonzero(mask), key=lambda i: (np.isnan(values[i]), 0.0 if np.isnan(values[i]) else values[i], keys[i]))
+    return [int(i) for i in rows]
+
+
+def _filters(**changes):
+    return {**Query_Engine.NO_FILTERS, **changes}
+
+
+@pytest.mark.parametrize("sort", list(Query_Engine.SORT_OPTIONS))
+def test_keyset_pages_follow_the_full_order(df, sort):
+    index = Query_Engine.SortIndex(df)
+    mask = Query_Engine.filter_mask(df, _filters(types=["Apartamento", "Casa"]))
+    seen, after = [], None
+    while True:
+        positions = index.page(mask, sort, 37, after)
+        seen.extend(int(i) for i in positions)
+        if len(positions) < 37:
+            break
+        # O cursor passa pela API (JSON + base64) entre uma página e outra
+        after = decode_cursor(encode_cursor("q", index.cursor(sort, int(positions[-1]))))["a"]
+    assert seen == _expected_order(df, mask, sort)
+
+
+def test_ties_are_broken_by_listing_key(df):
+    index = Query_Engine.SortIndex(df)
+    mask = np.ones(len(df), dtype=bool)
+    positions = index.page(mask, "price_asc", len(df))
+    keys = index.keys[positions]
+    prices = df["price"].to_numpy()[positions]
+    for price in np.unique(prices[~np.isnan(prices)])[:5]:
+        tied = keys[prices == price]
+        assert list(tied) == sorted(tied)
+    # Um cursor no meio de um empate continua logo depois do anúncio dele
+    middle = int(positions[10])
+    assert list(index.page(mask, "price_asc", 5, index.cursor("price_asc", middle))) == list(positions[11:16])
+
+
+def test_cursor_after_nan_values(df):
+    index = Query_Engine.SortIndex(df)
+    mask = np.ones(len(df), dtype=bool)
+    positions = index.page(mask, "price_asc", len(df))
+    first_nan = int(np.flatnonzero(np.isnan(df["price"].to_numpy()[positions]))[0])
+    cursor = index.cursor("price_asc", int(positions[first_nan]))
+    assert cursor["value"] is None
+    assert list(index.page(mask, "price_asc", 3, cursor)) == list(positions[first_nan + 1:first_nan + 4])
+
+
+def test_last_page_and_page_at_match_the_full_order(df):
+    index = Query_Engine.SortIndex(df)
+    mask = Query_Engine.filter_mask(df, _filters(bedrooms=["2", "3"]))
+    expected = _expected_order(df, mask, "area_desc")
+    assert list(index.last_page(mask, "area_desc", 15)) == expected[-15:]
+    assert list(index.page_at(mask, "area_desc", 40, 20)) == expected[40:60]
+
+
+def _brute_force_counts(df, filters, key):
+    """Contagem da faceta com os demais filtros (sem a seleção da própria faceta)."""
+    without = {**filters, key: []}
+    selected = df[Query_Engine.filter_mask(df, without)][Query_Engine.FACET_COLUMNS[key]]
+    if key in Query_Engine.BUCKET_OPTIONS:
+        values = selected.to_numpy(dtype="float64", na_value=np.nan)
+        labels = np.where(values >= 4, "4+", pd.Series(values).map(lambda v: "" if np.isnan(v) else str(int(v))))
+        counts = pd.Series(labels).value_counts()
+        return {label: int(counts.get(label, 0)) for label in Query_Engine.BUCKET_OPTIONS[key]}
+    return {str(value): int(count) for value, count in selected.dropna().astype(str).value_counts().items()}
+
+
+def test_facet_counts_match_brute_force_groupby(df):
+    filters = _filters(
+        city="Santa Cruz", types=["Apartamento"], neighborhoods=["Centro"], bedrooms=["2", "4+"],
+        price_range=(100_000, 900_000),
+    )
+    counts = Query_Engine.facet_counts(df, filters)
+    for key in Query_Engine.FACET_COLUMNS:
+        expected = {label: count for label, count in _brute_force_counts(df, filters, key).items() if count}
+        assert {label: count for label, count in counts[key].items() if count} == expected, key
@@ -0,0 +1,54 @@
+import tracemalloc
+
+import Rerun_Profiler
+
+
+def test_memory_peak_is_measured_per_rerun(monkeypatch):
+    monkeypatch.setenv(Rerun_Profiler.PROFILE_ENV_VAR, "1")
+    was_tracing = tracemalloc.is_tracing()
+    profiler = Rerun_Profiler.RerunProfiler()
+    profiler.enable()
+    try:
+        def large():
+            with profiler.stage("grande"):
+                data = [0] * 1_000_000
+                del data
+
+        def small():
+            with profiler.stage("pequena"):
+                data = [0] * 1_000
+                del data
+
+        profiler.run(large)
+        profiler.run(small)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    small_run, large_run = profiler.history
+    assert large_run["peak_kb"] > 5_000
+    # O pico do rerun anterior não entra na conta do seguinte
+    assert small_run["peak_kb"] < 1_000
+    assert small_run["stages"][0]["peak_kb"] < 1_000
+
+
+def test_query_param_profiling_measures_time_only(monkeypatch):
+    monkeypatch.delenv(Rerun_Profiler.PROFILE_ENV_VAR, raising=False)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    profiler = Rerun_Profiler.RerunProfiler()
+    profiler.enable()
+    assert not tracemalloc.is_tracing()
+
+    def rerun():
+        with profiler.stage("etapa"):
+            pass
+
+    profiler.run(rerun)
+    profiler.run(lambda: profiler.run(lambda: None, fragment="render_card"))
+    outer_run, full_run = profiler.history
+    assert full_run["peak_kb"] is None
+    assert full_run["stages"][0]["alloc_kb"] is None
+    # Dentro de um rerun, o fragmento não abre outra medição
+    assert outer_run["fragment"] is None
+    assert len(profiler.history) == 2
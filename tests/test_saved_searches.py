@@ -0,0 +1,49 @@
+import pytest
+
+import Data_Store
+import Saved_Searches
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Data_Store, "DATA_DIR", str(tmp_path))
+
+
+def test_visits_are_tracked_per_visitor():
+    assert Saved_Searches.register_visit("ana", now=1_000.0) is None
+    assert Saved_Searches.register_visit("bia", now=1_100.0) is None
+    # Um novo acesso de outra pessoa não mexe na visita de "ana"
+    later = 1_000.0 + Saved_Searches.VISIT_GAP_SECONDS + 500
+    assert Saved_Searches.register_visit("ana", now=later) == 1_000.0
+
+
+def test_reload_continues_the_same_visit():
+    Saved_Searches.register_visit("ana", now=1_000.0)
+    first = 1_000.0 + Saved_Searches.VISIT_GAP_SECONDS * 2
+    assert Saved_Searches.register_visit("ana", now=first) == 1_000.0
+    # Recarregar logo depois mantém o mesmo "desde a última visita"
+    assert Saved_Searches.register_visit("ana", now=first + 60) == 1_000.0
+
+
+def test_new_visit_starts_from_last_activity():
+    Saved_Searches.register_visit("ana", now=1_000.0)
+    Saved_Searches.touch_visit("ana", now=2_500.0)
+    assert Saved_Searches.register_visit("ana", now=2_500.0 + Saved_Searches.VISIT_GAP_SECONDS) == 2_500.0
+
+
+def test_legacy_global_file_is_ignored():
+    Saved_Searches._write_json(Saved_Searches.LAST_VISIT_FILE, {"last_visit": 123.0})
+    assert Saved_Searches.register_visit("ana", now=1_000.0) is None
+
+
+def test_concurrent_visits_are_not_lost():
+    from concurrent.futures import ThreadPoolExecutor
+
+    visitors = [f"visitante-{i}" for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda visitor: Saved_Searches.register_visit(visitor, now=1_000.0), visitors))
+        list(executor.map(lambda visitor: Saved_Searches.touch_visit(visitor, now=2_000.0), visitors))
+
+    visits = Saved_Searches._read_visits()
+    assert sorted(visits) == sorted(visitors)
+    assert all(visit["last_seen"] == 2_000.0 for visit in visits.values())
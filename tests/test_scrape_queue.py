@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+import Data_Store
+from Scrape_Queue import ScrapeQueue, partition_path
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(Data_Store, "DATA_DIR", str(tmp_path))
+    return ScrapeQueue(max_attempts=2)
+
+
+def test_each_job_is_leased_once(queue):
+    run_id = queue.enqueue_run(["a.com", "b.com"], run_id="20260101000000")
+    first = queue.lease("w1", run_id)
+    second = queue.lease("w2", run_id)
+    assert {first["domain"], second["domain"]} == {"a.com", "b.com"}
+    assert queue.lease("w3", run_id) is None
+    assert queue.status(run_id) == {"leased": 2}
+    assert not queue.is_finished(run_id)
+
+
+def test_expired_lease_goes_to_another_worker(queue):
+    run_id = queue.enqueue_run(["a.com"], run_id="20260101000000")
+    job = queue.lease("w1", run_id, lease_seconds=-1)
+    retry = queue.lease("w2", run_id)
+    assert retry["domain"] == "a.com"
+    assert retry["attempt"] == 2
+    # O worker antigo perdeu o lease: não renova nem conclui o job
+    assert not queue.heartbeat(job)
+    assert not queue.complete(job, "x.parquet", 1)
+    assert queue.heartbeat(retry)
+    assert queue.complete(retry, "x.parquet", 1)
+    assert queue.status(run_id) == {"done": 1}
+    assert queue.partitions(run_id) == ["x.parquet"]
+    assert queue.is_finished(run_id)
+
+
+def test_failures_are_requeued_until_max_attempts(queue):
+    run_id = queue.enqueue_run(["a.com"], run_id="20260101000000")
+    queue.fail(queue.lease("w1", run_id), "erro 1")
+    assert queue.status(run_id) == {"pending": 1}
+    queue.fail(queue.lease("w1", run_id), "erro 2")
+    assert queue.status(run_id) == {"failed": 1}
+    assert queue.lease("w1", run_id) is None
+    assert queue.is_finished(run_id)
+
+
+def test_lease_expired_on_last_attempt_is_marked_failed(queue):
+    run_id = queue.enqueue_run(["a.com"], run_id="20260101000000")
+    queue.fail(queue.lease("w1", run_id), "erro 1")
+    queue.lease("w2", run_id, lease_seconds=-1)
+    time.sleep(0.01)
+    assert queue.lease("w3", run_id) is None
+    assert queue.status(run_id) == {"failed": 1}
+    assert queue.is_finished(run_id)
+
+
+def test_latest_run_and_partitions_are_per_run(queue):
+    queue.enqueue_run(["a.com"], run_id="20260102000000")
+    queue.enqueue_run(["a.com"], run_id="20260101000000")
+    assert queue.latest_run() == "20260102000000"
+    assert partition_path("20260101000000", "a.com") != partition_path("20260102000000", "a.com")
@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES_DIR
+from Scraper_Static import StaticFrontEnd_Scraper, _TreeBuilder
+
+
+@pytest.fixture
+def venda_page() -> str:
+    with open(os.path.join(FIXTURES_DIR, "venda_page.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_tree_builder_handles_void_and_self_closing_tags(venda_page):
+    builder = _TreeBuilder()
+    builder.feed(venda_page)
+
+    cards = builder.root.find_all(itemtype="https://schema.org/Apartment")
+    assert len(cards) == 2
+    # <img> sem barra não pode engolir os irmãos seguintes
+    assert [img.attrs.get("src") for img in cards[0].find_all("img")] == [
+        "https://cdn.example.com/1234/1.jpg", "https://cdn.example.com/1234/2.jpg", None,
+    ]
+    address = cards[0].find(class_prefix="vertical-property-card_fullAddress__")
+    assert address.text() == "Rua Marechal Floriano, Santa Cruz do Sul"
+
+
+def test_parse_static_markup(venda_page):
+    df = StaticFrontEnd_Scraper._parse_static_markup(venda_page, "example.com.br")
+
+    assert list(df["id"]) == ["1234", "5678"]
+    assert list(df["domain"]) == ["example.com.br", "example.com.br"]
+    assert list(df["neighborhood"]) == ["Centro", "Goiás"]
+    assert list(df["price"]) == [350_000.0, 1_250_000.5]
+    assert list(df["private_area_m2"]) == [72.5, 180.0]
+    assert list(df["bedrooms"]) == [2.0, 3.0]
+    assert df.loc[0, "bathrooms"] == 1.0 and pd.isna(df.loc[1, "bathrooms"])
+    assert df.loc[0, "parking_spaces"] == 1.0 and pd.isna(df.loc[1, "parking_spaces"])
+    assert list(df["exclusivity"]) == [True, False]
+    assert df.loc[0, "image_urls"] == "https://cdn.example.com/1234/1.jpg | https://cdn.example.com/1234/2.jpg"
+    assert pd.isna(df.loc[1, "image_urls"])
+    assert df.loc[1, "property_url"] == "https://www.example.com.br/imovel/5678"
+    assert (df["source"] == "frontend").all()
+
+
+def test_parse_static_markup_without_cards():
+    df = StaticFrontEnd_Scraper._parse_static_markup("<html><body><p>Nenhum imóvel</p></body></html>", "example.com.br")
+    assert df.empty
+    assert "price" in df.columns
@@ -0,0 +1,35 @@
+from Session_State import LRUState
+
+
+def test_capacity_is_enforced():
+    state = LRUState(max_items=3)
+    for i in range(10):
+        state.set(i, i * 10)
+    assert len(state) == 3
+    assert [i for i in range(10) if i in state] == [7, 8, 9]
+
+
+def test_least_recently_used_is_evicted_first():
+    state = LRUState(max_items=3)
+    state.set("a", 1)
+    state.set("b", 2)
+    state.set("c", 3)
+    # Ler "a" e regravar "b" os tornam recentes: "c" é o próximo a sair
+    assert state.get("a") == 1
+    state.set("b", 20)
+    state.set("d", 4)
+    assert "c" not in state
+    assert [key for key in "abd" if key in state] == ["a", "b", "d"]
+    state.set("e", 5)
+    assert "a" not in state
+    assert state.get("b") == 20
+
+
+def test_missing_keys_and_pop():
+    state = LRUState(max_items=2)
+    assert state.get("x", "padrão") == "padrão"
+    assert "x" not in state
+    state.set("x", 1)
+    assert state.pop("x") == 1
+    assert state.pop("x", None) is None
+    assert len(state) == 0
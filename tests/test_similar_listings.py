@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from Similar_Listings import SimilarityIndex
+from Synthetic_Data import synthetic_listings
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SimilarityIndex(synthetic_listings(3_000, seed=5))
+
+
+def _brute_force(index, position, k, exclude=()):
+    """Ranking completo em float64: mesma categoria, sem o próprio anúncio e sem os excluídos."""
+    matrix = index.matrix.astype("float64")
+    distances = ((matrix - matrix[position]) ** 2).sum(axis=1)
+    candidates = [
+        i for i in range(index.size)
+        if i != position and i not in exclude and index.type_codes[i] == index.type_codes[position]
+    ]
+    return sorted(candidates, key=lambda i: (distances[i], i))[:k], np.sqrt(distances)
+
+
+@pytest.mark.parametrize("position", [0, 17, 1_234, 2_999])
+def test_similar_matches_brute_force_ranking(index, position):
+    positions, distances = index.similar(position, k=12)
+    expected, expected_distances = _brute_force(index, position, 12)
+    assert position not in positions
+    assert list(positions) == expected
+    np.testing.assert_allclose(distances, expected_distances[expected], rtol=1e-4, atol=1e-5)
+
+
+def test_excluded_listings_are_skipped(index):
+    first, _ = index.similar(42, k=5)
+    positions, _ = index.similar(42, k=5, exclude=first[:2])
+    assert not set(first[:2]) & set(positions)
+    assert list(positions) == _brute_force(index, 42, 5, exclude=set(first[:2].tolist()))[0]
+
+
+def test_k_larger_than_candidates_returns_all_of_the_same_type():
+    df = synthetic_listings(30, seed=6)
+    index = SimilarityIndex(df)
+    position = 0
+    same_type = int((index.type_codes == index.type_codes[position]).sum()) - 1
+    positions, distances = index.similar(position, k=1_000)
+    assert len(positions) == same_type
+    assert position not in positions
+    assert np.isfinite(distances).all()
+    assert all(df["type"].iloc[i] == df["type"].iloc[position] for i in positions)
+
+
+def test_recommend_excludes_favorites_and_uses_the_closest_favorite(index):
+    favorites = np.array([3, 400, 2_500])
+    positions, distances, closest = index.recommend(favorites, k=20)
+    assert not set(favorites) & set(positions)
+    assert np.all(np.diff(distances) >= 0)
+    for position, favorite, distance in zip(positions, closest, distances):
+        best = min(index.distances(int(f))[position] for f in favorites)
+        assert np.isclose(distance ** 2, best, rtol=1e-5)
+        assert np.isclose(index.distances(int(favorite))[position], best, rtol=1e-5)
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+import Query_Engine
+from SQL_Backend import build_where, check_parity, _write_parquet
+from Synthetic_Data import synthetic_listings
+
+
+def test_sql_backend_matches_pandas(tmp_path):
+    pytest.importorskip("duckdb")
+    df = synthetic_listings(5_000)
+    path = os.path.join(tmp_path, "listings.parquet")
+    _write_parquet(df, path)
+    assert check_parity(df, path, pages=2) == []
+
+
+def test_bucket_filter_without_valid_options_matches_nothing():
+    where, params = build_where({**Query_Engine.NO_FILTERS, "bedrooms": ["x"]})
+    assert where == "FALSE"
+    assert params == []
+
+
+def test_city_filter_becomes_equality_on_stored_cities():
+    where, params = build_where({**Query_Engine.NO_FILTERS, "city": "santa"}, cities=["Santa Cruz do Sul", "Venâncio Aires"])
+    assert where == "city IN (?)"
+    assert params == ["Santa Cruz do Sul"]